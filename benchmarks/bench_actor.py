@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# 상태 액터 처리량 벤치마크: 메시지 폭주 상황에서 직접 변경(핸들러가 dict를 바로 수정) vs 상태 액터
+#   python benchmarks/bench_actor.py [사용자수] [일수] [동시 핸들러수] [핸들러당 메시지수]
+# 각 핸들러 코루틴은 메시지마다 점수 반영 → 목표 판단 → (DM 대신) 양보를 반복
+
+import sys
+import json
+import time
+import random
+import asyncio
+import datetime
+
+from synthetic import bot, make_guild
+from bench_hotpaths import install, peak_rss_mb
+
+def direct_award(part, uid: str, ds: str, cid: int, today: datetime.date) -> tuple:
+    """액터 도입 전 on_message 경로: 반영 후 합계/알림 키를 핸들러가 직접 확인·기록"""
+    cfg = part.config
+    added = bot.award_activity(part, uid, ds, cid)
+    daily = weekly = False
+    if added:
+        user = part.data["users"][uid]
+        day_total = user.day_total(bot.day_index(ds))
+        w_total = part.totals.week_total(uid, today)
+        for key, hit in ((f"daily_{ds}", day_total >= cfg.daily_goal),
+                         (f"weekly_{bot.week_key(today)}", w_total >= cfg.week_goal)):
+            if hit and user.notify(key):
+                part.persistence.record_notify(uid, key)
+                part.storage.shadow_notify(uid, key)
+                if key.startswith("daily_"):
+                    daily = True
+                else:
+                    weekly = True
+    return added, daily, weekly
+
+def make_burst(uids: list, n_handlers: int, per_handler: int, seed: int) -> list:
+    rng = random.Random(seed)
+    channels = list(bot.CHANNEL_POINTS)
+    return [[(rng.choice(uids), rng.choice(channels)) for _ in range(per_handler)] for _ in range(n_handlers)]
+
+async def run_mode(mode: str, data: dict, burst: list) -> dict:
+    part = install(data)
+    today = datetime.datetime.now(bot.KST).date()
+    ds = bot.logical_date_str_from_now()
+    latencies, goals = [], [0, 0]
+
+    async def handler(msgs):
+        for uid, cid in msgs:
+            t0 = time.perf_counter()
+            if mode == "direct":
+                _, daily, weekly = direct_award(part, uid, ds, cid, today)
+            else:
+                res = await part.actor.call(bot.Award(uid, ds, cid))
+                daily, weekly = res.daily_goal, res.weekly_goal
+            latencies.append(time.perf_counter() - t0)
+            goals[0] += daily
+            goals[1] += weekly
+            await asyncio.sleep(0)   # DM 발송 등 다른 작업에 양보
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(handler(m) for m in burst))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    n = len(latencies)
+    out = {
+        "mode": mode,
+        "messages": n,
+        "msgs_per_sec": round(n / elapsed, 1),
+        "p50_ms": round(latencies[n // 2] * 1000, 4),
+        "p99_ms": round(latencies[min(n - 1, int(n * 0.99))] * 1000, 4),
+        "daily_goal_dms": goals[0],
+        "weekly_goal_dms": goals[1],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if mode == "actor":
+        st = part.actor.stats
+        out["batches"] = st["batches"]
+        out["avg_batch"] = round(st["commands"] / st["batches"], 1) if st["batches"] else 0
+        out["max_batch"] = st["max_batch"]
+        await part.actor.aclose()
+    part.persistence._buffer.clear()
+    return out
+
+def main():
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    n_handlers = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    per_handler = int(sys.argv[4]) if len(sys.argv) > 4 else 40
+    burst = make_burst([str(100000000000000000 + i) for i in range(n_users)], n_handlers, per_handler, seed=7)
+    for mode in ("direct", "actor"):
+        # 모드마다 같은 초기 상태에서 시작
+        data = make_guild(n_users, n_days)
+        row = asyncio.run(run_mode(mode, data, burst))
+        print(json.dumps({"size": f"{n_users}x{n_days}", "handlers": n_handlers, **row}, ensure_ascii=False),
+              flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# 오프라인 재계산(백필) 벤치마크: 가상 메시지 로그 → NumPy 경로 vs 순수 파이썬 경로
+#   python benchmarks/bench_backfill.py [메시지수] [사용자수] [일수]
+# 로그는 !PP메시지로그와 같은 JSONL.gz로 써서 읽기(read_message_log) 시간도 함께 잼
+# 앞부분 일부는 온라인 경로(add_activity_logic 한 건씩) 재생 결과와 일치하는지 검사
+
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import datetime
+
+from synthetic import bot
+
+def make_log(n_messages: int, n_users: int, n_days: int, seed: int = 7) -> "bot.MessageLog":
+    """점수 채널 + 비점수 채널 메시지, 링크/첨부/이미지/!출근 여부를 섞은 로그"""
+    rng = random.Random(seed)
+    cfg = bot.GuildConfig.home()
+    channels = list(cfg.channel_points) + [1]   # 1 = 점수 없는 채널
+    end = datetime.datetime.now(bot.KST).timestamp()
+    start = end - n_days * 86400
+    log = bot.MessageLog()
+    for _ in range(n_messages):
+        flags = 0
+        r = rng.random()
+        if r < 0.3:
+            flags |= bot.LOG_ATTACH | bot.LOG_IMAGE
+        elif r < 0.4:
+            flags |= bot.LOG_ATTACH
+        elif r < 0.55:
+            flags |= bot.LOG_LINK
+        if rng.random() < 0.05:
+            flags |= bot.LOG_CHECKIN
+        log.append(100000000000000000 + rng.randrange(n_users), rng.choice(channels),
+                   rng.uniform(start, end), flags)
+    return log
+
+def write_log(log: "bot.MessageLog", path: str):
+    """MessageLog → 백필 입력 JSONL.gz(message_log_record와 같은 키)"""
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for author, channel, ts, flags in zip(log.author, log.channel, log.ts, log.flags):
+            f.write(json.dumps({
+                "author": author, "channel": channel, "ts": ts,
+                "has_link": bool(flags & bot.LOG_LINK), "has_attachment": bool(flags & bot.LOG_ATTACH),
+                "has_image": bool(flags & bot.LOG_IMAGE), "checkin": bool(flags & bot.LOG_CHECKIN),
+            }) + "\n")
+
+def head(log: "bot.MessageLog", n: int) -> "bot.MessageLog":
+    sub = bot.MessageLog()
+    for i in range(min(n, len(log))):
+        sub.append(log.author[i], log.channel[i], log.ts[i], log.flags[i])
+    return sub
+
+def run(n_messages: int, n_users: int, n_days: int) -> dict:
+    cfg = bot.GuildConfig.home()
+    t0 = time.perf_counter()
+    log = make_log(n_messages, n_users, n_days)
+    result = {"messages": n_messages, "users": n_users, "days": n_days,
+              "generate_sec": round(time.perf_counter() - t0, 3)}
+
+    path = os.path.join(os.environ["DATA_DIR"], "bench_messages.jsonl.gz")
+    write_log(log, path)
+    t0 = time.perf_counter()
+    parsed = bot.read_message_log(path)
+    result["read_sec"] = round(time.perf_counter() - t0, 3)
+    result["read_parser"] = "orjson" if bot.orjson is not None else "json"
+    result["read_matches"] = all(getattr(parsed, c) == getattr(log, c) for c in ("author", "channel", "day", "flags"))
+    log = parsed
+    os.remove(path)
+
+    t0 = time.perf_counter()
+    py = bot.backfill_store({"users": {}}, log, cfg, use_numpy=False)
+    result["python_sec"] = round(time.perf_counter() - t0, 3)
+    if bot.np is not None:
+        t0 = time.perf_counter()
+        vec = bot.backfill_store({"users": {}}, log, cfg, use_numpy=True)
+        result["numpy_sec"] = round(time.perf_counter() - t0, 3)
+        result["speedup"] = round(result["python_sec"] / result["numpy_sec"], 2) if result["numpy_sec"] else None
+        result["numpy_matches_python"] = vec == py
+    else:
+        result["numpy_sec"] = None
+    result["end_to_end_sec"] = round(result["read_sec"] + (result["numpy_sec"] or result["python_sec"]), 3)
+
+    sample = head(log, 50000)
+    t0 = time.perf_counter()
+    diffs = bot.validate_backfill(sample, cfg)
+    result["validate"] = {"messages": len(sample), "mismatches": len(diffs),
+                          "sec": round(time.perf_counter() - t0, 3)}
+    return result
+
+if __name__ == "__main__":
+    n_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    n_users = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    n_days = int(sys.argv[3]) if len(sys.argv) > 3 else 365
+    print(json.dumps(run(n_messages, n_users, n_days), ensure_ascii=False))
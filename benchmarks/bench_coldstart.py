@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# 콜드 스타트 벤치마크: JSON 스냅샷(로딩 + 누계 재계산) vs 바이너리 스냅샷(인덱스만 읽기)
+#   python benchmarks/bench_coldstart.py [사용자수] [일수]
+# 각 방식은 새 프로세스에서 재서 import/페이지 캐시 외의 영향을 줄임
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+from synthetic import bot, make_guild
+
+PROBE = r"""
+import sys, json, time
+sys.path.insert(0, {root!r})
+import bot_v5_final as bot
+mode, path = sys.argv[1], sys.argv[2]
+t0 = time.perf_counter()
+totals = bot.ActivityTotals()
+if mode == "binary":
+    data = bot.open_snapshot(path, totals)
+else:
+    data = bot.state_from_json(bot.load_data(path))
+    totals.rebuild(data)
+ready = time.perf_counter() - t0
+uid = sys.argv[3]
+t1 = time.perf_counter()
+bot.ensure_user(data, uid)
+first = time.perf_counter() - t1
+print(json.dumps({{"ready_sec": round(ready, 4), "first_user_ms": round(first * 1000, 3)}}))
+"""
+
+def probe(mode: str, path: str, uid: str) -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(root=root), mode, path, uid],
+        check=True, capture_output=True, text=True, env=os.environ,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def run(n_users: int, n_days: int) -> dict:
+    data = make_guild(n_users, n_days)
+    uid = next(iter(data["users"]))
+    base = os.environ["DATA_DIR"]
+    paths = {
+        "json_indent": os.path.join(base, "cold_indent.json"),
+        "json_compact": os.path.join(base, "cold_compact.json"),
+        "binary": os.path.join(base, "cold.snap"),
+    }
+    with open(paths["json_indent"], "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    bot.write_atomic(bot.serialize_data(data), paths["json_compact"])
+    bot.state_from_json(data)
+    t0 = time.perf_counter()
+    bot.write_atomic(bot.encode_snapshot(data), paths["binary"])
+    encode_sec = time.perf_counter() - t0
+    result = {"users": n_users, "days": n_days, "binary_encode_sec": round(encode_sec, 4)}
+    for name, path in paths.items():
+        r = probe("binary" if name == "binary" else "json", path, uid)
+        result[name] = {"bytes": os.path.getsize(path), **r}
+    return result
+
+if __name__ == "__main__":
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    print(json.dumps(run(n_users, n_days), ensure_ascii=False))
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# 점수 반영/보고서 핫패스 벤치마크 (결과는 JSON 한 줄씩)
+#   python benchmarks/bench_hotpaths.py --sizes 1000x365,10000x365,50000x365
+#
+# 각 항목: ops/s, p50/p99 지연(ms), 프로세스 최대 RSS(MB)
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import resource
+import tempfile
+
+from synthetic import bot, make_guild
+from fakes import FakeAttachment, FakeChannel, FakeContext, FakeGuild, FakeMember, FakeMessage
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 bytes, Linux는 KB
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def summarize(name: str, size: str, samples: list) -> dict:
+    samples = sorted(samples)
+    n = len(samples)
+    total = sum(samples)
+    return {
+        "bench": name,
+        "size": size,
+        "n": n,
+        "ops_per_sec": round(n / total, 1) if total else None,
+        "p50_ms": round(samples[n // 2] * 1000, 4),
+        "p99_ms": round(samples[min(n - 1, int(n * 0.99))] * 1000, 4),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def time_sync(fn, n: int) -> list:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+async def time_async(fn, n: int) -> list:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+def install(data: dict):
+    """홈 길드 파티션 상태를 가상 길드로 교체(data의 사용자 기록은 제자리에서 CompactUser로)"""
+    bot.partitions.load()
+    part = bot.partitions.get(bot.HOME_GUILD_ID)
+    part.data = bot.state_from_json(data)
+    part.totals.rebuild(data, datetime.datetime.now(bot.KST).date())
+    part.cap_cache.clear()
+    part.persistence._buffer.clear()
+    return part
+
+async def no_commands(message):
+    return None
+
+async def run_size(n_users: int, n_days: int, iters: int, seed: int) -> list:
+    size = f"{n_users}x{n_days}"
+    rng = random.Random(seed)
+    data = make_guild(n_users, n_days, seed=seed)
+    uids = list(data["users"])
+    part = install(data)
+    results = []
+    today = datetime.datetime.now(bot.KST).date()
+    today_ds = bot.logical_date_str_from_now()
+    channels = list(bot.CHANNEL_POINTS)
+
+    # --- 순수 함수 ---
+    scratch = {"users": {}}
+    results.append(summarize("add_activity_logic", size, time_sync(
+        lambda: bot.add_activity_logic(scratch, rng.choice(uids), today_ds, rng.choice(channels), bot.CHANNEL_POINTS),
+        iters)))
+    results.append(summarize("weekly_total_for_user", size, time_sync(
+        lambda: bot.weekly_total_for_user(data, rng.choice(uids), today), iters)))
+    results.append(summarize("totals.week_total", size, time_sync(
+        lambda: part.totals.week_total(rng.choice(uids), today), iters)))
+    results.append(summarize("get_week_progress", size, time_sync(
+        lambda: bot.get_week_progress(data, rng.choice(uids), today), iters)))
+    results.append(summarize("get_month_grid_7x4", size, time_sync(
+        lambda: bot.get_month_grid_7x4(data, rng.choice(uids), today), iters)))
+    results.append(summarize("all_users_week_total", size, time_sync(
+        lambda: bot.all_users_week_total(data, today), max(1, iters // 200))))
+    with tempfile.TemporaryDirectory() as d:
+        path = f"{d}/data.json"
+        results.append(summarize("save_data", size, time_sync(
+            lambda: bot.save_data(data, path), max(1, iters // 500))))
+
+    # --- 핸들러(가짜 discord 객체) ---
+    guild = FakeGuild()
+    members = [FakeMember(int(uid), guild=guild) for uid in uids]
+    for m in members:
+        guild.members[m.id] = m
+    chans = {cid: FakeChannel(cid) for cid in channels + [1]}
+    bot.bot.process_commands = no_commands
+
+    def make_message():
+        cid = rng.choice(list(chans))
+        conf = bot.CHANNEL_POINTS.get(cid, {})
+        attach = [FakeAttachment()] if conf.get("image_only") else []
+        return FakeMessage(rng.choice(members), chans[cid], "hello https://example.com", attach, guild)
+
+    async def one_message():
+        await bot.on_message(make_message())
+
+    async def one_check_in():
+        await bot.check_in.callback(FakeContext(rng.choice(members), guild))
+
+    admin = FakeMember(1, admin=True, guild=guild)
+
+    async def one_report():
+        await bot.cmd_pp_report.callback(FakeContext(admin, guild), "주간")
+
+    results.append(summarize("on_message", size, await time_async(one_message, iters)))
+    results.append(summarize("check_in", size, await time_async(one_check_in, iters)))
+    results.append(summarize("cmd_pp_report", size, await time_async(one_report, max(1, iters // 200))))
+    # outbox가 시작되지 않았으면 DM은 개별 태스크로 흘러가므로 마저 비움
+    await asyncio.sleep(0)
+    part.persistence._buffer.clear()
+    return results
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000x365", help="사용자수x일수, 쉼표로 여러 개")
+    ap.add_argument("--iters", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    for spec in args.sizes.split(","):
+        n_users, n_days = (int(x) for x in spec.lower().split("x"))
+        for row in asyncio.run(run_size(n_users, n_days, args.iters, args.seed)):
+            print(json.dumps(row, ensure_ascii=False), flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# 메모리 벤치마크: 사용자 기록 레이아웃 비교
+#   - dict: data.json 스키마 그대로(날짜별 dict, 예전 메모리 모델)
+#   - compact: 같은 내용을 CompactUser(배열/비트셋)로 — 지금 메모리 모델, JSON 스냅샷으로 시작했을 때
+#   - lazy: 바이너리 스냅샷을 연 직후(LazyUsers, 인덱스만 메모리에)
+#   - lazy_touched: 그중 일부 사용자(기본 10%)를 읽은 뒤
+#   - lazy_scanned: 전체 순회(items, 내보내기/누계 재계산과 같은 경로)를 한 번 한 뒤 — 읽은 사용자만 남아야 함
+#   python benchmarks/bench_memory.py [사용자수] [일수] [읽을 비율]
+
+import gc
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+from synthetic import bot, make_guild
+
+def measure(build):
+    """build()가 만든 객체가 붙잡고 있는 메모리(bytes)와 소요 시간"""
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+def run(n_users: int, n_days: int, touch_ratio: float) -> dict:
+    data = make_guild(n_users, n_days)
+    text = json.dumps(data, ensure_ascii=False)
+    snap_path = os.path.join(os.environ["DATA_DIR"], "memory.snap")
+    bot.write_atomic(bot.encode_snapshot(bot.state_from_json(data)), snap_path)
+    uids = list(data["users"])[::max(1, round(1 / touch_ratio))] if touch_ratio > 0 else []
+    del data
+
+    _, dict_bytes, dict_sec = measure(lambda: json.loads(text))
+    _, compact_bytes, compact_sec = measure(lambda: bot.state_from_json(json.loads(text)))
+
+    def touched():
+        snap = bot.open_snapshot(snap_path)
+        for uid in uids:
+            snap["users"][uid]
+        return snap
+
+    def scanned():
+        snap = touched()
+        for _ in snap["users"].items():
+            pass
+        return snap
+    _, lazy_bytes, lazy_sec = measure(lambda: bot.open_snapshot(snap_path))
+    _, touched_bytes, touched_sec = measure(touched)
+    _, scanned_bytes, scanned_sec = measure(scanned)
+    return {
+        "users": n_users,
+        "days": n_days,
+        "json_bytes": len(text.encode("utf-8")),
+        "snap_bytes": os.path.getsize(snap_path),
+        "dict_bytes": dict_bytes,
+        "dict_load_sec": round(dict_sec, 4),
+        "compact_bytes": compact_bytes,
+        "compact_load_sec": round(compact_sec, 4),
+        "lazy_bytes": lazy_bytes,
+        "lazy_open_sec": round(lazy_sec, 4),
+        "touched_users": len(uids),
+        "lazy_touched_bytes": touched_bytes,
+        "lazy_touched_sec": round(touched_sec, 4),
+        "lazy_scanned_bytes": scanned_bytes,
+        "lazy_scanned_sec": round(scanned_sec, 4),
+        "ratio_compact": round(dict_bytes / max(compact_bytes, 1), 2),
+        "ratio_lazy": round(dict_bytes / max(lazy_bytes, 1), 2),
+        "ratio_touched": round(dict_bytes / max(touched_bytes, 1), 2),
+    }
+
+if __name__ == "__main__":
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    touch_ratio = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    print(json.dumps(run(n_users, n_days, touch_ratio), ensure_ascii=False))
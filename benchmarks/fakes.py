@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# 네트워크 없이 핸들러를 돌리기 위한 가짜 discord 객체들
+
+import itertools
+
+_ids = itertools.count(900000000000000000)
+
+class FakePermissions:
+    def __init__(self, manage_guild: bool = False):
+        self.manage_guild = manage_guild
+
+class FakeMember:
+    def __init__(self, uid: int, name: str | None = None, admin: bool = False, guild=None):
+        self.id = uid
+        self.bot = False
+        self.name = name or f"user{uid % 100000}"
+        self.display_name = self.name
+        self.guild = guild
+        self.guild_permissions = FakePermissions(admin)
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+class FakeGuild:
+    def __init__(self, gid: int = 1310854848442269767):
+        self.id = gid
+        self.members: dict = {}
+
+    def get_member(self, uid: int):
+        return self.members.get(uid)
+
+    async def fetch_member(self, uid: int):
+        member = self.members.get(uid)
+        if member is None:
+            member = self.members[uid] = FakeMember(uid, guild=self)
+        return member
+
+class FakeChannel:
+    def __init__(self, cid: int):
+        self.id = cid
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+class FakeAttachment:
+    def __init__(self, content_type: str = "image/png"):
+        self.content_type = content_type
+
+class FakeMessage:
+    def __init__(self, author: FakeMember, channel: FakeChannel, content: str = "",
+                 attachments: list | None = None, guild: FakeGuild | None = None):
+        self.id = next(_ids)
+        self.author = author
+        self.channel = channel
+        self.content = content
+        self.attachments = attachments or []
+        self.guild = guild
+
+class FakeContext:
+    def __init__(self, author: FakeMember, guild: FakeGuild, channel: FakeChannel | None = None):
+        self.author = author
+        self.guild = guild
+        self.channel = channel or FakeChannel(next(_ids))
+        self.replies = 0
+
+    async def reply(self, content=None, **kwargs):
+        self.replies += 1
+
+    async def send(self, content=None, **kwargs):
+        self.replies += 1
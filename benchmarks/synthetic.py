@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# 벤치마크용 가상 길드 데이터 생성기 (실제 data.json 스키마 그대로)
+#   python benchmarks/synthetic.py 1000 365 > data.json
+
+import os
+import sys
+import json
+import random
+import datetime
+import tempfile
+
+# 봇 모듈은 import 시 DATA_DIR에 폴더를 만들고 data.json을 읽으므로 임시 폴더로 돌림
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="dulgi-bench-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot_v5_final as bot  # noqa: E402
+
+def make_guild(n_users: int, n_days: int, seed: int = 42,
+               active_ratio: float = 0.35, end: datetime.date | None = None) -> dict:
+    """n_users명 × n_days일 활동 기록. 하루 활동 확률 active_ratio,
+    채널별 점수는 CHANNEL_POINTS의 일일 상한 이내"""
+    rng = random.Random(seed)
+    end = end or datetime.date.today()
+    days = [(end - datetime.timedelta(days=n_days - 1 - i)) for i in range(n_days)]
+    channels = list(bot.CHANNEL_POINTS.items())
+    users = {}
+    for n in range(n_users):
+        uid = str(100000000000000000 + n)
+        engagement = rng.random()
+        activity, attendance, notified = {}, [], {}
+        for d in days:
+            if rng.random() > active_ratio * (0.5 + engagement):
+                continue
+            ds = d.isoformat()
+            by_channel = {}
+            for cid, conf in channels:
+                if rng.random() < 0.4:
+                    hits = rng.randint(1, max(1, conf["daily_max"] // conf["points"]))
+                    by_channel[str(cid)] = min(conf["daily_max"], hits * conf["points"])
+            if not by_channel:
+                continue
+            total = sum(by_channel.values())
+            activity[ds] = {"total": total, "by_channel": by_channel}
+            if str(1423359791287242782) in by_channel:
+                attendance.append(ds)
+            if total >= bot.DAILY_GOAL_POINTS:
+                notified[f"daily_{ds}"] = True
+        users[uid] = {
+            "attendance": attendance,
+            "activity": activity,
+            "notified": notified,
+            "level": 1,
+            "exp": 0,
+            "rank_title": None,
+            "badges": [],
+        }
+    return {"users": users}
+
+if __name__ == "__main__":
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    json.dump(make_guild(n_users, n_days), sys.stdout, ensure_ascii=False)
@@ -1,513 +1,4213 @@
-# -*- coding: utf-8 -*-
-# 둘기봇 v5.5.1 — Progress System + DM Button + Safe Backup (Render Starter Ready)
-# 변경점:
-# - !출근 실행 시 출근 처리 + 개인 보고서(월간 제외) DM 동시 발송
-# - !보고서 실행 시 개인 보고서(주간 + 월간 7x4) DM 발송
-# - 하루 10점/주간 50점 달성 시 축하 DM (중복 방지)
-# - 타일(🟩/⬜) 기준: 하루 누적 점수 >= DAILY_GOAL_POINTS (기본 10)
-# - 기존 기능(백업/복원/자동백업/관리자 리포트/데이터 영구 저장) 유지
-
-import os
-import io
-import csv
-import json
-import random
-import asyncio
-import datetime
-import pytz
-import aiohttp
-from typing import Dict, Tuple, List
-from flask import Flask
-from threading import Thread
-
-import discord
-from discord.ext import commands
-from discord.ui import View, Button
-
-# ========= 기본 설정 =========
-KST = pytz.timezone("Asia/Seoul")
-
-# Persistent Disk 경로 (Render Starter 플랜)
-BASE_PATH = "/opt/render/project/data"
-os.makedirs(BASE_PATH, exist_ok=True)
-DATA_FILE = os.path.join(BASE_PATH, "data.json")
-BACKUP_FILE = os.path.join(BASE_PATH, "data_backup.json")
-
-# (초기 1회) 구버전 위치에서 마이그레이션
-OLD_DATA_FILE = "/opt/render/project/src/data.json"
-if os.path.exists(OLD_DATA_FILE) and not os.path.exists(DATA_FILE):
-    try:
-        os.system(f"cp {OLD_DATA_FILE} {DATA_FILE}")
-        print("✅ 이전 data.json을 Disk로 자동 마이그레이션 완료.")
-    except Exception as e:
-        print("⚠️ 마이그레이션 실패:", e)
-
-# 서버 버튼 링크(서버로 돌아가기)
-SERVER_URL = "https://discord.com/channels/1310854848442269767"
-
-# 백업 업로드 채널(필요시 교체)
-BACKUP_CHANNEL_ID = 1427608696547967026  # 🔧 실제 백업 채널 ID로 교체하세요
-
-# 채널 점수 체계
-CHANNEL_POINTS = {
-    1423170386811682908: {"name": "일일-그림보고", "points": 6, "daily_max": 6, "image_only": True},
-    1423172691724079145: {"name": "자유채팅판", "points": 1, "daily_max": 4, "image_only": False},
-    1423359059566006272: {"name": "정보-공모전", "points": 1, "daily_max": 1, "image_only": False},
-    1423170949477568623: {"name": "정보-그림꿀팁", "points": 1, "daily_max": 1, "image_only": False},
-    1423242322665148531: {"name": "고민상담", "points": 1, "daily_max": 1, "image_only": False},
-    1423359791287242782: {"name": "출퇴근기록", "points": 4, "daily_max": 4, "image_only": False},
-    1423171509752434790: {"name": "다-그렸어요", "points": 5, "daily_max": 5, "image_only": True},  # 이미지 또는 링크 허용
-}
-
-# 우수 기준(기존 주간 60/월간 200 유지 + 신규 알림: 하루 10 / 주간 50)
-WEEKLY_BEST_THRESHOLD = 60
-MONTHLY_BEST_THRESHOLD = 200
-DAILY_GOAL_POINTS = 10   # 🟩 타일 기준 & '하루 목표 달성' DM 기준
-WEEK_GOAL_POINTS = 50    # '이주의 우수사원' DM 기준
-
-# ========= 데이터 유틸 =========
-def load_data(path: str = DATA_FILE) -> dict:
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def save_data(data: dict, path: str = DATA_FILE):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-def ensure_user(data: dict, uid: str):
-    """향후 확장 대비 기본 구조 보장"""
-    if "users" not in data:
-        data["users"] = {}
-    if uid not in data["users"]:
-        data["users"][uid] = {}
-    user = data["users"][uid]
-    user.setdefault("attendance", [])
-    user.setdefault("activity", {})
-    user.setdefault("notified", {})  # 축하 알림 기록
-    # 미래 확장(레벨/뱃지 등)
-    user.setdefault("level", 1)
-    user.setdefault("exp", 0)
-    user.setdefault("rank_title", None)
-    user.setdefault("badges", [])
-    data["users"][uid] = user
-
-def logical_date_str_from_now() -> str:
-    """한국시간 오전 6시를 하루 경계로 사용하는 '논리적 날짜' 문자열"""
-    now = datetime.datetime.now(KST)
-    logical = now - datetime.timedelta(hours=6)
-    return logical.strftime("%Y-%m-%d")
-
-def get_week_range(d: datetime.date) -> Tuple[datetime.date, datetime.date]:
-    start = d - datetime.timedelta(days=d.weekday())
-    end = start + datetime.timedelta(days=6)
-    return start, end
-
-def week_key(d: datetime.date) -> str:
-    y, w, _ = d.isocalendar()
-    return f"{y}-W{w:02d}"
-
-def add_activity_logic(
-    data: dict,
-    uid: str,
-    date_str: str,
-    channel_id: int,
-    channel_points_map: Dict[int, dict]
-) -> bool:
-    """일자/채널별 점수 반영(채널 일일 상한 준수)"""
-    ensure_user(data, uid)
-    conf = channel_points_map.get(channel_id)
-    if not conf:
-        return False
-    points, ch_max = conf["points"], conf["daily_max"]
-    user = data["users"][uid]
-    if date_str not in user["activity"]:
-        user["activity"][date_str] = {"total": 0, "by_channel": {}}
-    today_rec = user["activity"][date_str]
-    ckey = str(channel_id)
-    prev = today_rec["by_channel"].get(ckey, 0)
-    if prev + points > ch_max:
-        return False
-    today_rec["by_channel"][ckey] = prev + points
-    today_rec["total"] += points
-    return True
-
-# ========= 시각화 =========
-def get_week_progress(data: dict, uid: str, ref_date: datetime.date, daily_goal: int = DAILY_GOAL_POINTS) -> str:
-    start, _ = get_week_range(ref_date)
-    labels = ["월 ", "화 ", "수 ", "목 ", "금 ", "토 ", "일"]
-    blocks = []
-    cur = start
-    for _ in range(7):
-        ds = cur.strftime("%Y-%m-%d")
-        pts = data["users"][uid]["activity"].get(ds, {}).get("total", 0)
-        blocks.append("🟩" if pts >= daily_goal else "⬜")
-        cur += datetime.timedelta(days=1)
-    return " ".join(labels) + "\n" + " ".join(blocks)
-
-def get_month_grid_7x4(data: dict, uid: str, ref_date: datetime.date, daily_goal: int = DAILY_GOAL_POINTS) -> str:
-    """월간 7x4 타일(1~28일)"""
-    first = ref_date.replace(day=1)
-    cells = []
-    for day in range(1, 29):
-        ds = first.replace(day=day).strftime("%Y-%m-%d")
-        pts = data["users"][uid]["activity"].get(ds, {}).get("total", 0)
-        cells.append("🟩" if pts >= daily_goal else "⬜")
-    rows = [" ".join(cells[r*7:(r+1)*7]) for r in range(4)]
-    return "월간 활동 (1~28일 기준)\n" + "\n".join(rows)
-
-# ========= 합계 계산 =========
-def weekly_total_for_user(data: dict, uid: str, ref_date: datetime.date) -> int:
-    ensure_user(data, uid)
-    start, end = get_week_range(ref_date)
-    return sum(
-        rec.get("total", 0)
-        for ds, rec in data["users"][uid]["activity"].items()
-        if start <= datetime.datetime.strptime(ds, "%Y-%m-%d").date() <= end
-    )
-
-def monthly_total_for_user(data: dict, uid: str, year: int, month: int) -> int:
-    ensure_user(data, uid)
-    prefix = f"{year:04d}-{month:02d}"
-    return sum(
-        rec.get("total", 0)
-        for ds, rec in data["users"][uid]["activity"].items()
-        if ds.startswith(prefix)
-    )
-
-def all_users_week_total(data: dict, ref_date: datetime.date) -> List[Tuple[str, int]]:
-    ret = []
-    for uid in data.get("users", {}):
-        ret.append((uid, weekly_total_for_user(data, uid, ref_date)))
-    ret.sort(key=lambda x: x[1], reverse=True)
-    return ret
-
-def all_users_month_total(data: dict, year: int, month: int) -> List[Tuple[str, int]]:
-    ret = []
-    for uid in data.get("users", {}):
-        ret.append((uid, monthly_total_for_user(data, uid, year, month)))
-    ret.sort(key=lambda x: x[1], reverse=True)
-    return ret
-
-# ========= Discord & Flask =========
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-bot = commands.Bot(command_prefix="!", intents=intents)
-
-data_store = load_data()
-
-app = Flask(__name__)
-@app.route("/")
-def home():
-    return "Bot is alive!"
-def run_flask():
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "8080")))
-def keep_alive():
-    Thread(target=run_flask, daemon=True).start()
-
-def is_admin(member: discord.Member) -> bool:
-    try:
-        return member.guild_permissions.manage_guild
-    except Exception:
-        return False
-
-@bot.event
-async def on_ready():
-    print(f"✅ 로그인 완료: {bot.user}")
-    keep_alive()
-    bot.backup_task = asyncio.create_task(schedule_daily_backup_loop())
-
-# ========= 공용 보고서 발송 함수 =========
-async def send_personal_report(user: discord.User | discord.Member, include_month: bool = True):
-    uid = str(user.id)
-    today = datetime.datetime.now(KST).date()
-    ensure_user(data_store, uid)
-    user_data = data_store["users"][uid]
-
-    today_str = logical_date_str_from_now()
-    today_checked = "O" if today_str in user_data["attendance"] else "X"
-    weekly_total = weekly_total_for_user(data_store, uid, today)
-
-    week_map = get_week_progress(data_store, uid, today)
-
-    # 기본(주간) 블록
-    display_name = getattr(user, "display_name", None) or getattr(user, "name", "사용자")
-    msg = (
-        f"🌼 {display_name}님의 이번 주 활동 요약\n\n"
-        f"오늘 출석 여부 : {today_checked}\n"
-        f"이번주 획득 점수 : {weekly_total}점\n\n"
-        f"📊 주간 활동:\n{week_map}"
-    )
-
-    # 월간 타일은 옵션
-    if include_month:
-        month_map = get_month_grid_7x4(data_store, uid, today)
-        msg += f"\n\n{month_map}"
-
-    server_button = Button(label="서버로 돌아가기 🏠", url=SERVER_URL)
-    view = View(); view.add_item(server_button)
-    await user.send(msg, view=view)
-
-# ========= 출근 =========
-@bot.command(name="출근")
-async def check_in(ctx):
-    uid = str(ctx.author.id)
-    today_ds = logical_date_str_from_now()
-    ensure_user(data_store, uid)
-    user = data_store["users"][uid]
-
-    if today_ds in user["attendance"]:
-        server_button = Button(label="서버로 돌아가기 🏠", url=SERVER_URL)
-        view = View(); view.add_item(server_button)
-        return await ctx.author.send("이미 출근 완료 🕐\n매일 오전 6시에 초기화됩니다.", view=view)
-
-    # 출근 기록 + 점수(+4) 반영
-    user["attendance"].append(today_ds)
-    add_activity_logic(data_store, uid, today_ds, 1423359791287242782, CHANNEL_POINTS)
-    save_data(data_store)
-
-    # 출근 완료 안내
-    await ctx.author.send("✅ 출근 완료! (+4점) 오늘도 힘내요!")
-
-    # 출근 후 개인 보고서(월간 제외) 자동 발송
-    await send_personal_report(ctx.author, include_month=False)
-
-# ========= 메시지 감지(점수 반영 + 목표 달성 DM) =========
-@bot.event
-async def on_message(message: discord.Message):
-    if message.author.bot:
-        return
-
-    cid = message.channel.id
-    uid = str(message.author.id)
-    today_ds = logical_date_str_from_now()
-    ensure_user(data_store, uid)
-
-    conf = CHANNEL_POINTS.get(cid)
-    if conf is None:
-        await bot.process_commands(message)
-        return
-
-    # 특수 채널: '다-그렸어요' = 링크 or 첨부파일(이미지/기타) 허용
-    countable = True
-    if cid == 1423171509752434790:
-        has_link = "http://" in message.content or "https://" in message.content or "http" in message.content
-        has_attach = len(message.attachments) > 0
-        countable = has_link or has_attach
-    else:
-        if conf.get("image_only"):
-            countable = any(a.content_type and a.content_type.startswith("image/") for a in message.attachments)
-
-    if not countable:
-        await bot.process_commands(message)
-        return
-
-    added = add_activity_logic(data_store, uid, today_ds, cid, CHANNEL_POINTS)
-    if added:
-        save_data(data_store)
-
-        # === 목표 달성 축하 DM ===
-        try:
-            user_data = data_store["users"][uid]
-            # 오늘 합계
-            today_total = user_data["activity"][today_ds]["total"]
-            # 주간 합계
-            today = datetime.datetime.now(KST).date()
-            w_total = weekly_total_for_user(data_store, uid, today)
-            # 알림 중복 방지 키
-            notified = user_data.setdefault("notified", {})
-            daily_key = f"daily_{today_ds}"
-            weekly_key = f"weekly_{week_key(today)}"
-
-            # 하루 10점 달성
-            if today_total >= DAILY_GOAL_POINTS and not notified.get(daily_key):
-                week_map = get_week_progress(data_store, uid, today)
-                dm = (
-                    f"🌞 오늘 하루 목표({DAILY_GOAL_POINTS}점) 달성! 정말 수고했어요.\n"
-                    f"내일도 꾸준히 채워나가봐요 💪\n\n"
-                    f"📊 주간 활동:\n{week_map}"
-                )
-                await message.author.send(dm)
-                notified[daily_key] = True
-
-            # 주간 50점 달성
-            if w_total >= WEEK_GOAL_POINTS and not notified.get(weekly_key):
-                dm = (
-                    f"🏆 이번 주 {w_total}점 달성! 이주의 우수사원이에요!\n"
-                    f"다음 주도 잘 부탁드려요 ☀️"
-                )
-                await message.author.send(dm)
-                notified[weekly_key] = True
-
-            save_data(data_store)
-        except Exception:
-            pass
-
-    await bot.process_commands(message)
-
-# ========= 보고서(개인) =========
-@bot.command(name="보고서")
-async def report(ctx):
-    await send_personal_report(ctx.author, include_month=True)
-
-# ========= 백업/복원 =========
-def backup_now() -> bool:
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            data = f.read()
-        with open(BACKUP_FILE, "w", encoding="utf-8") as f:
-            f.write(data)
-        return True
-    return False
-
-@bot.command(name="백업")
-async def cmd_backup(ctx):
-    if not is_admin(ctx.author):
-        return await ctx.reply("관리자만 가능해요.")
-    ok = backup_now()
-    if ok:
-        await ctx.reply("✅ 백업 완료! 백업 파일 업로드 중...")
-        try:
-            ch = bot.get_channel(BACKUP_CHANNEL_ID)
-            if ch:
-                await ch.send(
-                    f"📦 [{datetime.datetime.now(KST).strftime('%Y-%m-%d %H:%M')}] 자동 백업 파일입니다.",
-                    file=discord.File(BACKUP_FILE)
-                )
-        except Exception as e:
-            await ctx.reply(f"⚠️ 업로드 중 오류: {e}")
-    else:
-        await ctx.reply("⚠️ 백업 실패")
-
-@bot.command(name="PP복원")
-async def cmd_restore_from_link(ctx, file_url: str = None):
-    if not is_admin(ctx.author):
-        return await ctx.reply("관리자만 가능해요.")
-    if not file_url:
-        return await ctx.reply("사용법: `!PP복원 [백업파일 링크]`")
-    if not (file_url.startswith("https://cdn.discordapp.com/") or file_url.startswith("https://media.discordapp.net/")):
-        return await ctx.reply("⚠️ Discord 업로드 링크만 허용돼요!")
-
-    try:
-        async with aiohttp.ClientSession() as s:
-            async with s.get(file_url) as r:
-                if r.status != 200:
-                    return await ctx.reply("⚠️ 파일 불러오기 실패")
-                text = await r.text()
-        data_json = json.loads(text)
-        if "users" not in data_json:
-            return await ctx.reply("⚠️ 잘못된 JSON 구조")
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(data_json, f, ensure_ascii=False, indent=4)
-        global data_store
-        data_store = data_json
-        await ctx.reply("✅ 복원 완료! 기존 데이터 갱신됨")
-    except Exception as e:
-        await ctx.reply(f"⚠️ 복원 중 오류: {e}")
-
-# ========= 자동 백업 루프 =========
-async def schedule_daily_backup_loop():
-    # 매일 06:00 KST
-    while True:
-        now = datetime.datetime.now(KST)
-        next_backup = now.replace(hour=6, minute=0, second=0, microsecond=0)
-        if next_backup < now:
-            next_backup += datetime.timedelta(days=1)
-        await asyncio.sleep((next_backup - now).total_seconds())
-        if backup_now():
-            print("✅ Daily backup completed at 06:00 KST")
-            try:
-                ch = bot.get_channel(BACKUP_CHANNEL_ID)
-                if ch:
-                    await ch.send(
-                        f"☀️ [{datetime.datetime.now(KST).strftime('%Y-%m-%d %H:%M')}] 오전 6시 자동 백업 완료!",
-                        file=discord.File(BACKUP_FILE)
-                    )
-            except Exception as e:
-                print("⚠️ 자동 백업 업로드 실패:", e)
-
-# ========= 관리자 보고서 =========
-@bot.command(name="PP보고서")
-async def cmd_pp_report(ctx, 기간: str = None, *args):
-    if not is_admin(ctx.author):
-        return await ctx.reply("관리자만 가능해요.")
-    if 기간 not in ("주간", "월간"):
-        return await ctx.reply("사용법: `!PP보고서 주간` 또는 `!PP보고서 월간 N월`")
-
-    today = datetime.datetime.now(KST).date()
-
-    # --- 주간 보고서 ---
-    if 기간 == "주간":
-        pairs = all_users_week_total(data_store, today)
-        csv_buf = io.StringIO()
-        w = csv.writer(csv_buf)
-        w.writerow(["닉네임", "ID", "주간점수"])
-        text_lines = ["📊 **이번 주 상위 20명**", "```"]
-
-        for i, (uid, sc) in enumerate(pairs[:20], start=1):
-            try:
-                member = await ctx.guild.fetch_member(int(uid))
-                name = member.display_name
-            except:
-                name = uid
-            w.writerow([name, uid, sc])
-            text_lines.append(f"{i:>2}. {name:<20} | {sc:>4}점")
-
-        text_lines.append("```")
-
-        csv_bytes = io.BytesIO(csv_buf.getvalue().encode("utf-8"))
-        start, end = get_week_range(today)
-        header = f"📊 이번주 활동 순위 ({start.month}월 {start.day}일 ~ {end.month}월 {end.day}일)"
-        await ctx.reply(
-            header,
-            file=discord.File(csv_bytes, f"weekly_report_{today.year}-W{today.isocalendar()[1]:02d}.csv"),
-        )
-        await ctx.send("\n".join(text_lines))
-        return
-
-    # --- 월간 보고서 ---
-    if 기간 == "월간":
-        target_year, target_month = today.year, today.month
-        if args and len(args) >= 1:
-            try:
-                target_month = int(args[0].replace("월", ""))
-            except:
-                return await ctx.reply("사용법: `!PP보고서 월간 10월` 처럼 숫자+월 형태로 입력해줘!")
-        pairs = all_users_month_total(data_store, target_year, target_month)
-
-        csv_buf = io.StringIO()
-        w = csv.writer(csv_buf)
-        w.writerow(["닉네임", "ID", "월간점수"])
-        text_lines = [f"📅 **{target_month}월 상위 20명**", "```"]
-
-        for i, (uid, sc) in enumerate(pairs[:20], start=1):
-            try:
-                member = await ctx.guild.fetch_member(int(uid))
-                name = member.display_name
-            except:
-                name = uid
-            w.writerow([name, uid, sc])
-            text_lines.append(f"{i:>2}. {name:<20} | {sc:>4}점")
-
-        text_lines.append("```")
-
-        csv_bytes = io.BytesIO(csv_buf.getvalue().encode("utf-8"))
-        header = f"📅 {target_year}년 {target_month}월 활동 순위"
-        await ctx.reply(header, file=discord.File(csv_bytes, f"monthly_report_{target_year}-{target_month:02d}.csv"))
-        await ctx.send("\n".join(text_lines))
-        return
-
-# ========= 시작 =========
-if __name__ == "__main__":
-    TOKEN = os.environ.get("DISCORD_BOT_TOKEN")
-    if TOKEN:
-        bot.run(TOKEN)
-    else:
-        print("❌ DISCORD_BOT_TOKEN 환경변수가 설정되지 않았습니다.")
-
-
+# -*- coding: utf-8 -*-
+# 둘기봇 v5.5.1 — Progress System + DM Button + Safe Backup (Render Starter Ready)
+# 변경점:
+# - !출근 실행 시 출근 처리 + 개인 보고서(월간 제외) DM 동시 발송
+# - !보고서 실행 시 개인 보고서(주간 + 월간 7x4) DM 발송
+# - 하루 10점/주간 50점 달성 시 축하 DM (중복 방지)
+# - 타일(🟩/⬜) 기준: 하루 누적 점수 >= DAILY_GOAL_POINTS (기본 10)
+# - 기존 기능(백업/복원/자동백업/관리자 리포트/데이터 영구 저장) 유지
+
+import os
+import io
+import re
+import sys
+import csv
+import gzip
+import hashlib
+import shutil
+import tempfile
+import json
+import zlib
+import marshal
+import struct
+import math
+import time
+import sqlite3
+import signal
+import subprocess
+import asyncio
+import codecs
+import contextlib
+import datetime
+import functools
+import bisect
+import heapq
+import itertools
+import collections
+from array import array
+import pytz
+import aiohttp
+from aiohttp import web
+from typing import Any, Awaitable, Callable, Dict, Tuple, List, Iterator, NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+
+import discord
+from discord.ext import commands
+from discord.ui import View, Button
+
+# ========= 기본 설정 =========
+KST = pytz.timezone("Asia/Seoul")
+
+# Persistent Disk 경로 (Render Starter 플랜)
+BASE_PATH = os.environ.get("DATA_DIR", "/opt/render/project/data")
+os.makedirs(BASE_PATH, exist_ok=True)
+DATA_FILE = os.path.join(BASE_PATH, "data.json")
+BACKUP_DIR = os.path.join(BASE_PATH, "backups")
+
+# (초기 1회) 구버전 위치에서 마이그레이션
+OLD_DATA_FILE = "/opt/render/project/src/data.json"
+if os.path.exists(OLD_DATA_FILE) and not os.path.exists(DATA_FILE):
+    try:
+        os.system(f"cp {OLD_DATA_FILE} {DATA_FILE}")
+        print("✅ 이전 data.json을 Disk로 자동 마이그레이션 완료.")
+    except Exception as e:
+        print("⚠️ 마이그레이션 실패:", e)
+
+# 기본(홈) 길드. 다른 길드는 guilds.json으로 설정(아래 '길드별 설정 / 상태 파티션')
+HOME_GUILD_ID = 1310854848442269767
+
+# 서버 버튼 링크(서버로 돌아가기)
+SERVER_URL = f"https://discord.com/channels/{HOME_GUILD_ID}"
+
+# 백업 업로드 채널(필요시 교체)
+BACKUP_CHANNEL_ID = 1427608696547967026  # 🔧 실제 백업 채널 ID로 교체하세요
+
+# 채널 점수 체계
+CHANNEL_POINTS = {
+    1423170386811682908: {"name": "일일-그림보고", "points": 6, "daily_max": 6, "image_only": True},
+    1423172691724079145: {"name": "자유채팅판", "points": 1, "daily_max": 4, "image_only": False},
+    1423359059566006272: {"name": "정보-공모전", "points": 1, "daily_max": 1, "image_only": False},
+    1423170949477568623: {"name": "정보-그림꿀팁", "points": 1, "daily_max": 1, "image_only": False},
+    1423242322665148531: {"name": "고민상담", "points": 1, "daily_max": 1, "image_only": False},
+    1423359791287242782: {"name": "출퇴근기록", "points": 4, "daily_max": 4, "image_only": False},
+    1423171509752434790: {"name": "다-그렸어요", "points": 5, "daily_max": 5, "image_only": True, "allow_link": True},  # 이미지 또는 링크 허용
+}
+CHECKIN_CHANNEL_ID = 1423359791287242782   # !출근 점수가 들어가는 채널(출퇴근기록)
+
+# 우수 기준(기존 주간 60/월간 200 유지 + 신규 알림: 하루 10 / 주간 50)
+WEEKLY_BEST_THRESHOLD = 60
+MONTHLY_BEST_THRESHOLD = 200
+DAILY_GOAL_POINTS = 10   # 🟩 타일 기준 & '하루 목표 달성' DM 기준
+WEEK_GOAL_POINTS = 50    # '이주의 우수사원' DM 기준
+
+# ========= 계측(/metrics) =========
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_INTERVAL_SEC = 0.5
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+class Metrics:
+    """Prometheus 텍스트 포맷용 최소 레지스트리(외부 의존성 없음).
+    관측은 리스트 인덱스 증가 수준이라 상시 켜둬도 부담 없음"""
+
+    def __init__(self):
+        self.latency: Dict[str, Histogram] = {}
+        self.loop_lag = Histogram()
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.help: Dict[str, str] = {}
+        self.gauges: List[Tuple[str, str, object]] = []
+
+    def observe(self, path: str, seconds: float):
+        h = self.latency.get(path)
+        if h is None:
+            h = self.latency[path] = Histogram()
+        h.observe(seconds)
+
+    def inc(self, name: str, n: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def gauge(self, name: str, help_text: str, fn):
+        """스크레이프 시점에 fn() → [(labels dict, 값), ...] 호출"""
+        self.gauges.append((name, help_text, fn))
+
+    def timed(self, path: str):
+        """동기/비동기 함수 지연 측정 데코레이터"""
+        def deco(fn):
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def awrapper(*a, **kw):
+                    t0 = time.perf_counter()
+                    try:
+                        return await fn(*a, **kw)
+                    finally:
+                        self.observe(path, time.perf_counter() - t0)
+                return awrapper
+
+            @functools.wraps(fn)
+            def wrapper(*a, **kw):
+                t0 = time.perf_counter()
+                try:
+                    return fn(*a, **kw)
+                finally:
+                    self.observe(path, time.perf_counter() - t0)
+            return wrapper
+        return deco
+
+    async def sample_loop_lag(self, interval: float = LOOP_LAG_INTERVAL_SEC):
+        """interval마다 잠들었다 깨어난 시각의 지연 = 이벤트 루프 밀림"""
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(0.0, loop.time() - t0 - interval))
+
+    @staticmethod
+    def _label_value(v) -> str:
+        # 텍스트 포맷 규칙: 역슬래시, 큰따옴표, 줄바꿈만 이스케이프(채널 이름 등 사용자 입력이 들어옴)
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @staticmethod
+    def _labels(pairs) -> str:
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{Metrics._label_value(v)}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    @staticmethod
+    def _hist_lines(name: str, h: Histogram, labels: Tuple[Tuple[str, str], ...] = ()) -> List[str]:
+        lines, acc = [], 0
+        for bound, c in zip(h.buckets, h.counts):
+            acc += c
+            lines.append(f"{name}_bucket{Metrics._labels(labels + (('le', repr(bound)),))} {acc}")
+        lines.append(f"{name}_bucket{Metrics._labels(labels + (('le', '+Inf'),))} {h.count}")
+        lines.append(f"{name}_sum{Metrics._labels(labels)} {h.sum}")
+        lines.append(f"{name}_count{Metrics._labels(labels)} {h.count}")
+        return lines
+
+    def render(self) -> str:
+        out = [
+            "# HELP dulgi_latency_seconds Hot path latency",
+            "# TYPE dulgi_latency_seconds histogram",
+        ]
+        for path, h in sorted(self.latency.items()):
+            out += self._hist_lines("dulgi_latency_seconds", h, (("path", path),))
+        out += [
+            "# HELP dulgi_event_loop_lag_seconds Sampled event loop scheduling delay",
+            "# TYPE dulgi_event_loop_lag_seconds histogram",
+        ]
+        out += self._hist_lines("dulgi_event_loop_lag_seconds", self.loop_lag)
+        seen = set()
+        for (name, labels), v in sorted(self.counters.items()):
+            if name not in seen:
+                seen.add(name)
+                out.append(f"# TYPE {name} counter")
+            out.append(f"{name}{self._labels(labels)} {v}")
+        for name, help_text, fn in self.gauges:
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for labels, v in fn():
+                out.append(f"{name}{self._labels(tuple(labels.items()))} {v}")
+        return "\n".join(out) + "\n"
+
+metrics = Metrics()
+
+# ========= 데이터 유틸 =========
+class SnapshotError(RuntimeError):
+    """스냅샷이 손상됨 → 빈 데이터로 덮어쓰지 않도록 시작 자체를 중단"""
+
+def load_data(path: str = DATA_FILE) -> dict:
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError as e:
+            raise SnapshotError(f"{path} 파싱 실패: {e}") from e
+    return {}
+
+def _json_default(o):
+    if isinstance(o, CompactUser):
+        return o.to_json()
+    raise TypeError(f"JSON으로 직렬화할 수 없는 값: {type(o).__name__}")
+
+def serialize_data(data: dict) -> bytes:
+    """C 인코더가 쓰이도록 indent 없이 직렬화(사용자 기록은 to_json으로 data.json 스키마)"""
+    users = data.get("users")
+    if isinstance(users, LazyUsers):
+        # C 인코더는 dict 하위 클래스의 내부 저장소를 바로 읽음 → 안 읽은 사용자까지 담은 일반 dict로(캐시는 안 함)
+        data = {**data, "users": dict(users.items())}
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+def write_atomic(payload: bytes, path: str = DATA_FILE):
+    """임시 파일에 쓴 뒤 rename으로 교체 → 저장 도중 죽어도 기존 파일 보존"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+@metrics.timed("save_data")
+def save_data(data: dict, path: str = DATA_FILE):
+    write_atomic(serialize_data(data), path)
+
+def ensure_user(data: dict, uid: str) -> "CompactUser":
+    """사용자 기록이 없으면 빈 기록(CompactUser)을 만들어 돌려줌"""
+    users = data.setdefault("users", {})
+    user = users.get(uid)
+    if user is None:
+        user = users[uid] = CompactUser()
+    return user
+
+# ========= 지연 저장(write-behind) + 활동 저널 =========
+SAVE_INTERVAL_SEC = float(os.environ.get("SAVE_INTERVAL_SEC", "5"))      # 최대 N초마다 저장
+SAVE_MAX_MUTATIONS = int(os.environ.get("SAVE_MAX_MUTATIONS", "50"))     # 또는 변경 M회마다 저장
+JOURNAL_FILE = os.path.join(BASE_PATH, "journal.jsonl")
+JOURNAL_COMPACT_BYTES = int(os.environ.get("JOURNAL_COMPACT_BYTES", str(8 * 1024 * 1024)))
+
+# 저널 레코드(JSONL, 한 줄 = 한 이벤트)
+#   {"s": seq, "t": "award",  "u": uid, "d": 날짜, "c": 채널ID, "p": 점수}
+#   {"s": seq, "t": "attend", "u": uid, "d": 날짜}
+#   {"s": seq, "t": "notify", "u": uid, "k": 알림키}
+# 스냅샷(data.json)의 meta.journal_seq 이하 이벤트는 이미 반영된 것으로 보고 건너뜀
+
+def journal_seq_of(data: dict) -> int:
+    return data.get("meta", {}).get("journal_seq", 0)
+
+# meta.generation: 저널 밖에서 상태를 통째로 바꿀 때(백필/백업 복원/PP복원)마다 새 값.
+# SQLite 쪽 동기화 표식과 비교해 다른 파일로 바뀐 것을 알아챔
+def generation_of(data: dict) -> str:
+    return data.get("meta", {}).get("generation", "")
+
+def new_generation(data: dict) -> str:
+    gen = os.urandom(8).hex()
+    data.setdefault("meta", {})["generation"] = gen
+    return gen
+
+def apply_journal_event(data: dict, ev: dict, totals: "ActivityTotals | None" = None):
+    """저널 이벤트 1건을 메모리 상태에 재적용(상한 검사 없이 기록된 그대로)"""
+    uid = ev["u"]
+    user = ensure_user(data, uid)
+    t = ev["t"]
+    if t == "award":
+        user.add_points(day_index(ev["d"]), ev["c"], ev["p"])
+        if totals is not None:
+            totals.add(uid, ev["d"], ev["p"])
+    elif t == "attend":
+        user.set_attended(day_index(ev["d"]))
+    elif t == "notify":
+        user.notify(ev["k"])
+
+def replay_journal(data: dict, path: str = JOURNAL_FILE, totals: "ActivityTotals | None" = None) -> int:
+    """스냅샷 이후의 저널 꼬리를 재생. 마지막으로 반영된 seq 반환.
+    저장 도중 끊긴 마지막 줄만 잘라 내고 넘어감. 그 밖의 손상은 SnapshotError"""
+    last = journal_seq_of(data)
+    if not os.path.exists(path):
+        return last
+    with open(path, "r+b") as f:
+        pos = 0
+        for n, line in enumerate(f, start=1):
+            try:
+                ev = json.loads(line)
+            except ValueError as e:
+                if f.read(1):
+                    raise SnapshotError(f"{path}: {n}번째 저널 레코드 손상: {e}") from e
+                # 끊긴 줄을 남겨 두면 다음 추가분이 그 뒤에 붙어 중간 손상이 됨 → 잘라 냄
+                print(f"⚠️ 끊긴 마지막 저널 레코드 잘라 냄({len(line)}바이트)")
+                f.truncate(pos)
+                break
+            pos += len(line)
+            if ev["s"] <= last:
+                continue
+            apply_journal_event(data, ev, totals)
+            last = ev["s"]
+    data.setdefault("meta", {})["journal_seq"] = last
+    return last
+
+def load_state(path: str = DATA_FILE, journal_path: str = JOURNAL_FILE) -> dict:
+    """최신 스냅샷 + 저널 꼬리 재생(사용자 기록은 CompactUser로)"""
+    data = state_from_json(load_data(path))
+    replay_journal(data, journal_path)
+    return data
+
+def append_journal(lines: List[str], path: str = JOURNAL_FILE) -> int:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+class WriteBehindStore:
+    """변경은 저널 이벤트로 버퍼에 쌓고, 백그라운드 태스크가 모아서 저널 끝에 추가.
+    전체 스냅샷은 컴팩션(정기/용량 초과/종료) 때만 다시 씀.
+    직렬화/쓰기는 executor에서 수행해 이벤트 루프를 막지 않음."""
+
+    def __init__(self, source, path: str = DATA_FILE, journal_path: str = JOURNAL_FILE,
+                 interval: float = SAVE_INTERVAL_SEC, max_mutations: int = SAVE_MAX_MUTATIONS,
+                 compact_bytes: int = JOURNAL_COMPACT_BYTES, serializer=None,
+                 totals: "ActivityTotals | None" = None):
+        self.source = source            # 현재 data를 돌려주는 함수(복원 시 교체 대비)
+        self.serializer = serializer or snapshot_json   # FrozenState → 스냅샷 바이트(JSON/바이너리)
+        self.totals = totals            # 바이너리 스냅샷 메타에 같이 고정할 누계
+        self.freezer = StateFreezer()   # 컴팩션/백업용 고정 사본(바뀐 사용자만 다시 고정)
+        self.path = path
+        self.journal_path = journal_path
+        self.interval = interval
+        self.max_mutations = max_mutations
+        self.compact_bytes = compact_bytes
+        self.seq = journal_seq_of(source())
+        self.pending = 0
+        self._buffer: List[str] = []
+        self._needs_snapshot = False     # 저널로 표현할 수 없는 변경이 있었음
+        self._journal_bytes = os.path.getsize(journal_path) if os.path.exists(journal_path) else 0
+        self._wake: asyncio.Event | None = None
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False           # aclose: 진행 중인 저장을 끝낸 뒤 _run 종료
+        self.stats = {
+            "flushes": 0,
+            "compactions": 0,
+            "failures": 0,
+            "total_mutations": 0,
+            "last_mutations": 0,
+            "max_mutations": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "last_flush_at": None,
+            "last_compact_at": None,
+        }
+
+    # --- 변경 기록 ---
+    def record(self, ev: dict):
+        """이미 메모리에 반영된 변경을 저널 이벤트로 기록"""
+        self.seq += 1
+        ev["s"] = self.seq
+        self.freezer.touch(ev["u"])
+        # 스냅샷과 seq가 항상 같이 직렬화되도록 data 안에 기록
+        self.source().setdefault("meta", {})["journal_seq"] = self.seq
+        self._buffer.append(json.dumps(ev, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._bump()
+
+    def record_award(self, uid: str, date_str: str, channel_id: int, points: int):
+        self.record({"t": "award", "u": uid, "d": date_str, "c": channel_id, "p": points})
+
+    def record_attend(self, uid: str, date_str: str):
+        self.record({"t": "attend", "u": uid, "d": date_str})
+
+    def record_notify(self, uid: str, key: str):
+        self.record({"t": "notify", "u": uid, "k": key})
+
+    def mark_dirty(self, n: int = 1, uids=None):
+        """저널 이벤트가 없는 변경 → 다음 저장 때 전체 스냅샷.
+        uids: 바뀐 사용자(모르면 None → 다음 고정 때 전원 다시)"""
+        if uids is None:
+            self.freezer.invalidate()
+        else:
+            for uid in uids:
+                self.freezer.touch(uid)
+        self._needs_snapshot = True
+        self._bump(n)
+
+    def _bump(self, n: int = 1):
+        self.pending += n
+        if self._wake is not None and self.pending >= self.max_mutations:
+            self._wake.set()
+
+    # --- 백그라운드 저장 ---
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self.pending and not self._stopping:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print("⚠️ 지연 저장 실패:", e)
+
+    async def flush(self):
+        """대기 중인 변경을 즉시 디스크에 반영(저널 추가, 필요 시 컴팩션)"""
+        if self._lock is None:
+            return self.flush_sync()
+        if self._needs_snapshot or self._journal_bytes >= self.compact_bytes:
+            return await self.compact()
+        async with self._lock:
+            if not self.pending:
+                return
+            n, self.pending = self.pending, 0
+            lines, self._buffer = self._buffer, []
+            loop = asyncio.get_running_loop()
+            t0 = time.perf_counter()
+            try:
+                self._journal_bytes = await loop.run_in_executor(None, append_journal, lines, self.journal_path)
+            except BaseException:
+                # 취소(CancelledError) 포함: 꺼낸 변경을 되돌려 놓아야 다음 flush가 씀.
+                # 쓰기가 실제로는 끝났어도 같은 seq는 재생 때 한 번만 반영됨
+                self._buffer[:0] = lines
+                self.pending += n
+                self.stats["failures"] += 1
+                raise
+            self._record(n, (time.perf_counter() - t0) * 1000)
+
+    async def compact(self):
+        """저널을 새 스냅샷으로 접고 저널을 비움"""
+        if self._lock is None:
+            return self.compact_sync()
+        async with self._lock:
+            n, self.pending = self.pending, 0
+            lines, self._buffer = self._buffer, []
+            needs_snapshot, self._needs_snapshot = self._needs_snapshot, False
+            loop = asyncio.get_running_loop()
+            t0 = time.perf_counter()
+            try:
+                # journal_seq와 사용자 상태를 루프 위에서 같은 순간에 고정하고, 인코딩은 그 사본으로 executor에서.
+                # 라이브 dict를 executor에서 읽으면 seq 이후 변경이 스냅샷에도 들어가고 저널로 또 재생됨.
+                # 고정은 지난번 이후 바뀐 사용자만 다시 하므로 루프를 오래 잡지 않음
+                frozen = self.freezer.freeze(self.source(), self.totals)
+                payload = await loop.run_in_executor(None, self.serializer, frozen)
+                await loop.run_in_executor(None, self._swap_snapshot, payload)
+            except BaseException:
+                # 종료/취소로 끊겨도 버퍼와 스냅샷 필요 표시를 되돌림(안 그러면 다음 flush가 빈손으로 끝남)
+                self._buffer[:0] = lines
+                self.pending += n
+                self._needs_snapshot = self._needs_snapshot or needs_snapshot
+                self.stats["failures"] += 1
+                raise
+            self._record(n, (time.perf_counter() - t0) * 1000, compacted=True)
+
+    def _swap_snapshot(self, payload: bytes):
+        # 스냅샷 교체 후 저널 비우기(그 사이 죽어도 seq로 중복 재생 방지)
+        write_atomic(payload, self.path)
+        open(self.journal_path, "w").close()
+        self._journal_bytes = 0
+
+    def flush_sync(self):
+        """종료 시점 등 루프 밖에서의 동기 저장"""
+        if not self.pending:
+            return
+        if self._needs_snapshot:
+            return self.compact_sync()
+        n, self.pending = self.pending, 0
+        lines, self._buffer = self._buffer, []
+        t0 = time.perf_counter()
+        self._journal_bytes = append_journal(lines, self.journal_path)
+        self._record(n, (time.perf_counter() - t0) * 1000)
+
+    def compact_sync(self):
+        n, self.pending = self.pending, 0
+        self._buffer = []
+        self._needs_snapshot = False
+        t0 = time.perf_counter()
+        self._swap_snapshot(self.serializer(self.freezer.freeze(self.source(), self.totals)))
+        self._record(n, (time.perf_counter() - t0) * 1000, compacted=True)
+
+    async def aclose(self):
+        """진행 중인 저장(컴팩션 포함)은 끝까지 기다린 뒤 남은 변경을 마저 씀"""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def _record(self, n: int, ms: float, compacted: bool = False):
+        st = self.stats
+        now = datetime.datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")
+        st["flushes"] += 1
+        st["total_mutations"] += n
+        st["last_mutations"] = n
+        st["max_mutations"] = max(st["max_mutations"], n)
+        st["last_flush_ms"] = ms
+        st["max_flush_ms"] = max(st["max_flush_ms"], ms)
+        st["total_flush_ms"] += ms
+        st["last_flush_at"] = now
+        if compacted:
+            st["compactions"] += 1
+            st["last_compact_at"] = now
+
+    def summary(self) -> str:
+        st = self.stats
+        flushes = st["flushes"] or 1
+        return (
+            f"저장 횟수 : {st['flushes']}회 (컴팩션 {st['compactions']}회, 실패 {st['failures']}회)\n"
+            f"대기 중 변경 : {self.pending}건\n"
+            f"저널 크기 : {self._journal_bytes / 1024:.1f}KB (seq {self.seq})\n"
+            f"저장당 변경 : 평균 {st['total_mutations'] / flushes:.1f} / 최근 {st['last_mutations']} / 최대 {st['max_mutations']}\n"
+            f"저장 지연 : 평균 {st['total_flush_ms'] / flushes:.1f}ms / 최근 {st['last_flush_ms']:.1f}ms / 최대 {st['max_flush_ms']:.1f}ms\n"
+            f"마지막 저장 : {st['last_flush_at'] or '-'} / 마지막 컴팩션 : {st['last_compact_at'] or '-'}"
+        )
+
+def logical_date_str_from_now() -> str:
+    """한국시간 오전 6시를 하루 경계로 사용하는 '논리적 날짜' 문자열"""
+    now = datetime.datetime.now(KST)
+    logical = now - datetime.timedelta(hours=6)
+    return logical.strftime("%Y-%m-%d")
+
+def logical_today() -> datetime.date:
+    return datetime.date.fromisoformat(logical_date_str_from_now())
+
+def get_week_range(d: datetime.date) -> Tuple[datetime.date, datetime.date]:
+    start = d - datetime.timedelta(days=d.weekday())
+    end = start + datetime.timedelta(days=6)
+    return start, end
+
+def week_key(d: datetime.date) -> str:
+    y, w, _ = d.isocalendar()
+    return f"{y}-W{w:02d}"
+
+def prune_notified_keys(notified: dict, logical_ds: str, cur_week: str) -> dict:
+    """이미 끝난 날/주의 알림 키 정리(중복 방지는 열린 기간에만 필요)"""
+    cur_daily, cur_weekly = f"daily_{logical_ds}", f"weekly_{cur_week}"
+    return {
+        k: v for k, v in notified.items()
+        if (k.startswith("daily_") and k >= cur_daily)
+        or (k.startswith("weekly_") and k >= cur_weekly)
+        or not k.startswith(("daily_", "weekly_"))
+    }
+
+@metrics.timed("add_activity_logic")
+def add_activity_logic(
+    data: dict,
+    uid: str,
+    date_str: str,
+    channel_id: int,
+    channel_points_map: Dict[int, dict],
+    totals: "ActivityTotals | None" = None,
+) -> bool:
+    """일자/채널별 점수 반영(채널 일일 상한 준수). totals가 있으면 주간/월간 누계도 갱신"""
+    user = ensure_user(data, uid)
+    conf = channel_points_map.get(channel_id)
+    if not conf:
+        return False
+    points = conf["points"]
+    if not user.add_points(day_index(date_str), channel_id, points, conf["daily_max"]):
+        return False
+    if totals is not None:
+        totals.add(uid, date_str, points)
+    return True
+
+# ========= 시각화 =========
+def goal_reached(data: dict, uid: str, ds: str, daily_goal: int,
+                 closed: "ClosedPeriods | None" = None) -> bool:
+    """마감된 날은 확정된 목표 비트, 열린 날은 사용자 기록의 그날 합계로 판단"""
+    if closed is not None and daily_goal == closed.daily_goal:
+        met = closed.goal_met(uid, ds)
+        if met is not None:
+            return met
+    # 읽기 전용: 기록이 없는 사용자도 만들지 않음
+    user = data["users"].get(uid)
+    return (user.day_total(day_index(ds)) if user is not None else 0) >= daily_goal
+
+def get_week_progress(data: dict, uid: str, ref_date: datetime.date, daily_goal: int = DAILY_GOAL_POINTS,
+                      closed: "ClosedPeriods | None" = None) -> str:
+    start, _ = get_week_range(ref_date)
+    labels = ["월 ", "화 ", "수 ", "목 ", "금 ", "토 ", "일"]
+    blocks = []
+    cur = start
+    for _ in range(7):
+        ds = cur.strftime("%Y-%m-%d")
+        blocks.append("🟩" if goal_reached(data, uid, ds, daily_goal, closed) else "⬜")
+        cur += datetime.timedelta(days=1)
+    return " ".join(labels) + "\n" + " ".join(blocks)
+
+def get_month_grid_7x4(data: dict, uid: str, ref_date: datetime.date, daily_goal: int = DAILY_GOAL_POINTS,
+                       closed: "ClosedPeriods | None" = None) -> str:
+    """월간 7x4 타일(1~28일)"""
+    first = ref_date.replace(day=1)
+    cells = []
+    for day in range(1, 29):
+        ds = first.replace(day=day).strftime("%Y-%m-%d")
+        cells.append("🟩" if goal_reached(data, uid, ds, daily_goal, closed) else "⬜")
+    rows = [" ".join(cells[r*7:(r+1)*7]) for r in range(4)]
+    return "월간 활동 (1~28일 기준)\n" + "\n".join(rows)
+
+# ========= 합계 계산 =========
+def weekly_total_for_user(data: dict, uid: str, ref_date: datetime.date) -> int:
+    user = peek_user(data.get("users", {}), uid)
+    if user is None:
+        return 0
+    start, end = get_week_range(ref_date)
+    return user.range_total((start - EPOCH_DAY).days, (end - EPOCH_DAY).days)
+
+def monthly_total_for_user(data: dict, uid: str, year: int, month: int) -> int:
+    user = peek_user(data.get("users", {}), uid)
+    if user is None:
+        return 0
+    start, end = month_range(year, month)
+    return user.range_total((start - EPOCH_DAY).days, (end - EPOCH_DAY).days)
+
+def all_users_week_total(data: dict, ref_date: datetime.date) -> List[Tuple[str, int]]:
+    ret = []
+    for uid in data.get("users", {}):
+        ret.append((uid, weekly_total_for_user(data, uid, ref_date)))
+    ret.sort(key=lambda x: x[1], reverse=True)
+    return ret
+
+def all_users_month_total(data: dict, year: int, month: int) -> List[Tuple[str, int]]:
+    ret = []
+    for uid in data.get("users", {}):
+        ret.append((uid, monthly_total_for_user(data, uid, year, month)))
+    ret.sort(key=lambda x: x[1], reverse=True)
+    return ret
+
+# ========= 주간/월간 누계(증분) =========
+@functools.lru_cache(maxsize=4096)
+def period_keys(date_str: str) -> Tuple[str, str]:
+    """'YYYY-MM-DD' → (ISO 주 키, 'YYYY-MM')"""
+    d = datetime.date.fromisoformat(date_str)
+    return week_key(d), date_str[:7]
+
+class PeriodBoard:
+    """한 기간(주/월)의 실시간 순위. 점수별 버킷으로 관리해
+    상위 K명·개인 순위 조회가 인원수가 아닌 점수 구간 수에만 비례"""
+
+    def __init__(self):
+        self.scores: Dict[str, int] = {}
+        self.buckets: Dict[int, set] = {}
+
+    def add(self, uid: str, points: int):
+        old = self.scores.get(uid, 0)
+        new = old + points
+        if old:
+            b = self.buckets[old]
+            b.discard(uid)
+            if not b:
+                del self.buckets[old]
+        if new:
+            self.scores[uid] = new
+            self.buckets.setdefault(new, set()).add(uid)
+        else:
+            self.scores.pop(uid, None)
+
+    def top(self, k: int | None = None) -> List[Tuple[str, int]]:
+        ret = []
+        for sc in sorted(self.buckets, reverse=True):
+            b = self.buckets[sc]
+            need = None if k is None else k - len(ret)
+            # 동점은 uid 순(FrozenBoard와 같은 순서). 버킷을 다 안 쓸 때는 필요한 만큼만 고름
+            uids = sorted(b) if need is None or need >= len(b) else heapq.nsmallest(need, b)
+            ret.extend((uid, sc) for uid in uids)
+            if k is not None and len(ret) >= k:
+                break
+        return ret
+
+    def rank(self, uid: str) -> Tuple[int, int, int] | None:
+        """(순위, 점수, 전체 인원). 점수 없으면 None"""
+        sc = self.scores.get(uid)
+        if not sc:
+            return None
+        above = sum(len(b) for s, b in self.buckets.items() if s > sc)
+        return above + 1, sc, len(self.scores)
+
+class FrozenBoard:
+    """마감된 기간의 고정 순위(불변)"""
+
+    def __init__(self, board: PeriodBoard):
+        ranking = sorted(board.scores.items(), key=lambda x: (-x[1], x[0]))
+        self.ranking: Tuple[Tuple[str, int], ...] = tuple(ranking)
+        self._rank: Dict[str, int] = {}
+        prev, pos = None, 0
+        for i, (uid, sc) in enumerate(ranking, start=1):
+            if sc != prev:
+                prev, pos = sc, i
+            self._rank[uid] = pos
+
+    def top(self, k: int | None = None) -> List[Tuple[str, int]]:
+        return list(self.ranking[:k] if k else self.ranking)
+
+    def rank(self, uid: str) -> Tuple[int, int, int] | None:
+        pos = self._rank.get(uid)
+        if pos is None:
+            return None
+        return pos, self.ranking[pos - 1][1], len(self.ranking)
+
+    def thaw(self) -> PeriodBoard:
+        board = PeriodBoard()
+        for uid, sc in self.ranking:
+            board.add(uid, sc)
+        return board
+
+class Leaderboards:
+    """주(ISO 주 키)/월('YYYY-MM')별 순위 모음. 지난 기간은 FrozenBoard로 고정"""
+
+    def __init__(self):
+        self.week: Dict[str, PeriodBoard | FrozenBoard] = {}
+        self.month: Dict[str, PeriodBoard | FrozenBoard] = {}
+
+    @staticmethod
+    def _live(boards: dict, key: str) -> PeriodBoard:
+        board = boards.get(key)
+        if board is None:
+            board = boards[key] = PeriodBoard()
+        elif isinstance(board, FrozenBoard):
+            # 마감 후 늦게 들어온 점수(저널 재생/백필 등) → 다시 풀어서 반영
+            board = boards[key] = board.thaw()
+        return board
+
+    def add(self, uid: str, wk: str, mk: str, points: int):
+        self._live(self.week, wk).add(uid, points)
+        self._live(self.month, mk).add(uid, points)
+
+    def freeze_before(self, ref_date: datetime.date):
+        """ref_date가 속한 주/월 이전 기간을 모두 고정"""
+        cur_w, cur_m = week_key(ref_date), f"{ref_date.year:04d}-{ref_date.month:02d}"
+        for boards, cur in ((self.week, cur_w), (self.month, cur_m)):
+            for key, board in list(boards.items()):
+                if key < cur and isinstance(board, PeriodBoard):
+                    boards[key] = FrozenBoard(board)
+
+    def week_board(self, ref_date: datetime.date) -> PeriodBoard | FrozenBoard:
+        return self.week.get(week_key(ref_date)) or PeriodBoard()
+
+    def month_board(self, year: int, month: int) -> PeriodBoard | FrozenBoard:
+        return self.month.get(f"{year:04d}-{month:02d}") or PeriodBoard()
+
+class ActivityTotals:
+    """사용자별 ISO 주/연-월 점수 누계. add_activity_logic이 갱신하고
+    로딩·복원 시 사용자 기록에서 다시 만듦 → 목표 체크/개인 보고서 O(1)"""
+
+    def __init__(self, daily_goal: int = DAILY_GOAL_POINTS):
+        self.daily_goal = daily_goal
+        self.week: Dict[str, Dict[str, int]] = {}
+        self.month: Dict[str, Dict[str, int]] = {}
+        self.boards = Leaderboards()
+        self.closed = ClosedPeriods(daily_goal)
+
+    def add(self, uid: str, date_str: str, points: int):
+        wk, mk = period_keys(date_str)
+        w = self.week.setdefault(uid, {})
+        w[wk] = w.get(wk, 0) + points
+        m = self.month.setdefault(uid, {})
+        m[mk] = m.get(mk, 0) + points
+        self.boards.add(uid, wk, mk, points)
+        self.closed.touch(uid, date_str)
+
+    def snapshot_agg(self) -> dict:
+        """바이너리 스냅샷 메타에 넣는 누계(load()의 입력과 같은 모양)"""
+        return {"week": self.week, "month": self.month, "closed": self.closed.to_json()}
+
+    def rebuild(self, data: dict, ref_date: datetime.date | None = None):
+        self.week, self.month = {}, {}
+        self.boards = Leaderboards()
+        self.closed = ClosedPeriods(self.daily_goal)
+        for uid, u in data.get("users", {}).items():
+            for idx, pts in u.days():
+                self.add(uid, day_str(idx), pts)
+        if ref_date is not None:
+            self.boards.freeze_before(ref_date)
+
+    def load(self, week: Dict[str, Dict[str, int]], month: Dict[str, Dict[str, int]],
+             ref_date: datetime.date | None = None, closed: dict | None = None):
+        """저장해 둔 누계(바이너리 스냅샷)로 복구. 사용자 기록은 건드리지 않음"""
+        self.week, self.month = week, month
+        self.boards = Leaderboards()
+        self.closed = ClosedPeriods.from_json(closed, self.daily_goal) if closed else ClosedPeriods(self.daily_goal)
+        for by_user, boards in ((week, self.boards.week), (month, self.boards.month)):
+            for uid, periods in by_user.items():
+                for key, pts in periods.items():
+                    if pts:
+                        self.boards._live(boards, key).add(uid, pts)
+        if ref_date is not None:
+            self.boards.freeze_before(ref_date)
+        self.closed.close_periods(self.boards)
+
+    def roll_over(self, data: dict, logical_date: datetime.date) -> set:
+        """logical_date 전날까지 마감 + 끝난 주/월 확정. 이번에 마감된 사용자 ID 반환"""
+        uids = self.closed.close_days(data, (logical_date - datetime.timedelta(days=1)).isoformat())
+        self.boards.freeze_before(logical_date)
+        for summary in self.closed.close_periods(self.boards):
+            uids.update(uid for uid, _ in summary.ranking.ranking)
+        return uids
+
+    def week_total(self, uid: str, ref_date: datetime.date) -> int:
+        return self.week.get(uid, {}).get(week_key(ref_date), 0)
+
+    def month_total(self, uid: str, year: int, month: int) -> int:
+        return self.month.get(uid, {}).get(f"{year:04d}-{month:02d}", 0)
+
+    def verify(self, data: dict) -> List[str]:
+        """스캔 기반 합계와 대조. 불일치 목록 반환"""
+        diffs = []
+        for uid, u in data.get("users", {}).items():
+            for idx, _ in u.days():
+                d = EPOCH_DAY + datetime.timedelta(days=idx)
+                ws, we = get_week_range(d)
+                scan_w = u.range_total((ws - EPOCH_DAY).days, (we - EPOCH_DAY).days)
+                if scan_w != self.week_total(uid, d):
+                    diffs.append(f"{uid} {week_key(d)}: 누계 {self.week_total(uid, d)} / 스캔 {scan_w}")
+                ms, me = month_range(d.year, d.month)
+                scan_m = u.range_total((ms - EPOCH_DAY).days, (me - EPOCH_DAY).days)
+                if scan_m != self.month_total(uid, d.year, d.month):
+                    diffs.append(f"{uid} {d.isoformat()[:7]}: 누계 {self.month_total(uid, d.year, d.month)} / 스캔 {scan_m}")
+        return sorted(set(diffs))
+
+# ========= 사용자 기록(배열 기반) =========
+# data["users"][uid]는 CompactUser. 날짜별 dict 대신 EPOCH_DAY 기준 일 오프셋 배열로 들고 있고,
+# data.json 스키마(dict)로는 파일/백업/내보내기 경계에서만 바꿈(to_json / from_json / state_from_json)
+EPOCH_DAY = datetime.date(2020, 1, 1)
+EPOCH_DAY_STR = EPOCH_DAY.isoformat()
+USER_MAX_SPAN_DAYS = 20 * 366            # 한 사용자의 첫 기록~마지막 기록 최대 간격(배열 길이 상한)
+
+@functools.lru_cache(maxsize=4096)
+def day_index(date_str: str) -> int:
+    return (datetime.date.fromisoformat(date_str) - EPOCH_DAY).days
+
+@functools.lru_cache(maxsize=4096)
+def day_str(idx: int) -> str:
+    return (EPOCH_DAY + datetime.timedelta(days=idx)).isoformat()
+
+def _zeros(typecode: str, n: int) -> array:
+    return array(typecode, bytes(array(typecode).itemsize * n))
+
+class CompactUser:
+    """사용자 1명. 날짜는 EPOCH_DAY 기준 일 오프셋(base부터 연속 배열)
+    - totals: 일별 합계(array 'i')
+    - channels: 채널 ID → 일별 점수(array 'h', 16비트를 넘으면 그 채널만 'i'). 점수가 있는 채널만
+    - attendance: 출석 비트셋(bytearray, base 기준 비트)
+    - notified: 알림 키. daily_/weekly_ 키는 더 새 키가 들어올 때 같은 종류의 지난 키를 지움
+    - other: data.json 스키마 밖의 키(그대로 보존)"""
+    __slots__ = ("base", "totals", "channels", "attendance", "notified",
+                 "level", "exp", "rank_title", "badges", "other")
+
+    def __init__(self):
+        self.base = 0
+        self.totals = array("i")
+        self.channels: Dict[int, array] = {}
+        self.attendance = bytearray()
+        self.notified: Dict[str, bool] = {}
+        self.level = 1
+        self.exp = 0
+        self.rank_title = None
+        self.badges: list = []
+        self.other: dict | None = None
+
+    # --- 배열 ---
+    def _slot(self, idx: int) -> int:
+        """idx일의 배열 위치. 필요하면 앞/뒤로 배열 확장"""
+        if not self.totals:
+            self.base = idx
+        elif idx < self.base:
+            pad = self.base - idx
+            if len(self.totals) + pad > USER_MAX_SPAN_DAYS:
+                raise ValueError(f"기록 기간이 {USER_MAX_SPAN_DAYS}일을 넘어요")
+            self.totals[:0] = _zeros("i", pad)
+            for arr in self.channels.values():
+                arr[:0] = _zeros(arr.typecode, pad)
+            if self.attendance:
+                bits = int.from_bytes(self.attendance, "little") << pad
+                self.attendance = bytearray(bits.to_bytes((bits.bit_length() + 7) // 8, "little"))
+            self.base = idx
+        pos = idx - self.base
+        if pos >= len(self.totals):
+            if pos >= USER_MAX_SPAN_DAYS:
+                raise ValueError(f"기록 기간이 {USER_MAX_SPAN_DAYS}일을 넘어요")
+            self.totals.extend(_zeros("i", pos + 1 - len(self.totals)))
+        return pos
+
+    def _channel(self, cid: int) -> array:
+        arr = self.channels.get(cid)
+        if arr is None:
+            arr = self.channels[cid] = array("h")
+        if len(arr) < len(self.totals):
+            arr.extend(_zeros(arr.typecode, len(self.totals) - len(arr)))
+        return arr
+
+    def _put(self, cid: int, pos: int, value: int):
+        arr = self._channel(cid)
+        try:
+            arr[pos] = value
+        except OverflowError:
+            # 상한 없이 쌓인 기록(재생/복원) → 이 채널만 32비트로
+            arr = self.channels[cid] = array("i", arr)
+            arr[pos] = value
+
+    # --- 점수 ---
+    def day_total(self, idx: int) -> int:
+        pos = idx - self.base
+        return self.totals[pos] if 0 <= pos < len(self.totals) else 0
+
+    def channel_points(self, idx: int, cid: int) -> int:
+        arr = self.channels.get(cid)
+        pos = idx - self.base
+        return arr[pos] if arr is not None and 0 <= pos < len(arr) else 0
+
+    def add_points(self, idx: int, cid: int, points: int, daily_max: int | None = None) -> bool:
+        """채널 일일 상한(daily_max) 안이면 반영. None이면 상한 검사 없이(저널 재생)"""
+        if daily_max is not None and self.channel_points(idx, cid) + points > daily_max:
+            return False
+        pos = self._slot(idx)
+        self._put(cid, pos, self.channel_points(idx, cid) + points)
+        self.totals[pos] += points
+        return True
+
+    def range_total(self, lo: int, hi: int, cid: int | None = None) -> int:
+        """lo~hi일(양끝 포함) 합계. cid가 있으면 그 채널만"""
+        arr = self.totals if cid is None else self.channels.get(cid)
+        if arr is None:
+            return 0
+        a, b = max(lo - self.base, 0), min(hi - self.base + 1, len(arr))
+        return sum(arr[a:b]) if a < b else 0
+
+    def days(self) -> Iterator[Tuple[int, int]]:
+        """(일 오프셋, 합계) — 합계가 0이 아닌 날만, 날짜순"""
+        base = self.base
+        return ((base + pos, total) for pos, total in enumerate(self.totals) if total)
+
+    def day_count(self) -> int:
+        return len(self.totals) - self.totals.count(0)
+
+    def day_records(self) -> Dict[int, Tuple[int, Dict[int, int]]]:
+        """일 오프셋 → (합계, {채널 ID: 점수}) — 기록이 있는 날만, 날짜순"""
+        recs: Dict[int, Tuple[int, Dict[int, int]]] = {}
+        for pos, total in enumerate(self.totals):
+            if total:
+                recs[pos] = (total, {})
+        for cid, arr in self.channels.items():
+            for pos, pts in enumerate(arr):
+                if pts:
+                    rec = recs.get(pos)
+                    if rec is None:
+                        rec = recs[pos] = (self.totals[pos], {})
+                    rec[1][cid] = pts
+        return {self.base + pos: recs[pos] for pos in sorted(recs)}
+
+    # --- 출석 ---
+    def attended(self, idx: int) -> bool:
+        pos = idx - self.base
+        return 0 <= pos and (pos >> 3) < len(self.attendance) and bool(self.attendance[pos >> 3] >> (pos & 7) & 1)
+
+    def set_attended(self, idx: int) -> bool:
+        """출석 기록. 새로 기록했으면 True"""
+        if self.attended(idx):
+            return False
+        pos = self._slot(idx)
+        byte = pos >> 3
+        if byte >= len(self.attendance):
+            self.attendance.extend(bytes(byte + 1 - len(self.attendance)))
+        self.attendance[byte] |= 1 << (pos & 7)
+        return True
+
+    def attendance_days(self, lo: int | None = None, hi: int | None = None) -> List[int]:
+        """출석한 일 오프셋(날짜순, lo~hi 양끝 포함)"""
+        out = []
+        for byte, v in enumerate(self.attendance):
+            if v:
+                for bit in range(8):
+                    if v >> bit & 1:
+                        idx = self.base + (byte << 3) + bit
+                        if (lo is None or idx >= lo) and (hi is None or idx <= hi):
+                            out.append(idx)
+        return out
+
+    # --- 알림 키 ---
+    def notify(self, key: str) -> bool:
+        """알림 키 기록. 이미 있으면 False.
+        날/주 키는 같은 종류의 지난 키를 지움(중복 방지는 열린 기간에만 필요) → 사용자당 몇 개로 유지"""
+        if self.notified.get(key):
+            return False
+        if key.startswith(("daily_", "weekly_")):
+            kind = key[:key.index("_") + 1]
+            for old in [k for k in self.notified if k.startswith(kind) and k < key]:
+                del self.notified[old]
+        self.notified[key] = True
+        return True
+
+    def prune_notified(self, logical_ds: str, cur_week: str) -> int:
+        """끝난 날/주의 알림 키 정리. 지운 키 수 반환"""
+        kept = prune_notified_keys(self.notified, logical_ds, cur_week)
+        n = len(self.notified) - len(kept)
+        if n:
+            self.notified = kept
+        return n
+
+    # --- 변환 ---
+    @classmethod
+    def from_json(cls, u: dict) -> "CompactUser":
+        """data.json 스키마의 사용자 dict → CompactUser. 기록 기간이 너무 길면 ValueError"""
+        cu = cls()
+        acts = [(day_index(ds), rec) for ds, rec in u.get("activity", {}).items()]
+        att = [day_index(ds) for ds in u.get("attendance", [])]
+        idxs = [idx for idx, _ in acts] + att
+        if idxs:
+            # 배열을 한 번에 할당(날짜별로 늘리지 않음)
+            lo, hi = min(idxs), max(idxs)
+            if hi - lo >= USER_MAX_SPAN_DAYS:
+                raise ValueError(f"기록 기간이 {USER_MAX_SPAN_DAYS}일을 넘어요")
+            n = hi - lo + 1
+            cu.base = lo
+            totals = cu.totals = _zeros("i", n)
+            cols: Dict[str, list] = {}
+            for idx, rec in acts:
+                pos = idx - lo
+                totals[pos] = rec.get("total", 0)
+                for ckey, pts in rec.get("by_channel", {}).items():
+                    if pts:
+                        col = cols.get(ckey)
+                        if col is None:
+                            col = cols[ckey] = [0] * n
+                        col[pos] = pts
+            for ckey, col in cols.items():
+                try:
+                    cu.channels[int(ckey)] = array("h", col)
+                except OverflowError:
+                    cu.channels[int(ckey)] = array("i", col)
+            if att:
+                cu.attendance = bytearray((hi - lo) // 8 + 1)
+                for idx in att:
+                    pos = idx - lo
+                    cu.attendance[pos >> 3] |= 1 << (pos & 7)
+        cu.notified = dict(u.get("notified", {}))
+        cu.level = u.get("level", 1)
+        cu.exp = u.get("exp", 0)
+        cu.rank_title = u.get("rank_title")
+        cu.badges = list(u.get("badges", []))
+        other = {k: v for k, v in u.items() if k not in COMPACT_USER_KEYS}
+        cu.other = other or None
+        return cu
+
+    def to_json(self) -> dict:
+        activity = {
+            day_str(idx): {"total": total, "by_channel": {str(cid): pts for cid, pts in by_ch.items()}}
+            for idx, (total, by_ch) in self.day_records().items()
+        }
+        doc = {
+            "attendance": [day_str(idx) for idx in self.attendance_days()],
+            "activity": activity,
+            "notified": dict(self.notified),
+            "level": self.level,
+            "exp": self.exp,
+            "rank_title": self.rank_title,
+            "badges": list(self.badges),
+        }
+        if self.other:
+            doc.update(self.other)
+        return doc
+
+    def state(self) -> tuple:
+        """marshal로 고정할 원자료(같은 프로세스 안 사본용)"""
+        return (self.base, self.totals.tobytes(),
+                {cid: (arr.typecode, arr.tobytes()) for cid, arr in self.channels.items()},
+                bytes(self.attendance), self.notified, self.level, self.exp, self.rank_title,
+                self.badges, self.other)
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "CompactUser":
+        cu = cls()
+        cu.base, totals, channels, attendance = state[:4]
+        cu.totals.frombytes(totals)
+        for cid, (typecode, raw) in channels.items():
+            arr = cu.channels[cid] = array(typecode)
+            arr.frombytes(raw)
+        cu.attendance = bytearray(attendance)
+        cu.notified, cu.level, cu.exp, cu.rank_title, cu.badges, cu.other = state[4:]
+        return cu
+
+COMPACT_USER_KEYS = {"attendance", "activity", "notified", "level", "exp", "rank_title", "badges"}
+
+def state_from_json(data: dict) -> dict:
+    """data.json 스키마(dict)로 읽은 상태의 사용자 기록을 CompactUser로 바꿈(제자리). data 반환"""
+    users = data.get("users")
+    if users:
+        for uid, u in users.items():
+            if isinstance(u, dict):
+                users[uid] = CompactUser.from_json(u)
+    return data
+
+# ========= 일 마감(지난 기간 확정) =========
+# 06:00 KST 논리 날짜 경계 이후 지난 날은 바뀌지 않으므로 한 번만 계산해 둠
+#   - 하루 목표 달성 여부 → 사용자별 비트셋
+#   - 끝난 주/월 → 합계/참여 인원/목표 달성 일수 + FrozenBoard 순위
+# 마감된 날에 늦게 점수가 들어오면(저널 재생/복원) 그날을 다시 열고 다음 마감 때 재확정
+
+def period_span(key: str) -> Tuple[datetime.date, datetime.date]:
+    """'YYYY-Www' / 'YYYY-MM' → (시작일, 종료일)"""
+    if "-W" in key:
+        y, w = key.split("-W")
+        start = datetime.date.fromisocalendar(int(y), int(w), 1)
+        return start, start + datetime.timedelta(days=6)
+    y, m = key.split("-")
+    return month_range(int(y), int(m))
+
+class PeriodSummary:
+    """마감된 주/월 요약(불변). ranking은 Leaderboards의 FrozenBoard를 그대로 공유"""
+    __slots__ = ("key", "start", "end", "total", "users", "goal_days", "ranking")
+
+    def __init__(self, key: str, ranking: FrozenBoard, closed: "ClosedPeriods"):
+        self.key = key
+        self.start, self.end = period_span(key)
+        self.ranking = ranking
+        self.total = sum(sc for _, sc in ranking.ranking)
+        self.users = len(ranking.ranking)
+        self.goal_days = sum(closed.goal_days(uid, self.start, self.end) for uid, _ in ranking.ranking)
+
+class ClosedPeriods:
+    """마감된 날/주/월의 확정 데이터
+    - goal_bits: 사용자별 하루 목표 달성일 비트셋(EPOCH_DAY 기준 일 오프셋).
+      EPOCH_DAY 이전 날은 비트로 담을 수 없어 추적하지 않음(조회는 사용자 기록으로)
+    - open: 아직 마감 안 된 날짜별 점수가 바뀐 사용자 → 마감 때 이 사용자만 확인
+    - weeks/months: 마감된 주/월 요약"""
+
+    def __init__(self, daily_goal: int = DAILY_GOAL_POINTS):
+        self.daily_goal = daily_goal
+        self.through = ""                  # 마지막으로 마감된 논리 날짜('YYYY-MM-DD')
+        self.goal_bits: Dict[str, int] = {}
+        self.open: Dict[str, set] = {}
+        self.weeks: Dict[str, PeriodSummary] = {}
+        self.months: Dict[str, PeriodSummary] = {}
+
+    def touch(self, uid: str, date_str: str):
+        if date_str >= EPOCH_DAY_STR:
+            self.open.setdefault(date_str, set()).add(uid)
+        if date_str <= self.through:
+            wk, mk = period_keys(date_str)
+            self.weeks.pop(wk, None)
+            self.months.pop(mk, None)
+
+    def close_days(self, data: dict, through: str) -> set:
+        """through(포함)까지의 열린 날짜를 확정. 확인한 사용자 ID 반환"""
+        users = data.get("users", {})
+        uids = set()
+        for ds in sorted(d for d in self.open if d <= through):
+            idx = day_index(ds)
+            if idx < 0:
+                # 예전 상태에 남아 있던 EPOCH_DAY 이전 날 → 음수 시프트 대신 버림
+                del self.open[ds]
+                continue
+            bit = 1 << idx
+            for uid in self.open.pop(ds):
+                u = peek_user(users, uid)
+                bits = self.goal_bits.get(uid, 0)
+                if u is not None and u.day_total(idx) >= self.daily_goal:
+                    bits |= bit
+                else:
+                    bits &= ~bit
+                if bits:
+                    self.goal_bits[uid] = bits
+                else:
+                    self.goal_bits.pop(uid, None)
+                uids.add(uid)
+        self.through = max(self.through, through)
+        return uids
+
+    def close_periods(self, boards: Leaderboards) -> List[PeriodSummary]:
+        """고정된(FrozenBoard) 주/월 중 모든 날이 마감된 기간을 요약으로 확정"""
+        added = []
+        for src, dst in ((boards.week, self.weeks), (boards.month, self.months)):
+            for key, board in list(src.items()):
+                if key in dst or not isinstance(board, FrozenBoard):
+                    continue
+                if period_span(key)[1].isoformat() > self.through:
+                    continue
+                dst[key] = summary = PeriodSummary(key, board, self)
+                added.append(summary)
+        return added
+
+    def goal_met(self, uid: str, date_str: str) -> bool | None:
+        """마감된 날이면 목표 달성 여부, 아직 열린 날(또는 늦은 점수로 다시 열림)이면 None"""
+        if date_str > self.through or date_str in self.open or date_str < EPOCH_DAY_STR:
+            return None
+        return bool(self.goal_bits.get(uid, 0) >> day_index(date_str) & 1)
+
+    def goal_days(self, uid: str, start: datetime.date, end: datetime.date) -> int:
+        """start~end(포함) 중 마감된 목표 달성일 수. EPOCH_DAY 이전 날은 세지 않음"""
+        lo = max((start - EPOCH_DAY).days, 0)
+        n = (end - EPOCH_DAY).days + 1 - lo
+        if n <= 0:
+            return 0
+        return (self.goal_bits.get(uid, 0) >> lo & ((1 << n) - 1)).bit_count()
+
+    def state(self) -> tuple:
+        """marshal로 고정할 원자료(정렬/16진 변환은 to_json에서 나중에)"""
+        return self.daily_goal, self.through, self.goal_bits, self.open
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "ClosedPeriods":
+        cp = cls(state[0])
+        cp.through, cp.goal_bits, cp.open = state[1], state[2], state[3]
+        return cp
+
+    def to_json(self) -> dict:
+        return {
+            "daily_goal": self.daily_goal,
+            "through": self.through,
+            "goal_bits": {uid: format(bits, "x") for uid, bits in self.goal_bits.items()},
+            "open": {ds: sorted(uids) for ds, uids in self.open.items()},
+        }
+
+    @classmethod
+    def from_json(cls, doc: dict, daily_goal: int = DAILY_GOAL_POINTS) -> "ClosedPeriods":
+        if doc.get("daily_goal") != daily_goal:
+            # 목표 점수가 바뀌었으면 비트를 믿을 수 없음 → 빈 상태(다음 마감 때는 열린 날만 확정)
+            return cls(daily_goal)
+        cp = cls(daily_goal)
+        cp.through = doc.get("through", "")
+        cp.goal_bits = {uid: int(h, 16) for uid, h in doc.get("goal_bits", {}).items()}
+        cp.open = {ds: set(uids) for ds, uids in doc.get("open", {}).items()}
+        return cp
+
+# ========= 바이너리 스냅샷(지연 로딩) =========
+# 파일 구조(리틀엔디언)
+#   헤더  : SNAP_HEADER (매직, 버전, 플래그, 사용자 수, 인덱스 위치/길이/CRC, 메타 길이/CRC)
+#   메타  : JSON {"doc": users 외 최상위 키, "agg": {"week", "month"}} — 시작 시 누계 복구용
+#   블록  : 사용자별 CompactUser 배열(채널 표, 일별 합계/채널 점수, 출석 비트) + 나머지 필드 JSON 꼬리
+#   인덱스: SNAP_INDEX × 사용자 수 (uid, 위치, 길이, CRC, 활동일 수)
+# 시작 시 헤더/메타/인덱스만 읽고, 사용자 블록은 처음 접근할 때 읽음
+SNAPSHOT_FORMAT = os.environ.get("SNAPSHOT_FORMAT", "json")   # "json" | "binary"
+SNAPSHOT_FILE = os.path.join(BASE_PATH, "data.snap")
+SNAP_MAGIC = b"DULGISNP"
+SNAP_VERSION = 2
+SNAP_HEADER = struct.Struct("<8sHHIQIIII")
+SNAP_INDEX = struct.Struct("<QQIII")
+SNAP_BLOCK = struct.Struct("<iIHII")     # base, 일수, 채널 수, 출석 바이트 수, 꼬리 길이
+SNAP_CHANNEL = struct.Struct("<QB")      # 채널 ID, 배열 폭(2/4바이트) — 블록마다 채널 수만큼
+# 버전 1 블록(읽기만): 채널은 CHANNEL_POINTS 순서 비트마스크, 합계 'H'/채널 'B'
+SNAP_BLOCK_V1 = struct.Struct("<BiIHII")  # flags, base, 일수, 채널 비트마스크, 출석 바이트 수, 꼬리 길이
+BLOCK_JSON_ONLY = 1
+CHANNEL_BY_INDEX = list(CHANNEL_POINTS)
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+def _from_le(typecode: str, raw: bytes) -> array:
+    arr = array(typecode)
+    arr.frombytes(raw)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+def encode_user_block(cu: CompactUser) -> Tuple[bytes, int]:
+    """CompactUser → (블록 바이트, 활동일 수)"""
+    n = len(cu.totals)
+    chans, body = [], [_le(cu.totals)]
+    for cid, arr in cu.channels.items():
+        chans.append(SNAP_CHANNEL.pack(cid, arr.itemsize))
+        body.append(_le(arr) + bytes(arr.itemsize * (n - len(arr))))
+    body.append(bytes(cu.attendance))
+    tail = json.dumps({
+        "notified": cu.notified,
+        "level": cu.level,
+        "exp": cu.exp,
+        "rank_title": cu.rank_title,
+        "badges": cu.badges,
+        "other": cu.other,
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    head = SNAP_BLOCK.pack(cu.base, n, len(chans), len(cu.attendance), len(tail))
+    return head + b"".join(chans) + b"".join(body) + tail, cu.day_count()
+
+def _decode_tail(cu: CompactUser, tail: dict):
+    cu.notified = tail["notified"]
+    cu.level, cu.exp, cu.rank_title, cu.badges = tail["level"], tail["exp"], tail["rank_title"], tail["badges"]
+    cu.other = tail.get("other")
+
+def decode_user_block(raw: bytes, version: int = SNAP_VERSION) -> CompactUser:
+    if version == 1:
+        return _decode_user_block_v1(raw)
+    base, n, n_ch, att_len, tail_len = SNAP_BLOCK.unpack_from(raw)
+    pos = SNAP_BLOCK.size
+    cu = CompactUser()
+    cu.base = base
+    chans = list(SNAP_CHANNEL.iter_unpack(raw[pos:pos + n_ch * SNAP_CHANNEL.size]))
+    pos += n_ch * SNAP_CHANNEL.size
+    cu.totals = _from_le("i", raw[pos:pos + 4 * n]); pos += 4 * n
+    for cid, width in chans:
+        cu.channels[cid] = _from_le("h" if width == 2 else "i", raw[pos:pos + width * n]); pos += width * n
+    cu.attendance = bytearray(raw[pos:pos + att_len]); pos += att_len
+    _decode_tail(cu, json.loads(raw[pos:pos + tail_len]))
+    return cu
+
+def _decode_user_block_v1(raw: bytes) -> CompactUser:
+    flags, base, n, mask, att_len, tail_len = SNAP_BLOCK_V1.unpack_from(raw)
+    pos = SNAP_BLOCK_V1.size
+    if flags & BLOCK_JSON_ONLY:
+        return CompactUser.from_json(json.loads(raw[pos:pos + tail_len]))
+    cu = CompactUser()
+    cu.base = base
+    cu.totals = array("i", _from_le("H", raw[pos:pos + 2 * n])); pos += 2 * n
+    for ci, cid in enumerate(CHANNEL_BY_INDEX):
+        if mask & (1 << ci):
+            cu.channels[cid] = array("h", _from_le("B", raw[pos:pos + n])); pos += n
+    cu.attendance = bytearray(raw[pos:pos + att_len]); pos += att_len
+    tail = json.loads(raw[pos:pos + tail_len])
+    _decode_tail(cu, tail)
+    for idx, ckey, pts in tail["extra"]:
+        cu._put(int(ckey), cu._slot(idx), pts)
+    return cu
+
+class SnapshotReader:
+    """열린 스냅샷 파일에서 헤더/인덱스만 읽고 블록은 요청 시 pread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        head = os.pread(self.fd, SNAP_HEADER.size, 0)
+        if len(head) < SNAP_HEADER.size:
+            raise SnapshotError(f"{path}: 헤더가 잘렸어요")
+        (magic, version, _flags, n_users, index_off, index_len, index_crc,
+         meta_len, meta_crc) = SNAP_HEADER.unpack(head)
+        if magic != SNAP_MAGIC:
+            raise SnapshotError(f"{path}: 스냅샷 파일이 아니에요")
+        if version not in (1, SNAP_VERSION):
+            raise SnapshotError(f"{path}: 지원하지 않는 버전 {version}")
+        self.version = version
+        meta = os.pread(self.fd, meta_len, SNAP_HEADER.size)
+        if zlib.crc32(meta) != meta_crc:
+            raise SnapshotError(f"{path}: 메타 체크섬 불일치")
+        raw_index = os.pread(self.fd, index_len, index_off)
+        if len(raw_index) != index_len or zlib.crc32(raw_index) != index_crc:
+            raise SnapshotError(f"{path}: 인덱스 체크섬 불일치")
+        if index_len != n_users * SNAP_INDEX.size:
+            raise SnapshotError(f"{path}: 인덱스 크기 불일치")
+        self.meta = json.loads(meta)
+        self.index: Dict[str, Tuple[int, int, int, int]] = {
+            str(uid): (off, length, crc, ndays) for uid, off, length, crc, ndays in SNAP_INDEX.iter_unpack(raw_index)
+        }
+
+    def raw_block(self, uid: str) -> Tuple[bytes, int, int]:
+        off, length, crc, ndays = self.index[uid]
+        raw = os.pread(self.fd, length, off)
+        if len(raw) != length or zlib.crc32(raw) != crc:
+            raise SnapshotError(f"{self.path}: 사용자 {uid} 블록 체크섬 불일치")
+        return raw, crc, ndays
+
+    def load_user(self, uid: str) -> CompactUser:
+        return decode_user_block(self.raw_block(uid)[0], self.version)
+
+class LazyUsers(dict):
+    """data["users"] 자리에 들어가는 dict. 아직 안 읽은 사용자는 인덱스로만 알고 있다가
+    처음 접근할 때 블록을 읽어 채움. 전체 순회(items/values)와 peek은 읽기 전용이라
+    안 읽은 사용자를 디코딩만 하고 채워 두지 않음 → 내보내기/마감/누계 재계산 뒤에도 메모리는 그대로"""
+
+    def __init__(self, reader: SnapshotReader):
+        super().__init__()
+        self.reader = reader
+        self._pending = set(reader.index)
+
+    def _load(self, uid: str) -> CompactUser:
+        rec = self.reader.load_user(uid)
+        # 다른 스레드가 먼저 채웠으면 그쪽(변경이 반영됐을 수 있음)을 유지
+        rec = dict.setdefault(self, uid, rec)
+        self._pending.discard(uid)
+        return rec
+
+    @classmethod
+    def restore(cls, reader: SnapshotReader, pending, loaded: dict) -> "LazyUsers":
+        """freeze_data로 고정한 상태에서 다시 만듦(같은 스냅샷 파일을 공유)"""
+        users = cls(reader)
+        users._pending = set(pending)
+        dict.update(users, loaded)
+        return users
+
+    def is_loaded(self, uid: str) -> bool:
+        return dict.__contains__(self, uid)
+
+    def load_all(self):
+        for uid in list(self._pending):
+            if uid in self._pending:
+                self._load(uid)
+
+    def day_count(self) -> int:
+        loaded = sum(u.day_count() for u in list(dict.values(self)))
+        return loaded + sum(self.reader.index[uid][3] for uid in list(self._pending))
+
+    def __getitem__(self, uid):
+        if dict.__contains__(self, uid):
+            return dict.__getitem__(self, uid)
+        if uid in self._pending:
+            return self._load(uid)
+        raise KeyError(uid)
+
+    def __setitem__(self, uid, value):
+        dict.__setitem__(self, uid, value)
+        self._pending.discard(uid)
+
+    def __delitem__(self, uid):
+        if uid in self._pending:
+            self._pending.discard(uid)
+            return
+        dict.__delitem__(self, uid)
+
+    def __contains__(self, uid):
+        return dict.__contains__(self, uid) or uid in self._pending
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._pending)
+
+    def __iter__(self):
+        # 스냅샷 인덱스 순서 유지 → 다시 저장해도 블록 배치가 그대로
+        index = self.reader.index
+        return iter([uid for uid in index if uid in self]
+                    + [uid for uid in list(dict.keys(self)) if uid not in index])
+
+    def keys(self):
+        return list(self)
+
+    def get(self, uid, default=None):
+        try:
+            return self[uid]
+        except KeyError:
+            return default
+
+    def setdefault(self, uid, default=None):
+        if uid in self:
+            return self[uid]
+        self[uid] = default
+        return default
+
+    def pop(self, uid, *default):
+        if uid in self._pending:
+            self._load(uid)
+        return dict.pop(self, uid, *default)
+
+    def peek(self, uid, default=None):
+        """읽기 전용 조회. 안 읽은 사용자는 블록을 디코딩만 하고 채워 두지 않음(바꿔도 반영 안 됨)"""
+        if dict.__contains__(self, uid):
+            return dict.__getitem__(self, uid)
+        if uid in self._pending:
+            return self.reader.load_user(uid)
+        return default
+
+    def items(self):
+        for uid in self:
+            u = self.peek(uid)
+            if u is not None:
+                yield uid, u
+
+    def values(self):
+        for _, u in self.items():
+            yield u
+
+def peek_user(users: dict, uid: str):
+    """읽기 전용 조회(LazyUsers면 안 읽은 사용자를 채워 두지 않음). 여러 사용자를 훑는 경로용"""
+    return users.peek(uid) if isinstance(users, LazyUsers) else users.get(uid)
+
+def store_day_count(data: dict) -> int:
+    users = data.get("users", {})
+    if isinstance(users, LazyUsers):
+        return users.day_count()
+    return sum(u.day_count() for u in list(users.values()))
+
+def encode_snapshot(data: dict, totals: "ActivityTotals | None" = None, agg: dict | None = None) -> bytes:
+    """data(+누계) → 바이너리 스냅샷. 아직 안 읽은 LazyUsers 블록은 원본 바이트를 그대로 복사.
+    agg(freeze_data로 고정한 누계)가 있으면 totals 대신 사용"""
+    users = data.get("users", {})
+    lazy = users if isinstance(users, LazyUsers) else None
+    # 예전 버전 스냅샷의 블록은 그대로 못 씀 → 디코딩해서 다시 인코딩
+    copy_raw = lazy is not None and lazy.reader.version == SNAP_VERSION
+    if agg is None:
+        if totals is None:
+            totals = ActivityTotals()
+            totals.rebuild(data)
+        agg = totals.snapshot_agg()
+    doc = {k: v for k, v in data.items() if k != "users"}
+    meta = json.dumps({"doc": doc, "agg": agg}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    off = SNAP_HEADER.size + len(meta)
+    blocks, index = [], []
+    for uid in list(users):
+        if not uid.isdigit():
+            raise SnapshotError(f"숫자가 아닌 사용자 ID {uid!r}는 바이너리 스냅샷에 담을 수 없어요")
+        if copy_raw and uid in lazy._pending:
+            raw, crc, ndays = lazy.reader.raw_block(uid)
+        else:
+            raw, ndays = encode_user_block(lazy.peek(uid) if lazy is not None else users[uid])
+            crc = zlib.crc32(raw)
+        blocks.append(raw)
+        index.append(SNAP_INDEX.pack(int(uid), off, len(raw), crc, ndays))
+        off += len(raw)
+    raw_index = b"".join(index)
+    head = SNAP_HEADER.pack(SNAP_MAGIC, SNAP_VERSION, 0, len(index), off, len(raw_index),
+                            zlib.crc32(raw_index), len(meta), zlib.crc32(meta))
+    return head + meta + b"".join(blocks) + raw_index
+
+class FrozenState(NamedTuple):
+    """한 순간에 고정한 data(+누계). 루프 위에서 StateFreezer.freeze로 만들고 executor에서 thaw"""
+    payload: bytes                      # marshal(users 외 최상위 키, 마감 정보)
+    users: Dict[str, bytes]             # uid → marshal(CompactUser.state())
+    agg: Dict[str, bytes] | None        # uid → marshal((주간 누계, 월간 누계)), 누계 없이 고정했으면 None
+    reader: SnapshotReader | None       # LazyUsers였다면 블록을 그대로 쓸 사용자가 있는 스냅샷
+    pending: frozenset                  # reader 블록을 그대로 쓰는 사용자(안 읽었거나 읽고 안 바뀜)
+
+    def thaw(self) -> Tuple[dict, dict | None]:
+        doc, closed = marshal.loads(self.payload)
+        users = {uid: CompactUser.from_state(marshal.loads(raw)) for uid, raw in self.users.items()}
+        if self.reader is not None:
+            users = LazyUsers.restore(self.reader, self.pending, users)
+        doc["users"] = users
+        if self.agg is None:
+            return doc, None
+        week, month = {}, {}
+        for uid, raw in self.agg.items():
+            w, m = marshal.loads(raw)
+            if w:
+                week[uid] = w
+            if m:
+                month[uid] = m
+        return doc, {"week": week, "month": month, "closed": ClosedPeriods.from_state(closed).to_json()}
+
+class StateFreezer:
+    """data(+누계)를 await 없이 루프 위에서 바이트로 고정. 사용자별 marshal 결과를 들고 있다가
+    지난번 이후 바뀐(touch) 사용자만 다시 만듦 → 컴팩션/백업마다 길드 전체를 복사하지 않음.
+    사용자는 CompactUser.state()(배열 바이트 + 기본 자료형)라 marshal로 충분(같은 프로세스 안 사본). pickle보다 몇 배, JSON보다도 빠름.
+    변경은 WriteBehindStore가 저널 기록/mark_dirty 때 알려 주고, data/누계 객체가 통째로 바뀌면(복원) 전부 다시"""
+
+    def __init__(self):
+        self._users: Dict[str, bytes] = {}
+        self._agg: Dict[str, bytes] = {}
+        self._users_of = None           # 캐시를 만든 users 객체(교체 감지)
+        self._agg_of: tuple = ()        # 캐시를 만든 (totals.week, totals.month)
+        self._dirty_users: set | None = None   # None = 전부 다시
+        self._dirty_agg: set | None = None
+
+    def touch(self, uid: str):
+        if self._dirty_users is not None:
+            self._dirty_users.add(uid)
+        if self._dirty_agg is not None:
+            self._dirty_agg.add(uid)
+
+    def invalidate(self):
+        self._dirty_users = self._dirty_agg = None
+
+    def freeze(self, data: dict, totals: "ActivityTotals | None" = None) -> FrozenState:
+        users = data.get("users", {})
+        lazy = users if isinstance(users, LazyUsers) else None
+        blobs = self._users
+        if self._dirty_users is None or self._users_of is not users:
+            blobs.clear()
+            dirty = None
+        else:
+            dirty = self._dirty_users
+        self._users_of, self._dirty_users = users, set()
+        if lazy is not None:
+            # 안 읽은 사용자와 읽기만 한 사용자는 스냅샷 블록을 그대로 씀
+            index = lazy.reader.index
+            loaded = dict.keys(lazy)
+            redo = loaded if dirty is None else dirty | {uid for uid in loaded - blobs.keys() if uid not in index}
+            get = functools.partial(dict.get, lazy)
+        else:
+            redo = users.keys() if dirty is None else dirty | (users.keys() - blobs.keys())
+            get = users.get
+        for uid in list(redo):
+            u = get(uid)
+            if u is None:
+                blobs.pop(uid, None)
+            else:
+                blobs[uid] = marshal.dumps(u.state())
+        for uid in [uid for uid in blobs if uid not in users]:
+            del blobs[uid]
+        if lazy is not None:
+            frozen_users = dict(blobs)
+            pending = frozenset(uid for uid in lazy.reader.index if uid not in blobs and uid in lazy)
+        else:
+            frozen_users = {uid: blobs[uid] for uid in users}
+            pending = frozenset()
+
+        agg, closed = None, None
+        if totals is not None:
+            agg = self._freeze_agg(totals)
+            closed = totals.closed.state()
+        doc = {k: v for k, v in data.items() if k != "users"}
+        return FrozenState(marshal.dumps((doc, closed)), frozen_users, agg,
+                           lazy.reader if lazy is not None else None, pending)
+
+    def _freeze_agg(self, totals: "ActivityTotals") -> Dict[str, bytes]:
+        blobs = self._agg
+        week, month = totals.week, totals.month
+        if self._dirty_agg is None or not self._agg_of or self._agg_of[0] is not week or self._agg_of[1] is not month:
+            blobs.clear()
+            redo = week.keys() | month.keys()
+        else:
+            redo = self._dirty_agg | ((week.keys() | month.keys()) - blobs.keys())
+        self._agg_of, self._dirty_agg = (week, month), set()
+        for uid in redo:
+            w, m = week.get(uid), month.get(uid)
+            if w or m:
+                blobs[uid] = marshal.dumps((w, m))
+            else:
+                blobs.pop(uid, None)
+        return dict(blobs)
+
+def freeze_data(data: dict, totals: "ActivityTotals | None" = None) -> FrozenState:
+    """data의 지금 상태를 통째로 고정(캐시 없음). 반복해서 고정할 때는 StateFreezer"""
+    return StateFreezer().freeze(data, totals)
+
+def snapshot_json(frozen: FrozenState) -> bytes:
+    return serialize_data(frozen.thaw()[0])
+
+def snapshot_binary(frozen: FrozenState) -> bytes:
+    data, agg = frozen.thaw()
+    return encode_snapshot(data, agg=agg)
+
+def open_snapshot(path: str = SNAPSHOT_FILE, totals: "ActivityTotals | None" = None,
+                  ref_date: datetime.date | None = None) -> dict:
+    """헤더/메타/인덱스만 읽어 data dict 구성(users는 LazyUsers). totals가 있으면 누계 복구"""
+    reader = SnapshotReader(path)
+    data = dict(reader.meta.get("doc", {}))
+    data["users"] = LazyUsers(reader)
+    if totals is not None:
+        agg = reader.meta.get("agg", {})
+        totals.load(agg.get("week", {}), agg.get("month", {}), ref_date, agg.get("closed"))
+    return data
+
+def load_startup_state(data_file: str = DATA_FILE, journal_file: str = JOURNAL_FILE,
+                       snapshot_file: str = SNAPSHOT_FILE,
+                       daily_goal: int = DAILY_GOAL_POINTS) -> Tuple[dict, "ActivityTotals"]:
+    """시작 시 상태 로딩. 바이너리 모드면 스냅샷 인덱스만 읽고 누계는 메타에서 복구"""
+    today = datetime.datetime.now(KST).date()
+    t = ActivityTotals(daily_goal)
+    if SNAPSHOT_FORMAT == "binary" and os.path.exists(snapshot_file):
+        data = open_snapshot(snapshot_file, t)
+        replay_journal(data, journal_file, t)
+        t.boards.freeze_before(today)
+    else:
+        # JSON 스냅샷(또는 바이너리로 처음 전환) → 다음 컴팩션부터 설정된 포맷으로 저장
+        data = load_state(data_file, journal_file)
+        t.rebuild(data, today)
+    return data, t
+
+# ========= 저장소 백엔드(JSON / SQLite) =========
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")   # "json" | "sqlite"
+SQLITE_FILE = os.path.join(BASE_PATH, "data.sqlite3")
+
+def month_range(year: int, month: int) -> Tuple[datetime.date, datetime.date]:
+    first = datetime.date(year, month, 1)
+    nxt = datetime.date(year + (month == 12), month % 12 + 1, 1)
+    return first, nxt - datetime.timedelta(days=1)
+
+class JsonStorage:
+    """메모리 모델(data)을 그대로 감싼 기본 백엔드.
+    쓰기는 핸들러가 dict에 직접 반영하므로 shadow_* 는 아무것도 하지 않음."""
+    name = "json"
+
+    def __init__(self, source, totals: ActivityTotals | None = None):
+        self.source = source
+        self.totals = totals
+
+    async def week_total(self, uid: str, ref_date: datetime.date) -> int:
+        if self.totals is not None:
+            return self.totals.week_total(uid, ref_date)
+        return weekly_total_for_user(self.source(), uid, ref_date)
+
+    async def month_total(self, uid: str, year: int, month: int) -> int:
+        if self.totals is not None:
+            return self.totals.month_total(uid, year, month)
+        return monthly_total_for_user(self.source(), uid, year, month)
+
+    async def week_leaderboard(self, ref_date: datetime.date, limit: int | None = None) -> List[Tuple[str, int]]:
+        if self.totals is not None:
+            return self.totals.boards.week_board(ref_date).top(limit)
+        pairs = [p for p in all_users_week_total(self.source(), ref_date) if p[1] > 0]
+        return pairs[:limit] if limit else pairs
+
+    async def month_leaderboard(self, year: int, month: int, limit: int | None = None) -> List[Tuple[str, int]]:
+        if self.totals is not None:
+            return self.totals.boards.month_board(year, month).top(limit)
+        pairs = [p for p in all_users_month_total(self.source(), year, month) if p[1] > 0]
+        return pairs[:limit] if limit else pairs
+
+    def shadow_award(self, uid: str, date_str: str, channel_id: int, points: int, daily_max: int):
+        pass
+
+    def shadow_attend(self, uid: str, date_str: str):
+        pass
+
+    def shadow_notify(self, uid: str, key: str):
+        pass
+
+    async def reconcile(self, data: dict, seq: int) -> bool:
+        return False
+
+    async def mark_synced(self, seq: int, generation: str):
+        pass
+
+    async def close(self):
+        pass
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    uid TEXT PRIMARY KEY,
+    level INTEGER NOT NULL DEFAULT 1,
+    exp INTEGER NOT NULL DEFAULT 0,
+    rank_title TEXT,
+    badges TEXT NOT NULL DEFAULT '[]'
+);
+-- (user, date) 조회는 기본키로, (date, channel) 집계는 보조 인덱스로
+CREATE TABLE IF NOT EXISTS activity (
+    uid TEXT NOT NULL,
+    day TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (uid, day, channel_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_activity_day_channel ON activity (day, channel_id, uid, points);
+CREATE TABLE IF NOT EXISTS attendance (
+    uid TEXT NOT NULL,
+    day TEXT NOT NULL,
+    PRIMARY KEY (uid, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS notified (
+    uid TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (uid, key)
+) WITHOUT ROWID;
+-- synced: 정상 종료 시점의 "journal_seq generation". 실행 중에는 비워 둠(비었으면 재가져오기)
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+class SqliteStorage:
+    """SQLite 백엔드. 모든 DB 작업은 전용 스레드 1개에서 순서대로 실행.
+    메모리 상태가 기준이고 SQLite는 뒤따라가는 사본: 시작 시 표식이 어긋나면 통째로 다시 가져옴"""
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_FILE):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._write_failed = False
+
+    # --- 스레드 내부 ---
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SQLITE_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _award(self, uid, date_str, channel_id, points, daily_max) -> bool:
+        db = self._db()
+        with db:
+            db.execute("INSERT OR IGNORE INTO users (uid) VALUES (?)", (uid,))
+            cur = db.execute(
+                "INSERT INTO activity (uid, day, channel_id, points) SELECT ?, ?, ?, ? WHERE ? <= ? "
+                "ON CONFLICT (uid, day, channel_id) DO UPDATE SET points = points + excluded.points "
+                "WHERE activity.points + excluded.points <= ?",
+                (uid, date_str, channel_id, points, points, daily_max, daily_max),
+            )
+        return cur.rowcount > 0
+
+    def _attend(self, uid, date_str) -> bool:
+        db = self._db()
+        with db:
+            db.execute("INSERT OR IGNORE INTO users (uid) VALUES (?)", (uid,))
+            cur = db.execute("INSERT OR IGNORE INTO attendance (uid, day) VALUES (?, ?)", (uid, date_str))
+        return cur.rowcount > 0
+
+    def _notify(self, uid, key) -> bool:
+        db = self._db()
+        with db:
+            cur = db.execute("INSERT OR IGNORE INTO notified (uid, key) VALUES (?, ?)", (uid, key))
+        return cur.rowcount > 0
+
+    def _user_total(self, uid, start, end) -> int:
+        row = self._db().execute(
+            "SELECT COALESCE(SUM(points), 0) FROM activity WHERE uid = ? AND day BETWEEN ? AND ?",
+            (uid, start, end),
+        ).fetchone()
+        return row[0]
+
+    def _leaderboard(self, start, end, limit) -> List[Tuple[str, int]]:
+        sql = ("SELECT uid, SUM(points) AS total FROM activity WHERE day BETWEEN ? AND ? "
+               "GROUP BY uid HAVING total > 0 ORDER BY total DESC, uid")
+        params: tuple = (start, end)
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return [(uid, total) for uid, total in self._db().execute(sql, params)]
+
+    def _import(self, data: dict):
+        """메모리 상태(CompactUser) → 테이블(기존 내용은 교체)"""
+        db = self._db()
+        with db:
+            for t in ("users", "activity", "attendance", "notified"):
+                db.execute(f"DELETE FROM {t}")
+            for uid, u in data.get("users", {}).items():
+                db.execute(
+                    "INSERT INTO users (uid, level, exp, rank_title, badges) VALUES (?, ?, ?, ?, ?)",
+                    (uid, u.level, u.exp, u.rank_title, json.dumps(u.badges, ensure_ascii=False)),
+                )
+                rows = []
+                for idx, (total, by_ch) in u.day_records().items():
+                    ds = day_str(idx)
+                    for cid, pts in by_ch.items():
+                        rows.append((uid, ds, cid, pts))
+                    # 채널 구분 없이 total만 남은 구버전 기록은 channel_id 0으로 보존
+                    rest = total - sum(by_ch.values())
+                    if rest:
+                        rows.append((uid, ds, 0, rest))
+                db.executemany("INSERT INTO activity (uid, day, channel_id, points) VALUES (?, ?, ?, ?)", rows)
+                db.executemany("INSERT OR IGNORE INTO attendance (uid, day) VALUES (?, ?)",
+                               [(uid, day_str(idx)) for idx in u.attendance_days()])
+                db.executemany("INSERT OR IGNORE INTO notified (uid, key) VALUES (?, ?)",
+                               [(uid, k) for k, v in u.notified.items() if v])
+
+    def _marker(self) -> str | None:
+        row = self._db().execute("SELECT value FROM meta WHERE key = 'synced'").fetchone()
+        return row[0] if row else None
+
+    def _set_marker(self, seq: int | None, generation: str = ""):
+        db = self._db()
+        with db:
+            if seq is None:
+                db.execute("DELETE FROM meta WHERE key = 'synced'")
+            else:
+                db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('synced', ?)", (f"{seq} {generation}",))
+
+    def _reconcile(self, frozen: FrozenState | None):
+        """frozen이 있으면 그 상태로 다시 가져옴. 이후 shadow 쓰기가 이어지므로
+        표식은 지워 두고 정상 종료 때 다시 기록"""
+        if frozen is not None:
+            self._import(frozen.thaw()[0])
+        self._set_marker(None)
+
+    def _mark_synced(self, seq: int, generation: str):
+        # 앞서 큐에 넣은 shadow 쓰기가 모두 끝난 뒤 실행 → 실패 여부가 확정된 시점에 판단
+        if not self._write_failed:
+            self._set_marker(seq, generation)
+
+    def _shadow(self, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            # 빠진 쓰기가 있으면 종료 때 동기화 표식을 남기지 않음 → 다음 시작에서 다시 가져옴
+            self._write_failed = True
+            print("⚠️ SQLite 쓰기 실패:", e)
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- 비동기 API ---
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _submit(self, fn, *args):
+        self._executor.submit(self._shadow, fn, *args)
+
+    async def award(self, uid: str, date_str: str, channel_id: int, points: int, daily_max: int) -> bool:
+        return await self._call(self._award, uid, date_str, channel_id, points, daily_max)
+
+    async def attend(self, uid: str, date_str: str) -> bool:
+        return await self._call(self._attend, uid, date_str)
+
+    async def notify(self, uid: str, key: str) -> bool:
+        return await self._call(self._notify, uid, key)
+
+    async def week_total(self, uid: str, ref_date: datetime.date) -> int:
+        start, end = get_week_range(ref_date)
+        return await self._call(self._user_total, uid, start.isoformat(), end.isoformat())
+
+    async def month_total(self, uid: str, year: int, month: int) -> int:
+        start, end = month_range(year, month)
+        return await self._call(self._user_total, uid, start.isoformat(), end.isoformat())
+
+    async def week_leaderboard(self, ref_date: datetime.date, limit: int | None = None) -> List[Tuple[str, int]]:
+        start, end = get_week_range(ref_date)
+        return await self._call(self._leaderboard, start.isoformat(), end.isoformat(), limit)
+
+    async def month_leaderboard(self, year: int, month: int, limit: int | None = None) -> List[Tuple[str, int]]:
+        start, end = month_range(year, month)
+        return await self._call(self._leaderboard, start.isoformat(), end.isoformat(), limit)
+
+    async def import_json(self, data: dict):
+        await self._call(self._import, data)
+
+    async def reconcile(self, data: dict, seq: int) -> bool:
+        """(액터 Exclusive 안에서) 표식이 (seq, generation)과 다르면(비정상 종료, 오프라인 재작성, 새 DB)
+        다시 가져옴. 가져올 상태는 루프 위에서 고정한 사본 → sqlite 스레드가 라이브 data를 훑지 않음"""
+        stale = await self._call(self._marker) != f"{seq} {generation_of(data)}"
+        await self._call(self._reconcile, freeze_data(data) if stale else None)
+        return stale
+
+    async def mark_synced(self, seq: int, generation: str):
+        await self._call(self._mark_synced, seq, generation)
+
+    # 메모리 모델과 나란히 쓸 때: 결과를 기다리지 않고 같은 스레드 큐에 적재
+    def shadow_award(self, uid: str, date_str: str, channel_id: int, points: int, daily_max: int):
+        self._submit(self._award, uid, date_str, channel_id, points, daily_max)
+
+    def shadow_attend(self, uid: str, date_str: str):
+        self._submit(self._attend, uid, date_str)
+
+    def shadow_notify(self, uid: str, key: str):
+        self._submit(self._notify, uid, key)
+
+    async def close(self):
+        await self._call(self._close)
+        self._executor.shutdown(wait=True)
+
+def migrate_json_to_sqlite(json_path: str = DATA_FILE, db_path: str = SQLITE_FILE) -> int:
+    """data.json(+같은 폴더의 저널) → SQLite 1회성 마이그레이션. 옮긴 사용자 수 반환"""
+    data = load_state(json_path, os.path.join(os.path.dirname(json_path), "journal.jsonl"))
+    st = SqliteStorage(db_path)
+    try:
+        st._import(data)
+        st._set_marker(journal_seq_of(data), generation_of(data))
+    finally:
+        st._close()
+        st._executor.shutdown(wait=False)
+    return len(data.get("users", {}))
+
+async def compare_storages(a, b, ref_date: datetime.date) -> List[str]:
+    """두 백엔드의 이번 주/이번 달 순위·합계가 같은지 비교. 차이 목록 반환"""
+    diffs = []
+    wa, wb = await a.week_leaderboard(ref_date), await b.week_leaderboard(ref_date)
+    if dict(wa) != dict(wb):
+        for uid in sorted(set(dict(wa)) | set(dict(wb))):
+            if dict(wa).get(uid, 0) != dict(wb).get(uid, 0):
+                diffs.append(f"주간 {uid}: {a.name}={dict(wa).get(uid, 0)} / {b.name}={dict(wb).get(uid, 0)}")
+    ma = await a.month_leaderboard(ref_date.year, ref_date.month)
+    mb = await b.month_leaderboard(ref_date.year, ref_date.month)
+    if dict(ma) != dict(mb):
+        for uid in sorted(set(dict(ma)) | set(dict(mb))):
+            if dict(ma).get(uid, 0) != dict(mb).get(uid, 0):
+                diffs.append(f"월간 {uid}: {a.name}={dict(ma).get(uid, 0)} / {b.name}={dict(mb).get(uid, 0)}")
+    return diffs
+
+# ========= 샤딩 / 워커 프로세스 =========
+# SHARD_COUNT > 0 → AutoShardedBot. WORKER_COUNT > 1이면 샤드를 프로세스별로 나눠 맡고
+# 각 프로세스는 자기 샤드에 속한 길드 파티션만 읽고 저장함(샤드 = (guild_id >> 22) % SHARD_COUNT)
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", "0"))
+WORKER_COUNT = int(os.environ.get("WORKER_COUNT", "1"))
+WORKER_INDEX = int(os.environ.get("WORKER_INDEX", "0"))
+if WORKER_COUNT > 1 and SHARD_COUNT < WORKER_COUNT:
+    raise SystemExit("⚠️ WORKER_COUNT > 1이면 SHARD_COUNT가 WORKER_COUNT 이상이어야 해요")
+
+def shard_of(guild_id: int, shard_count: int = SHARD_COUNT) -> int:
+    return (guild_id >> 22) % shard_count if shard_count else 0
+
+def worker_shard_ids() -> List[int] | None:
+    if WORKER_COUNT <= 1:
+        return None
+    return [sid for sid in range(SHARD_COUNT) if sid % WORKER_COUNT == WORKER_INDEX]
+
+def owns_guild(guild_id: int) -> bool:
+    """이 프로세스가 맡은 샤드의 길드인지"""
+    return WORKER_COUNT <= 1 or shard_of(guild_id) % WORKER_COUNT == WORKER_INDEX
+
+def run_workers(n: int) -> int:
+    """봇을 n개 프로세스로 실행(각자 WORKER_INDEX와 PORT+i). SIGTERM은 모두에게 전달"""
+    shards = max(SHARD_COUNT, n)
+    port = int(os.environ.get("PORT", "8080"))
+    procs = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            env={**os.environ, "SHARD_COUNT": str(shards), "WORKER_COUNT": str(n),
+                 "WORKER_INDEX": str(i), "PORT": str(port + i)},
+        )
+        for i in range(n)
+    ]
+    signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in procs])
+    return max(p.wait() for p in procs)
+
+# ========= Discord =========
+intents = discord.Intents.default()
+intents.message_content = True
+intents.members = True
+
+class DulgiBot(commands.AutoShardedBot if SHARD_COUNT else commands.Bot):
+    async def setup_hook(self):
+        partitions.load()
+        for part in partitions:
+            part.persistence.start()
+            part.actor.start()
+            await part.actor.call(Mutate(rollover_day))   # 꺼져 있던 동안 지난 날 마감
+            # SQLite가 메모리 상태와 어긋났으면(첫 실행/비정상 종료/오프라인 재작성) 액터를 멈춘 채 다시 채움
+            if await part.actor.exclusive(functools.partial(part.storage.reconcile, part.data, part.persistence.seq)):
+                print(f"✅ [{part.guild_id}] 현재 상태 → SQLite 다시 가져옴")
+        outbox.start()
+        self.loop_lag_task = asyncio.create_task(metrics.sample_loop_lag())
+        self.rollover_task = asyncio.create_task(schedule_day_rollover_loop())
+        self.backup_tasks = [asyncio.create_task(schedule_daily_backup_loop(part)) for part in partitions]
+        self.web_runner = await start_web_server()
+        # Render 재배포 시 SIGTERM → 정상 종료 경로(close)로 유도
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.create_task(self.close())
+            )
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    async def close(self):
+        # 종료 직전 남은 변경을 동기적으로 반영
+        runner = getattr(self, "web_runner", None)
+        if runner is not None:
+            await runner.cleanup()
+            self.web_runner = None
+        for part in partitions:
+            await part.actor.aclose()    # 접수된 명령을 모두 반영한 뒤 저장
+        await outbox.aclose()
+        for part in partitions:
+            await part.persistence.aclose()
+            await part.storage.mark_synced(part.persistence.seq, generation_of(part.data))
+            await part.storage.close()
+        await super().close()
+
+bot = DulgiBot(command_prefix="!", intents=intents,
+               **({"shard_count": SHARD_COUNT, "shard_ids": worker_shard_ids()} if SHARD_COUNT else {}))
+
+# ========= 닉네임 조회(캐시 + 동시 조회) =========
+NAME_CACHE_TTL_SEC = 6 * 3600
+NAME_MISS_TTL_SEC = 600          # 탈퇴 등으로 못 찾은 ID는 짧게만 기억
+NAME_CACHE_MAX = 50000
+NAME_FETCH_CONCURRENCY = 8
+
+class MemberNameCache:
+    """표시 이름 조회: 자체 TTL/LRU 캐시 → 게이트웨이 멤버 캐시 → REST(동시, 제한)"""
+
+    def __init__(self, ttl: float = NAME_CACHE_TTL_SEC, max_size: int = NAME_CACHE_MAX,
+                 concurrency: int = NAME_FETCH_CONCURRENCY):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.concurrency = concurrency
+        self._cache: "collections.OrderedDict[Tuple[int, str], Tuple[str, float]]" = collections.OrderedDict()
+        self.stats = {"hits": 0, "gateway": 0, "fetched": 0, "missing": 0}
+
+    def put(self, guild_id: int, uid: str, name: str, ttl: float | None = None):
+        key = (guild_id, uid)
+        self._cache[key] = (name, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def forget(self, guild_id: int, uid: str):
+        self._cache.pop((guild_id, uid), None)
+
+    def _get(self, guild_id: int, uid: str) -> str | None:
+        key = (guild_id, uid)
+        hit = self._cache.get(key)
+        if hit is None:
+            return None
+        if hit[1] < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return hit[0]
+
+    async def resolve_many(self, guild: discord.Guild, uids: List[str]) -> Dict[str, str]:
+        """uid → 표시 이름. 끝내 못 찾으면 uid 그대로"""
+        names: Dict[str, str] = {}
+        misses: List[str] = []
+        for uid in uids:
+            name = self._get(guild.id, uid)
+            if name is not None:
+                self.stats["hits"] += 1
+                names[uid] = name
+                continue
+            member = guild.get_member(int(uid))
+            if member is not None:
+                self.stats["gateway"] += 1
+                names[uid] = member.display_name
+                self.put(guild.id, uid, member.display_name)
+            else:
+                misses.append(uid)
+
+        if misses:
+            sem = asyncio.Semaphore(self.concurrency)
+
+            async def fetch(uid: str):
+                async with sem:
+                    try:
+                        member = await guild.fetch_member(int(uid))
+                    except (discord.NotFound, discord.Forbidden):
+                        self.stats["missing"] += 1
+                        self.put(guild.id, uid, uid, ttl=NAME_MISS_TTL_SEC)
+                        return uid, uid
+                    except discord.HTTPException:
+                        self.stats["missing"] += 1
+                        return uid, uid
+                self.stats["fetched"] += 1
+                self.put(guild.id, uid, member.display_name)
+                return uid, member.display_name
+
+            for uid, name in await asyncio.gather(*(fetch(u) for u in misses)):
+                names[uid] = name
+        return names
+
+member_names = MemberNameCache()
+
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    member_names.put(after.guild.id, str(after.id), after.display_name)
+
+@bot.event
+async def on_member_remove(member: discord.Member):
+    member_names.forget(member.guild.id, str(member.id))
+
+def is_admin(member: discord.Member) -> bool:
+    try:
+        return member.guild_permissions.manage_guild
+    except Exception:
+        return False
+
+@bot.event
+async def on_ready():
+    # 게이트웨이 재연결 때마다 불리므로 여기서는 태스크/서버를 시작하지 않음(setup_hook에서 1회)
+    print(f"✅ 로그인 완료: {bot.user}")
+
+# ========= DM 발송 큐(outbox) =========
+DM_WORKERS = 4
+DM_QUEUE_MAX = 1000           # 워커당 대기 한도(넘으면 버림)
+DM_MAX_ATTEMPTS = 4
+DM_BACKOFF_BASE_SEC = 1.0
+DM_RETRY_AFTER_MAX_SEC = 60.0   # 429 Retry-After가 이보다 길면 이만큼만 기다림(워커가 오래 멈추지 않게)
+DM_CLOSED_TTL_SEC = 24 * 3600   # DM 차단으로 기록한 사용자는 이 시간 뒤 다시 시도
+
+def retry_after_of(exc: discord.HTTPException) -> float | None:
+    """429 응답의 Retry-After 헤더(초). 없거나 읽을 수 없으면 None"""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = float(headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+    return min(max(value, 0.0), DM_RETRY_AFTER_MAX_SEC)
+
+class DMOutbox:
+    """DM은 큐에 넣기만 하고 워커들이 백그라운드에서 발송.
+    수신자별로 같은 워커에 배정 → 한 사람에게 가는 DM 순서 보장"""
+
+    def __init__(self, workers: int = DM_WORKERS, maxsize: int = DM_QUEUE_MAX):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.closed_dm: Dict[int, float] = {}   # DM 차단 사용자 → 다시 시도할 시각(monotonic)
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._inflight: set = set()             # 큐 없이 바로 띄운 발송 태스크(참조 유지용)
+        self.stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "retried": 0,
+            "failed": 0,
+            "dropped": 0,
+            "forbidden": 0,
+            "last_send_ms": 0.0,
+            "max_send_ms": 0.0,
+            "total_send_ms": 0.0,
+        }
+
+    def _count(self, event: str):
+        # summary()용 누적값 + /metrics 카운터(dulgi_dm_events_total{event=...})
+        self.stats[event] += 1
+        metrics.inc("dulgi_dm_events_total", event=event)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queues = [asyncio.Queue(maxsize=self.maxsize) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._worker(q)) for q in self._queues]
+
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def is_closed(self, uid: int) -> bool:
+        until = self.closed_dm.get(uid)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self.closed_dm[uid]
+            return False
+        return True
+
+    def send(self, user: discord.abc.User, content: str, view: View | None = None) -> bool:
+        """발송 예약. 바로 반환(대기열이 가득 찼거나 DM 차단 사용자면 False)"""
+        if self.is_closed(user.id):
+            self._count("dropped")
+            return False
+        if not self._queues:
+            # 루프 시작 전(테스트 등) → 즉시 발송 태스크로 대체
+            task = asyncio.get_running_loop().create_task(self._deliver(user, content, view))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+            return True
+        q = self._queues[user.id % len(self._queues)]
+        try:
+            q.put_nowait((user, content, view))
+        except asyncio.QueueFull:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    async def _worker(self, q: asyncio.Queue):
+        while True:
+            user, content, view = await q.get()
+            try:
+                await self._deliver(user, content, view)
+            except Exception as e:
+                print("⚠️ DM 워커 오류:", e)
+            finally:
+                q.task_done()
+
+    async def _deliver(self, user: discord.abc.User, content: str, view: View | None):
+        for attempt in range(DM_MAX_ATTEMPTS):
+            if self.is_closed(user.id):
+                self._count("dropped")
+                return
+            t0 = time.perf_counter()
+            try:
+                if view is not None:
+                    await user.send(content, view=view)
+                else:
+                    await user.send(content)
+            except discord.Forbidden:
+                # DM 닫힘(50007 등) → 기록 후 재시도하지 않음
+                self.closed_dm[user.id] = time.monotonic() + DM_CLOSED_TTL_SEC
+                self._count("forbidden")
+                return
+            except discord.HTTPException as e:
+                if attempt + 1 >= DM_MAX_ATTEMPTS or (e.status < 500 and e.status != 429):
+                    self._count("failed")
+                    print(f"⚠️ DM 발송 실패({user.id}):", e)
+                    return
+                self._count("retried")
+                retry_after = retry_after_of(e) if e.status == 429 else None
+                await asyncio.sleep(DM_BACKOFF_BASE_SEC * (2 ** attempt) if retry_after is None else retry_after)
+                continue
+            ms = (time.perf_counter() - t0) * 1000
+            metrics.observe("dm_send", ms / 1000)
+            self._count("sent")
+            st = self.stats
+            st["last_send_ms"] = ms
+            st["max_send_ms"] = max(st["max_send_ms"], ms)
+            st["total_send_ms"] += ms
+            return
+
+    async def aclose(self, timeout: float = 5.0):
+        """남은 DM을 잠시 기다렸다가 워커 종료"""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues), *self._inflight), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ 미발송 DM {self.depth() + len(self._inflight)}건을 남기고 종료")
+        for t in [*self._tasks, *self._inflight]:
+            t.cancel()
+        await asyncio.gather(*self._tasks, *self._inflight, return_exceptions=True)
+        self._tasks, self._queues = [], []
+
+    def summary(self) -> str:
+        st = self.stats
+        sent = st["sent"] or 1
+        return (
+            f"대기 중 : {self.depth()}건\n"
+            f"발송 : {st['sent']}건 (재시도 {st['retried']}, 실패 {st['failed']}, 버림 {st['dropped']})\n"
+            f"DM 차단 : {sum(map(self.is_closed, list(self.closed_dm)))}명 (Forbidden {st['forbidden']}회)\n"
+            f"발송 지연 : 평균 {st['total_send_ms'] / sent:.1f}ms / 최근 {st['last_send_ms']:.1f}ms / 최대 {st['max_send_ms']:.1f}ms"
+        )
+
+outbox = DMOutbox()
+metrics.gauge("dulgi_dm_queue_depth", "DMs waiting in the outbox", lambda: [({}, outbox.depth())])
+
+def home_view(part: "GuildPartition | None" = None) -> View:
+    url = part.config.server_url if part is not None else SERVER_URL
+    view = View(); view.add_item(Button(label="서버로 돌아가기 🏠", url=url))
+    return view
+
+# ========= 점수 반영 공용 =========
+class ChannelCapCache:
+    """논리적 날짜별 '오늘 상한 도달' (uid, 채널) 집합.
+    날짜가 바뀌면(오전 6시 KST) 통째로 비움"""
+
+    def __init__(self):
+        self.day: str | None = None
+        self.saturated: set = set()
+
+    def _roll(self, date_str: str):
+        if date_str != self.day:
+            self.day = date_str
+            self.saturated = set()
+
+    def is_capped(self, uid: str, channel_id: int, date_str: str) -> bool:
+        self._roll(date_str)
+        return (uid, channel_id) in self.saturated
+
+    def mark(self, uid: str, channel_id: int, date_str: str):
+        self._roll(date_str)
+        self.saturated.add((uid, channel_id))
+
+    def clear(self):
+        self.day, self.saturated = None, set()
+
+# ========= 길드별 설정 / 상태 파티션 =========
+# guilds.json: {"<길드 ID>": {"name", "channels": {"<채널 ID>": {"name", "points", "daily_max",
+#   "image_only", "allow_link"}}, "checkin_channel_id", "daily_goal", "week_goal",
+#   "backup_channel_id", "backup_hour", "server_url"}}
+# 파일이 없으면 위의 단일 서버 설정(HOME_GUILD_ID)만 사용
+GUILDS_FILE = os.path.join(BASE_PATH, "guilds.json")
+
+class GuildConfig:
+    """길드 1개의 점수 규칙/목표/백업 설정"""
+
+    def __init__(self, guild_id: int, name: str = "", channel_points: Dict[int, dict] | None = None,
+                 checkin_channel_id: int | None = None, daily_goal: int = DAILY_GOAL_POINTS,
+                 week_goal: int = WEEK_GOAL_POINTS, backup_channel_id: int | None = None,
+                 backup_hour: int = 6, server_url: str | None = None):
+        self.guild_id = guild_id
+        self.name = name
+        self.channel_points = channel_points or {}
+        self.checkin_channel_id = checkin_channel_id
+        self.daily_goal = daily_goal
+        self.week_goal = week_goal
+        self.backup_channel_id = backup_channel_id
+        self.backup_hour = backup_hour
+        self.server_url = server_url or f"https://discord.com/channels/{guild_id}"
+
+    @classmethod
+    def home(cls) -> "GuildConfig":
+        return cls(HOME_GUILD_ID, "home", CHANNEL_POINTS, CHECKIN_CHANNEL_ID, DAILY_GOAL_POINTS,
+                   WEEK_GOAL_POINTS, BACKUP_CHANNEL_ID, 6, SERVER_URL)
+
+    @classmethod
+    def from_json(cls, gid: str, doc: dict) -> "GuildConfig":
+        """설정 항목 검증. 잘못된 설정은 ValueError(시작 중단)"""
+        channels = {}
+        for cid, conf in doc.get("channels", {}).items():
+            if "points" not in conf or "daily_max" not in conf:
+                raise ValueError(f"길드 {gid} 채널 {cid}: points/daily_max가 필요해요")
+            channels[int(cid)] = {
+                "name": conf.get("name", cid),
+                "points": int(conf["points"]),
+                "daily_max": int(conf["daily_max"]),
+                "image_only": bool(conf.get("image_only", False)),
+                "allow_link": bool(conf.get("allow_link", False)),
+            }
+        checkin = doc.get("checkin_channel_id")
+        if checkin is not None and int(checkin) not in channels:
+            raise ValueError(f"길드 {gid}: checkin_channel_id {checkin}가 channels에 없어요")
+        hour = int(doc.get("backup_hour", 6))
+        if not 0 <= hour < 24:
+            raise ValueError(f"길드 {gid}: backup_hour는 0~23")
+        backup_ch = doc.get("backup_channel_id")
+        return cls(int(gid), doc.get("name", ""), channels, int(checkin) if checkin is not None else None,
+                   int(doc.get("daily_goal", DAILY_GOAL_POINTS)), int(doc.get("week_goal", WEEK_GOAL_POINTS)),
+                   int(backup_ch) if backup_ch is not None else None, hour, doc.get("server_url"))
+
+def load_guild_configs(path: str = GUILDS_FILE) -> Dict[int, GuildConfig]:
+    """guilds.json → {길드 ID: 설정}. 파일이 없으면 기존 단일 서버 설정"""
+    if not os.path.exists(path):
+        return {HOME_GUILD_ID: GuildConfig.home()}
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    return {int(gid): GuildConfig.from_json(gid, g) for gid, g in doc.items()}
+
+def partition_dir(guild_id: int) -> str:
+    """홈 길드는 기존 위치(BASE_PATH) 그대로, 나머지는 guilds/<길드 ID>/"""
+    if guild_id == HOME_GUILD_ID:
+        return BASE_PATH
+    path = os.path.join(BASE_PATH, "guilds", str(guild_id))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+class GuildPartition:
+    """길드 1개의 상태: data + 누계 + 저장(스냅샷/저널) + 백업 폴더 + 상한 캐시.
+    저장/컴팩션/백업이 길드별로 따로 돌아 비용이 그 길드 크기에만 비례"""
+
+    def __init__(self, config: GuildConfig):
+        self.config = config
+        self.guild_id = config.guild_id
+        base = partition_dir(config.guild_id)
+        self.data_file = os.path.join(base, "data.json")
+        self.journal_file = os.path.join(base, "journal.jsonl")
+        self.snapshot_file = os.path.join(base, "data.snap")
+        self.backup_dir = os.path.join(base, "backups")
+        self.data, self.totals = load_startup_state(self.data_file, self.journal_file,
+                                                    self.snapshot_file, config.daily_goal)
+        if SNAPSHOT_FORMAT == "binary":
+            self.persistence = WriteBehindStore(lambda: self.data, self.snapshot_file, self.journal_file,
+                                                serializer=snapshot_binary, totals=self.totals)
+        else:
+            self.persistence = WriteBehindStore(lambda: self.data, self.data_file, self.journal_file)
+        if os.environ.get("VERIFY_AGGREGATES") == "1":
+            for line in self.totals.verify(self.data)[:20]:
+                print(f"⚠️ [{self.guild_id}] 누계 불일치:", line)
+        self.json_storage = JsonStorage(lambda: self.data, self.totals)
+        self.storage = (SqliteStorage(os.path.join(base, "data.sqlite3"))
+                        if STORAGE_BACKEND == "sqlite" else self.json_storage)
+        self.cap_cache = ChannelCapCache()
+        self.actor = StateActor(self)
+        self.last_backup_at: str | None = None
+
+class GuildRegistry:
+    """이 프로세스가 맡은 길드 파티션 모음. 상태는 load() 때 읽음(setup_hook)"""
+
+    def __init__(self, configs: Dict[int, GuildConfig]):
+        self.configs = configs
+        self.parts: Dict[int, GuildPartition] = {}
+
+    def load(self):
+        for gid, cfg in self.configs.items():
+            if gid not in self.parts and owns_guild(gid):
+                self.parts[gid] = GuildPartition(cfg)
+
+    def get(self, guild) -> GuildPartition | None:
+        if guild is None:
+            return None
+        return self.parts.get(guild if isinstance(guild, int) else guild.id)
+
+    def default(self) -> GuildPartition | None:
+        """길드 지정이 없을 때(DM, API): 홈 길드 또는 유일한 길드"""
+        if HOME_GUILD_ID in self.parts:
+            return self.parts[HOME_GUILD_ID]
+        return next(iter(self.parts.values())) if len(self.parts) == 1 else None
+
+    def for_context(self, ctx) -> GuildPartition | None:
+        return self.get(ctx.guild) if ctx.guild is not None else self.default()
+
+    def __iter__(self):
+        return iter(list(self.parts.values()))
+
+    def __len__(self):
+        return len(self.parts)
+
+partitions = GuildRegistry(load_guild_configs())
+
+metrics.gauge("dulgi_store_users", "Users in data store",
+              lambda: [({"guild": str(p.guild_id)}, len(p.data.get("users", {}))) for p in partitions])
+metrics.gauge("dulgi_store_days", "Per-user activity days in data store",
+              lambda: [({"guild": str(p.guild_id)}, store_day_count(p.data)) for p in partitions])
+metrics.gauge("dulgi_persist_pending", "Mutations waiting for the next flush",
+              lambda: [({"guild": str(p.guild_id)}, p.persistence.pending) for p in partitions])
+metrics.gauge("dulgi_actor_queue_depth", "State commands waiting for the guild actor",
+              lambda: [({"guild": str(p.guild_id)}, p.actor.depth()) for p in partitions])
+
+async def partition_or_reply(ctx) -> GuildPartition | None:
+    part = partitions.for_context(ctx)
+    if part is None:
+        await ctx.reply("⚠️ 점수 설정이 된 서버 채널에서 사용해 주세요.")
+    return part
+
+def is_countable(conf: dict, has_link: bool, has_attachment: bool, has_image: bool) -> bool:
+    """점수 채널 메시지 인정 규칙(온라인 on_message / 오프라인 백필 공용)
+    - allow_link: 링크 or 첨부파일(이미지/기타)
+    - image_only: 이미지 첨부
+    - 그 외: 모든 메시지"""
+    if conf.get("allow_link"):
+        return has_link or has_attachment
+    if conf.get("image_only"):
+        return has_image
+    return True
+
+def message_flags(message: discord.Message) -> Tuple[bool, bool, bool]:
+    """(링크 포함, 첨부 있음, 이미지 첨부 있음)"""
+    return (
+        "http" in message.content,
+        len(message.attachments) > 0,
+        any(a.content_type and a.content_type.startswith("image/") for a in message.attachments),
+    )
+
+def award_activity(part: GuildPartition, uid: str, date_str: str, channel_id: int) -> bool:
+    """점수 반영 + 저널/섀도 기록 + 상한 캐시 갱신"""
+    if part.cap_cache.is_capped(uid, channel_id, date_str):
+        return False
+    channels = part.config.channel_points
+    conf = channels[channel_id]
+    added = add_activity_logic(part.data, uid, date_str, channel_id, channels, part.totals)
+    if added:
+        part.persistence.record_award(uid, date_str, channel_id, conf["points"])
+        part.storage.shadow_award(uid, date_str, channel_id, conf["points"], conf["daily_max"])
+    got = part.data["users"][uid].channel_points(day_index(date_str), channel_id)
+    if got + conf["points"] > conf["daily_max"]:
+        part.cap_cache.mark(uid, channel_id, date_str)
+    return added
+
+# ========= 상태 액터(단일 작성자) =========
+# 길드 상태(data/누계/저널/상한 캐시) 변경은 파티션마다 하나인 StateActor만 수행.
+# 핸들러는 명령(Award/CheckIn/MarkNotified)을 큐에 넣고 결과를 await → 결과로 DM 여부 결정.
+# 액터는 큐에 쌓인 명령을 한 번에(최대 ACTOR_BATCH_MAX개) 꺼내 await 없이 연달아 적용하므로
+# 다른 코루틴은 배치 사이에서만 상태를 봄. 읽기(ReadState)도 같은 큐를 타서 앞선 변경이 모두 보이는
+# 일관된 시점에 실행되고, 상태 교체(Exclusive)는 배치 사이에 단독으로 실행됨
+ACTOR_BATCH_MAX = int(os.environ.get("ACTOR_BATCH_MAX", "512"))
+
+class Award(NamedTuple):
+    """점수 채널 메시지 1건 반영 + 하루/주간 목표 달성 판단"""
+    uid: str
+    date_str: str
+    channel_id: int
+
+class CheckIn(NamedTuple):
+    """출근 기록 + 출근 채널 점수"""
+    uid: str
+    date_str: str
+
+class MarkNotified(NamedTuple):
+    """알림 키 기록. 결과: 새로 기록했으면 True"""
+    uid: str
+    key: str
+
+class Mutate(NamedTuple):
+    """fn(part)로 여러 사용자를 한꺼번에 바꾸는 동기 작업(일 마감 등). fn 반환값이 결과"""
+    fn: Callable[["GuildPartition"], Any]
+
+class ReadState(NamedTuple):
+    """fn(part)를 변경 사이의 일관된 시점에 실행하고 그 값을 돌려줌(fn 안에서 변경 금지)"""
+    fn: Callable[["GuildPartition"], Any]
+
+class Exclusive(NamedTuple):
+    """배치 사이에서 단독 실행되는 비동기 작업(복원으로 상태 교체 등). 끝날 때까지 다른 명령 대기"""
+    fn: Callable[[], Awaitable[Any]]
+
+class AwardResult(NamedTuple):
+    added: int              # 반영된 점수(0 = 규칙/상한으로 미반영)
+    day_total: int          # 반영 후 그날 합계
+    week_total: int         # 반영 후 이번 주 합계
+    daily_goal: bool        # 이번 반영으로 하루 목표를 처음 달성(알림 키 기록 완료)
+    weekly_goal: bool       # 이번 반영으로 주간 목표를 처음 달성(알림 키 기록 완료)
+
+class CheckInResult(NamedTuple):
+    checked_in: bool        # False = 이미 출근
+    added: int
+
+class StateActor:
+    """길드 파티션 1개의 단일 작성자"""
+
+    def __init__(self, part: "GuildPartition", batch_max: int = ACTOR_BATCH_MAX):
+        self.part = part
+        self.batch_max = batch_max
+        # asyncio.Queue 대신 deque + 깨우기 이벤트: 접수 1건당 비용이 append 하나 수준
+        self._pending: collections.deque = collections.deque()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.stats = {"commands": 0, "batches": 0, "max_batch": 0, "errors": 0}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            if self._pending:
+                self._wake.set()
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def submit(self, cmd) -> asyncio.Future:
+        """명령 접수. 결과는 반환된 future로(액터가 안 떠 있으면 띄움)"""
+        if self._task is None or self._task.done():
+            self.start()
+        fut = self._loop.create_future()
+        self._pending.append((cmd, fut))
+        self._wake.set()
+        return fut
+
+    async def call(self, cmd):
+        return await self.submit(cmd)
+
+    async def read(self, fn: Callable[["GuildPartition"], Any]):
+        return await self.submit(ReadState(fn))
+
+    async def exclusive(self, fn: Callable[[], Awaitable[Any]]):
+        return await self.submit(Exclusive(fn))
+
+    async def _run(self):
+        pending = self._pending
+        while True:
+            if not pending:
+                self._wake.clear()
+                await self._wake.wait()
+            n = min(len(pending), self.batch_max)
+            batch = [pending.popleft() for _ in range(n)]
+            self.stats["batches"] += 1
+            self.stats["commands"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            # 배치 안에서는 같은 기준 날짜 사용(배치 중간에 날짜가 바뀌어 목표 판단이 갈리지 않게)
+            today = datetime.datetime.now(KST).date()
+            for cmd, fut in batch:
+                try:
+                    if isinstance(cmd, Exclusive):
+                        res = await cmd.fn()
+                        today = datetime.datetime.now(KST).date()
+                    else:
+                        res = self.apply(cmd, today)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    if not fut.done():
+                        fut.set_exception(e)
+                    continue
+                if not fut.done():
+                    fut.set_result(res)
+
+    async def drain(self):
+        """지금까지 접수된 명령이 모두 적용될 때까지 대기"""
+        if self._task is not None and not self._task.done():
+            await self.read(lambda part: None)
+
+    async def aclose(self):
+        await self.drain()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    # --- 적용(동기, 액터 태스크 안에서만 호출) ---
+    def apply(self, cmd, today: datetime.date):
+        if isinstance(cmd, Award):
+            return self._award(cmd, today)
+        if isinstance(cmd, CheckIn):
+            return self._check_in(cmd)
+        if isinstance(cmd, MarkNotified):
+            return self._mark_notified(cmd.uid, cmd.key)
+        if isinstance(cmd, (ReadState, Mutate)):
+            return cmd.fn(self.part)
+        raise TypeError(f"알 수 없는 상태 명령: {cmd!r}")
+
+    def _award(self, cmd: Award, today: datetime.date) -> AwardResult:
+        part, cfg = self.part, self.part.config
+        uid, ds = cmd.uid, cmd.date_str
+        added = award_activity(part, uid, ds, cmd.channel_id)
+        points = cfg.channel_points[cmd.channel_id]["points"] if added else 0
+        day_total = part.data["users"][uid].day_total(day_index(ds))
+        week_total = part.totals.week_total(uid, today)
+        daily = weekly = False
+        if added:
+            daily = day_total >= cfg.daily_goal and self._mark_notified(uid, f"daily_{ds}")
+            weekly = week_total >= cfg.week_goal and self._mark_notified(uid, f"weekly_{week_key(today)}")
+        return AwardResult(points, day_total, week_total, daily, weekly)
+
+    def _check_in(self, cmd: CheckIn) -> CheckInResult:
+        part = self.part
+        checkin_cid = part.config.checkin_channel_id
+        if not ensure_user(part.data, cmd.uid).set_attended(day_index(cmd.date_str)):
+            return CheckInResult(False, 0)
+        part.persistence.record_attend(cmd.uid, cmd.date_str)
+        part.storage.shadow_attend(cmd.uid, cmd.date_str)
+        added = award_activity(part, cmd.uid, cmd.date_str, checkin_cid)
+        return CheckInResult(True, part.config.channel_points[checkin_cid]["points"] if added else 0)
+
+    def _mark_notified(self, uid: str, key: str) -> bool:
+        part = self.part
+        if not ensure_user(part.data, uid).notify(key):
+            return False
+        part.persistence.record_notify(uid, key)
+        part.storage.shadow_notify(uid, key)
+        return True
+
+# ========= 공용 보고서 발송 함수 =========
+@metrics.timed("send_personal_report")
+async def send_personal_report(part: GuildPartition, user: discord.User | discord.Member,
+                               include_month: bool = True):
+    display_name = getattr(user, "display_name", None) or getattr(user, "name", "사용자")
+    # 액터 큐를 타서 앞서 접수된 변경(방금 한 출근 등)이 모두 반영된 시점의 상태로 작성
+    msg = await part.actor.read(lambda p: personal_report_text(p, str(user.id), display_name, include_month))
+    outbox.send(user, msg, home_view(part))
+
+def personal_report_text(part: GuildPartition, uid: str, display_name: str, include_month: bool) -> str:
+    """ReadState 안에서 실행되는 읽기 전용 작성(사용자 기록이 없어도 만들지 않음)"""
+    today = datetime.datetime.now(KST).date()
+    data, totals, goal = part.data, part.totals, part.config.daily_goal
+    user = data["users"].get(uid)
+
+    today_str = logical_date_str_from_now()
+    today_checked = "O" if user is not None and user.attended(day_index(today_str)) else "X"
+    weekly_total = totals.week_total(uid, today)
+
+    week_map = get_week_progress(data, uid, today, goal, totals.closed)
+
+    # 기본(주간) 블록
+    msg = (
+        f"🌼 {display_name}님의 이번 주 활동 요약\n\n"
+        f"오늘 출석 여부 : {today_checked}\n"
+        f"이번주 획득 점수 : {weekly_total}점\n\n"
+        f"📊 주간 활동:\n{week_map}"
+    )
+
+    # 월간 타일은 옵션
+    if include_month:
+        month_map = get_month_grid_7x4(data, uid, today, goal, totals.closed)
+        msg += f"\n\n{month_map}"
+    return msg
+
+# ========= 출근 =========
+@bot.command(name="출근")
+async def check_in(ctx):
+    part = await partition_or_reply(ctx)
+    if part is None:
+        return
+    checkin_cid = part.config.checkin_channel_id
+    if checkin_cid is None:
+        return await ctx.reply("이 서버는 출근 기록을 사용하지 않아요.")
+    # 출근 기록 + 점수 반영(액터가 중복 확인과 기록을 한 번에)
+    res = await part.actor.call(CheckIn(str(ctx.author.id), logical_date_str_from_now()))
+    if not res.checked_in:
+        outbox.send(ctx.author, "이미 출근 완료 🕐\n매일 오전 6시에 초기화됩니다.", home_view(part))
+        return
+
+    # 출근 완료 안내
+    points = part.config.channel_points[checkin_cid]["points"]
+    outbox.send(ctx.author, f"✅ 출근 완료! (+{points}점) 오늘도 힘내요!")
+
+    # 출근 후 개인 보고서(월간 제외) 자동 발송
+    await send_personal_report(part, ctx.author, include_month=False)
+
+# ========= 메시지 감지(점수 반영 + 목표 달성 DM) =========
+@bot.event
+@metrics.timed("on_message")
+async def on_message(message: discord.Message):
+    if message.author.bot:
+        return
+
+    # 점수 채널이 아니면(설정 없는 길드/DM 포함) 상태를 건드리지 않고 바로 명령 처리
+    cid = message.channel.id
+    part = partitions.get(message.guild)
+    conf = part.config.channel_points.get(cid) if part is not None else None
+    if conf is None:
+        await bot.process_commands(message)
+        return
+
+    # 점수 채널 메시지는 결과와 상관없이 모두 셈(outcome: capped / not_countable / countable)
+    labels = {"channel_id": str(cid), "channel": conf["name"]}
+    # 오늘 이 채널 상한에 이미 도달 → 첨부/링크 검사도 생략
+    uid = str(message.author.id)
+    today_ds = logical_date_str_from_now()
+    if part.cap_cache.is_capped(uid, cid, today_ds):
+        metrics.inc("dulgi_messages_total", outcome="capped", **labels)
+        await bot.process_commands(message)
+        return
+
+    if not is_countable(conf, *message_flags(message)):
+        metrics.inc("dulgi_messages_total", outcome="not_countable", **labels)
+        await bot.process_commands(message)
+        return
+
+    metrics.inc("dulgi_messages_total", outcome="countable", **labels)
+    # 반영과 목표 달성 판단·알림 키 기록은 액터가 한 번에 → 같은 목표 DM이 두 번 나가지 않음
+    res = await part.actor.call(Award(uid, today_ds, cid))
+    cfg = part.config
+    # === 목표 달성 축하 DM (발송은 outbox 워커가 처리) ===
+    # 하루 목표(기본 10점) 달성
+    if res.daily_goal:
+        today = datetime.datetime.now(KST).date()
+        week_map = await part.actor.read(
+            lambda p: get_week_progress(p.data, uid, today, cfg.daily_goal, p.totals.closed))
+        dm = (
+            f"🌞 오늘 하루 목표({cfg.daily_goal}점) 달성! 정말 수고했어요.\n"
+            f"내일도 꾸준히 채워나가봐요 💪\n\n"
+            f"📊 주간 활동:\n{week_map}"
+        )
+        outbox.send(message.author, dm)
+
+    # 주간 목표(기본 50점) 달성
+    if res.weekly_goal:
+        dm = (
+            f"🏆 이번 주 {res.week_total}점 달성! 이주의 우수사원이에요!\n"
+            f"다음 주도 잘 부탁드려요 ☀️"
+        )
+        outbox.send(message.author, dm)
+
+    await bot.process_commands(message)
+
+# ========= 보고서(개인) =========
+@bot.command(name="보고서")
+async def report(ctx):
+    part = await partition_or_reply(ctx)
+    if part is not None:
+        await send_personal_report(part, ctx.author, include_month=True)
+
+# ========= 내 순위 =========
+@bot.command(name="순위")
+async def my_rank(ctx):
+    part = await partition_or_reply(ctx)
+    if part is None:
+        return
+    totals = part.totals
+    uid = str(ctx.author.id)
+    today = datetime.datetime.now(KST).date()
+    lines = []
+    for label, board in (
+        ("이번 주", totals.boards.week_board(today)),
+        (f"{today.month}월", totals.boards.month_board(today.year, today.month)),
+    ):
+        r = board.rank(uid)
+        if r is None:
+            lines.append(f"{label} : 아직 점수가 없어요")
+        else:
+            pos, sc, n = r
+            lines.append(f"{label} : {pos}위 ({sc}점) / {n}명 중")
+    await ctx.reply("🏅 내 순위\n" + "\n".join(lines))
+
+# ========= 백업/복원 =========
+# backups/ 폴더: 주 1회 전체(full) + 매일 변경분(delta), manifest.json이 체인을 기록
+#   full : data.json 내용 그대로 gzip
+#   delta: 마지막 full 이후 바뀐 사용자만 {"type": "delta", "base_sha256", "users", "removed", "meta"}
+BACKUP_MANIFEST = os.path.join(BACKUP_DIR, "manifest.json")
+FULL_BACKUP_EVERY_DAYS = 7
+BACKUP_KEEP_CHAINS = 2
+
+def user_digest(u: dict) -> str:
+    raw = json.dumps(u, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def load_manifest(path: str = BACKUP_MANIFEST) -> dict:
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"chain": [], "user_hashes": {}, "last_hash": None, "old_chains": []}
+
+def build_backup(payload: bytes, folder: str = BACKUP_DIR, force_full: bool = False) -> dict | None:
+    """(executor에서 실행) 스냅샷 바이트로 full 또는 delta 백업 파일 생성.
+    직전 백업과 내용이 같으면 None"""
+    os.makedirs(folder, exist_ok=True)
+    manifest_path = os.path.join(folder, "manifest.json")
+    manifest = load_manifest(manifest_path)
+    content_hash = hashlib.sha256(payload).hexdigest()
+    if manifest.get("last_hash") == content_hash and not force_full:
+        return None
+
+    data = json.loads(payload)
+    users = data.get("users", {})
+    hashes = {uid: user_digest(u) for uid, u in users.items()}
+    now = datetime.datetime.now(KST)
+    chain = manifest["chain"]
+    need_full = force_full or not chain or (
+        now - datetime.datetime.fromisoformat(chain[0]["created"])
+    ).days >= FULL_BACKUP_EVERY_DAYS
+
+    stamp = now.strftime("%Y%m%d-%H%M")
+    if need_full:
+        name = f"full-{stamp}-{content_hash[:12]}.json.gz"
+        body = payload
+        entry = {"type": "full", "file": name, "sha256": content_hash,
+                 "created": now.isoformat(), "users": len(users)}
+        if chain:
+            manifest["old_chains"].append([e["file"] for e in chain])
+        manifest["chain"] = [entry]
+        manifest["user_hashes"] = hashes
+    else:
+        base = manifest["user_hashes"]
+        changed = {uid: u for uid, u in users.items() if hashes[uid] != base.get(uid)}
+        removed = [uid for uid in base if uid not in users]
+        delta = {"type": "delta", "base_sha256": chain[0]["sha256"], "created": now.isoformat(),
+                 "meta": data.get("meta", {}), "users": changed, "removed": removed}
+        body = json.dumps(delta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        name = f"delta-{stamp}-{hashlib.sha256(body).hexdigest()[:12]}.json.gz"
+        entry = {"type": "delta", "file": name, "sha256": content_hash, "created": now.isoformat(),
+                 "changed": len(changed), "removed": len(removed)}
+        chain.append(entry)
+
+    with open(os.path.join(folder, name), "wb") as f:
+        f.write(gzip.compress(body, compresslevel=6, mtime=0))
+    manifest["last_hash"] = content_hash
+
+    # 오래된 체인 정리
+    while len(manifest["old_chains"]) >= BACKUP_KEEP_CHAINS:
+        for old in manifest["old_chains"].pop(0):
+            try:
+                os.remove(os.path.join(folder, old))
+            except FileNotFoundError:
+                pass
+    write_atomic(json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"), manifest_path)
+    entry["path"] = os.path.join(folder, name)
+    entry["base"] = manifest["chain"][0]["file"]
+    return entry
+
+def decode_backup(raw: bytes) -> dict:
+    """백업 파일 바이트(gzip 또는 평문 JSON) → dict"""
+    if raw[:2] == b"\x1f\x8b":
+        raw = gzip.decompress(raw)
+    return json.loads(raw)
+
+def apply_backup_chain(full_raw: bytes, delta_raws: List[bytes]) -> dict:
+    """full + delta들로 상태 재구성. delta의 base가 full과 다르면 ValueError"""
+    if full_raw[:2] == b"\x1f\x8b":
+        full_raw = gzip.decompress(full_raw)
+    data = json.loads(full_raw)
+    if data.get("type") == "delta" or "users" not in data:
+        raise ValueError("첫 파일은 전체(full) 백업이어야 해요")
+    full_sha = hashlib.sha256(full_raw).hexdigest()
+    for raw in delta_raws:
+        delta = decode_backup(raw)
+        if delta.get("type") != "delta":
+            raise ValueError("두 번째 파일부터는 delta 백업이어야 해요")
+        if delta.get("base_sha256") != full_sha:
+            raise ValueError("delta의 기준 full 백업이 일치하지 않아요")
+        data["users"].update(delta["users"])
+        for uid in delta.get("removed", []):
+            data["users"].pop(uid, None)
+        if delta.get("meta"):
+            data["meta"] = delta["meta"]
+    return data
+
+def restore_from_backup_dir(folder: str = BACKUP_DIR) -> dict:
+    """manifest 체인(full + 가장 최근 delta)으로 상태 재구성"""
+    manifest = load_manifest(os.path.join(folder, "manifest.json"))
+    chain = manifest["chain"]
+    if not chain:
+        raise ValueError("백업 체인이 비어 있어요")
+
+    def read(entry):
+        with open(os.path.join(folder, entry["file"]), "rb") as f:
+            return f.read()
+    # delta는 매번 full 기준 누적이므로 마지막 것만 적용해도 됨
+    deltas = [read(chain[-1])] if len(chain) > 1 else []
+    return apply_backup_chain(read(chain[0]), deltas)
+
+@metrics.timed("backup")
+async def run_backup(part: GuildPartition, force_full: bool = False) -> dict | None:
+    """스냅샷 직렬화 + gzip + 해시 비교를 모두 executor에서 수행"""
+    loop = asyncio.get_running_loop()
+    # 액터 명령 사이의 한 순간으로 고정한 사본을 직렬화(그동안 변경은 멈추지 않음)
+    frozen = await part.actor.read(lambda p: p.persistence.freezer.freeze(p.data))
+    payload = await loop.run_in_executor(None, snapshot_json, frozen)
+    entry = await loop.run_in_executor(None, build_backup, payload, part.backup_dir, force_full)
+    part.last_backup_at = datetime.datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")
+    return entry
+
+def backup_caption(entry: dict, title: str) -> str:
+    now = datetime.datetime.now(KST).strftime("%Y-%m-%d %H:%M")
+    if entry["type"] == "full":
+        return f"{title} [{now}] 전체 백업 ({entry['users']}명)"
+    return (f"{title} [{now}] 변경분 백업 ({entry['changed']}명 변경, {entry['removed']}명 삭제)\n"
+            f"기준 전체 백업: `{entry['base']}`")
+
+async def upload_backup(part: GuildPartition, entry: dict, title: str):
+    ch = bot.get_channel(part.config.backup_channel_id) if part.config.backup_channel_id else None
+    if ch:
+        await ch.send(backup_caption(entry, title), file=discord.File(entry["path"]))
+
+@bot.command(name="백업")
+async def cmd_backup(ctx, 종류: str = None):
+    if not is_admin(ctx.author):
+        return await ctx.reply("관리자만 가능해요.")
+    part = await partition_or_reply(ctx)
+    if part is None:
+        return
+    await part.persistence.compact()
+    try:
+        entry = await run_backup(part, force_full=(종류 == "전체"))
+    except Exception as e:
+        return await ctx.reply(f"⚠️ 백업 실패: {e}")
+    if entry is None:
+        return await ctx.reply("✅ 마지막 백업 이후 바뀐 내용이 없어 업로드를 건너뛰었어요.")
+    await ctx.reply("✅ 백업 완료! 백업 파일 업로드 중...")
+    try:
+        await upload_backup(part, entry, "📦")
+    except Exception as e:
+        await ctx.reply(f"⚠️ 업로드 중 오류: {e}")
+
+# --- 복원: 스트리밍 다운로드 → 레코드 단위 검증 → 인덱스 선계산 → 원자적 교체 ---
+RESTORE_MAX_BYTES = 200 * 1024 * 1024
+RESTORE_CHUNK = 1 << 16
+RESTORE_MAX_ERRORS = 10
+ALLOWED_BACKUP_HOSTS = ("https://cdn.discordapp.com/", "https://media.discordapp.net/")
+_WS = re.compile(r"[ \t\n\r]*")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_JSON_DECODER = json.JSONDecoder()
+_JSON_DELIMS = frozenset(" \t\n\r,:]}")
+
+class JsonStreamReader:
+    """큰 JSON 객체를 통째로 올리지 않고 값 단위로 읽는 최소 파서(raw_decode 기반)"""
+
+    def __init__(self, read):
+        self._read = read       # () → str, 끝이면 ""
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        data = self._read()
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def expect(self, ch: str):
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"JSON 구조 오류: '{ch}' 대신 {got!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = _JSON_DECODER.raw_decode(self.buf, self.pos)
+                # 청크 경계에서 잘린 숫자('3' + '.5')도 값으로 읽히므로 뒤에 구분자가 보여야 확정
+                if (end < len(self.buf) and self.buf[end] in _JSON_DELIMS) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def _next_member(self) -> bool:
+        """객체 멤버 뒤: ','면 다음 멤버가 있음(True), '}'면 끝(False). 그 밖은 구조 오류"""
+        got = self.peek()
+        if got not in (",", "}"):
+            raise ValueError(f"JSON 구조 오류: ',' 또는 '}}' 대신 {got!r}")
+        self.pos += 1
+        return got == ","
+
+    def items(self) -> Iterator[Tuple]:
+        """최상위 객체 순회: ("user", uid, 레코드) / ("key", 키, 값)"""
+        self.expect("{")
+        more = self.peek() != "}"
+        if not more:
+            self.pos += 1
+        while more:
+            key = self.value()
+            self.expect(":")
+            if key == "users":
+                self.expect("{")
+                users = self.peek() != "}"
+                if not users:
+                    self.pos += 1
+                while users:
+                    uid = self.value()
+                    self.expect(":")
+                    yield "user", uid, self.value()
+                    users = self._next_member()
+            else:
+                yield "key", key, self.value()
+            more = self._next_member()
+
+def validate_user(uid, u) -> str | None:
+    """CompactUser.from_json이 기대하는 data.json 스키마 검사. 문제 있으면 설명 문자열"""
+    if not isinstance(uid, str) or not uid.isdigit():
+        return f"잘못된 사용자 ID {uid!r}"
+    if not isinstance(u, dict):
+        return f"{uid}: 사용자 레코드가 객체가 아님"
+    att = u.get("attendance", [])
+    if not isinstance(att, list) or not all(isinstance(d, str) and _DATE_RE.match(d) for d in att):
+        return f"{uid}: attendance 형식 오류"
+    act = u.get("activity", {})
+    if not isinstance(act, dict):
+        return f"{uid}: activity가 객체가 아님"
+    for ds, rec in act.items():
+        if not _DATE_RE.match(ds) or not isinstance(rec, dict):
+            return f"{uid}: activity[{ds}] 형식 오류"
+        if not isinstance(rec.get("total", 0), int) or rec.get("total", 0) < 0:
+            return f"{uid}: activity[{ds}].total 형식 오류"
+        by_ch = rec.get("by_channel", {})
+        if not isinstance(by_ch, dict) or not all(
+            isinstance(k, str) and k.isdigit() and isinstance(v, int) for k, v in by_ch.items()
+        ):
+            return f"{uid}: activity[{ds}].by_channel 형식 오류"
+    if not isinstance(u.get("notified", {}), dict):
+        return f"{uid}: notified가 객체가 아님"
+    if not isinstance(u.get("level", 1), int) or not isinstance(u.get("exp", 0), int):
+        return f"{uid}: level/exp 형식 오류"
+    if not isinstance(u.get("badges", []), list):
+        return f"{uid}: badges가 배열이 아님"
+    return None
+
+def parse_backup_file(path: str, max_bytes: int = RESTORE_MAX_BYTES) -> Tuple[dict, dict]:
+    """(executor) 백업 파일을 스트리밍으로 읽어 검증. (내용, 요약) 반환. 오류 시 ValueError.
+    gzip은 압축을 푼 크기로 max_bytes를 확인(작은 파일이 수 GB로 풀리는 경우 차단)"""
+    with open(path, "rb") as f:
+        gz = f.read(2) == b"\x1f\x8b"
+    raw = gzip.open(path, "rb") if gz else open(path, "rb")
+    sha = hashlib.sha256()
+    dec = codecs.getincrementaldecoder("utf-8")()
+    size = 0
+
+    def read() -> str:
+        nonlocal size
+        chunk = raw.read(RESTORE_CHUNK)
+        size += len(chunk)
+        if size > max_bytes:
+            raise ValueError(f"압축을 푼 크기가 {max_bytes // (1024 * 1024)}MB를 넘어요")
+        sha.update(chunk)
+        return dec.decode(chunk, final=not chunk)
+
+    doc: dict = {"users": {}}
+    errors: List[str] = []
+    first = last = None
+    days = 0
+    has_users = False
+    try:
+        for item in JsonStreamReader(read).items():
+            if item[0] == "key":
+                doc[item[1]] = item[2]
+                continue
+            has_users = True
+            _, uid, u = item
+            err = validate_user(uid, u)
+            if err:
+                errors.append(err)
+                if len(errors) >= RESTORE_MAX_ERRORS:
+                    break
+                continue
+            doc["users"][uid] = u
+            for ds in itertools.chain(u.get("activity", {}), u.get("attendance", [])):
+                first = ds if first is None or ds < first else first
+                last = ds if last is None or ds > last else last
+            days += len(u.get("activity", {}))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON 파싱 실패: {e}")
+    finally:
+        raw.close()
+    if errors:
+        raise ValueError("검증 실패\n" + "\n".join(errors))
+    if not has_users and doc.get("type") != "delta":
+        raise ValueError("users 항목이 없는 백업이에요")
+    summary = {"type": doc.get("type", "full"), "users": len(doc["users"]), "days": days,
+               "first": first, "last": last, "sha256": sha.hexdigest()}
+    return doc, summary
+
+def assemble_restore(docs: List[Tuple[dict, dict]],
+                     daily_goal: int = DAILY_GOAL_POINTS) -> Tuple[dict, ActivityTotals]:
+    """(executor) full + delta 합치기 + 파생 인덱스 계산(루프 밖에서 끝냄)"""
+    (data, head), deltas = docs[0], docs[1:]
+    if head["type"] != "full":
+        raise ValueError("첫 파일은 전체(full) 백업이어야 해요")
+    for delta, info in deltas:
+        if info["type"] != "delta":
+            raise ValueError("두 번째 파일부터는 delta 백업이어야 해요")
+        if delta.get("base_sha256") != head["sha256"]:
+            raise ValueError("delta의 기준 full 백업이 일치하지 않아요")
+        data["users"].update(delta["users"])
+        for uid in delta.get("removed", []):
+            data["users"].pop(uid, None)
+        if delta.get("meta"):
+            data["meta"] = delta["meta"]
+    for k in ("type", "base_sha256", "created", "removed"):
+        data.pop(k, None)
+    state_from_json(data)
+    new_totals = ActivityTotals(daily_goal)
+    new_totals.rebuild(data, datetime.datetime.now(KST).date())
+    # 전체 기록 마감(목표 비트/주·월 요약)도 여기서 → 루프에서는 참조만 교체
+    close_through(data, new_totals, logical_today())
+    return data, new_totals
+
+async def download_to_file(session: aiohttp.ClientSession, url: str, path: str, max_bytes: int = RESTORE_MAX_BYTES):
+    async with session.get(url) as r:
+        if r.status != 200:
+            raise ValueError(f"파일 불러오기 실패 (HTTP {r.status})")
+        if r.content_length and r.content_length > max_bytes:
+            raise ValueError(f"파일이 너무 커요 ({r.content_length // (1024 * 1024)}MB)")
+        size = 0
+        with open(path, "wb") as f:
+            async for chunk in r.content.iter_chunked(RESTORE_CHUNK):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"파일이 {max_bytes // (1024 * 1024)}MB를 넘어요")
+                f.write(chunk)
+
+async def swap_state(part: GuildPartition, new_data: dict, new_totals: ActivityTotals):
+    """액터에서 단독 실행(그동안 들어온 명령은 큐에서 대기)으로 길드 data와 파생 인덱스의 참조만 교체.
+    무거운 계산(병합/누계/마감)은 assemble_restore가 executor에서 끝내 둠"""
+    async def swap():
+        new_data.setdefault("meta", {})["journal_seq"] = part.persistence.seq
+        new_generation(new_data)
+        part.data = new_data
+        totals = part.totals
+        totals.week, totals.month, totals.boards = new_totals.week, new_totals.month, new_totals.boards
+        totals.closed = new_totals.closed
+        part.cap_cache.clear()
+        if part.storage is not part.json_storage:
+            await part.storage.import_json(part.data)
+    await part.actor.exclusive(swap)
+    # 교체된 상태를 스냅샷으로(고정 사본을 인코딩하므로 액터를 붙잡을 필요 없음)
+    await part.persistence.compact()
+
+@bot.command(name="PP복원")
+@metrics.timed("cmd_restore")
+async def cmd_restore_from_link(ctx, *args: str):
+    if not is_admin(ctx.author):
+        return await ctx.reply("관리자만 가능해요.")
+    dry_run = bool(args) and args[0] in ("미리보기", "dry-run")
+    urls = list(args[1:] if dry_run else args)
+    if not urls:
+        return await ctx.reply("사용법: `!PP복원 [미리보기] [전체 백업 링크] [변경분 백업 링크...]`")
+    if not all(u.startswith(ALLOWED_BACKUP_HOSTS) for u in urls):
+        return await ctx.reply("⚠️ Discord 업로드 링크만 허용돼요!")
+    part = await partition_or_reply(ctx)
+    if part is None:
+        return
+
+    loop = asyncio.get_running_loop()
+    folder = tempfile.mkdtemp(prefix="dulgi-restore-")
+    try:
+        docs = []
+        async with aiohttp.ClientSession() as s:
+            for i, url in enumerate(urls):
+                path = os.path.join(folder, f"part{i}")
+                await download_to_file(s, url, path)
+                docs.append(await loop.run_in_executor(None, parse_backup_file, path))
+        new_data, new_totals = await loop.run_in_executor(None, assemble_restore, docs, part.config.daily_goal)
+    except ValueError as e:
+        return await ctx.reply(f"⚠️ 복원 중단: {e}"[:1900])
+    except Exception as e:
+        return await ctx.reply(f"⚠️ 복원 중 오류: {e}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    head = docs[0][1]
+    all_days = [d for _, info in docs for d in (info["first"], info["last"]) if d]
+    summary = (
+        f"사용자 : {len(new_data['users'])}명 (파일 {len(docs)}개)\n"
+        f"기간 : {min(all_days) if all_days else '-'} ~ {max(all_days) if all_days else '-'}\n"
+        f"활동일 수 : {sum(info['days'] for _, info in docs)}\n"
+        f"full sha256 : {head['sha256'][:16]}…"
+    )
+    if dry_run:
+        return await ctx.reply(f"🔎 복원 미리보기 (적용 안 함)\n```\n{summary}\n```")
+    await swap_state(part, new_data, new_totals)
+    await ctx.reply(f"✅ 복원 완료! 기존 데이터 갱신됨\n```\n{summary}\n```")
+
+# ========= 일 마감 / 자동 백업 루프 =========
+def close_through(data: dict, totals: ActivityTotals, today: datetime.date, touched: set | None = None) -> int:
+    """today(논리 날짜) 전날까지 마감: 목표 비트·주/월 요약 확정 + 지난 알림 키 정리.
+    여러 번 불려도 안전(이미 마감된 날은 건너뜀). 정리한 알림 키 수 반환(touched에는 바뀐 사용자 추가)"""
+    logical_ds, cur_week = today.isoformat(), week_key(today)
+    users = data.get("users", {})
+    pruned = 0
+    lazy = isinstance(users, LazyUsers)
+    for uid in totals.roll_over(data, today):
+        # 안 읽은 사용자는 블록 그대로(지난 키는 많아야 종류별 하나, 다음 notify 때 정리됨)
+        if lazy and not users.is_loaded(uid):
+            continue
+        u = users.get(uid)
+        n = u.prune_notified(logical_ds, cur_week) if u is not None else 0
+        if n:
+            pruned += n
+            if touched is not None:
+                touched.add(uid)
+    return pruned
+
+@metrics.timed("rollover_day")
+def rollover_day(part: GuildPartition) -> int:
+    """길드 상태의 논리 날짜 마감(액터 안에서 Mutate로 실행). 정리한 알림 키 수 반환"""
+    touched: set = set()
+    pruned = close_through(part.data, part.totals, logical_today(), touched)
+    if pruned:
+        part.persistence.mark_dirty(pruned, touched)
+    return pruned
+
+async def schedule_day_rollover_loop():
+    # 매일 06:00 KST(논리 날짜 경계) 직후
+    while True:
+        now = datetime.datetime.now(KST)
+        next_run = now.replace(hour=6, minute=0, second=1, microsecond=0)
+        if next_run < now:
+            next_run += datetime.timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        for part in partitions:
+            try:
+                pruned = await part.actor.call(Mutate(rollover_day))
+            except Exception as e:
+                print(f"⚠️ [{part.guild_id}] 일 마감 실패:", e)
+                continue
+            print(f"✅ [{part.guild_id}] Day rollover done "
+                  f"(closed through {part.totals.closed.through}, pruned {pruned} keys)")
+
+async def schedule_daily_backup_loop(part: GuildPartition):
+    # 길드별 backup_hour(기본 06:00 KST). 길드마다 시각을 달리해 백업 부하를 분산할 수 있음
+    hour = part.config.backup_hour
+    while True:
+        now = datetime.datetime.now(KST)
+        next_backup = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if next_backup < now:
+            next_backup += datetime.timedelta(days=1)
+        await asyncio.sleep((next_backup - now).total_seconds())
+        # 일 마감이 먼저 돌았는지와 상관없이 확정 데이터가 스냅샷에 들어가도록
+        await part.actor.call(Mutate(rollover_day))
+        # 저널을 스냅샷으로 접은 뒤 백업
+        await part.persistence.compact()
+        try:
+            entry = await run_backup(part)
+        except Exception as e:
+            print(f"⚠️ [{part.guild_id}] 자동 백업 실패:", e)
+            continue
+        if entry is None:
+            print(f"✅ [{part.guild_id}] Daily backup skipped (no changes)")
+            continue
+        print(f"✅ [{part.guild_id}] Daily {entry['type']} backup completed at {hour:02d}:00 KST")
+        try:
+            await upload_backup(part, entry, f"☀️ 오전 {hour}시 자동 백업 완료!")
+        except Exception as e:
+            print(f"⚠️ [{part.guild_id}] 자동 백업 업로드 실패:", e)
+
+@bot.command(name="PP저장상태")
+async def cmd_persist_stats(ctx):
+    if not is_admin(ctx.author):
+        return await ctx.reply("관리자만 가능해요.")
+    part = await partition_or_reply(ctx)
+    if part is not None:
+        await ctx.reply(f"💾 저장 상태\n```\n{part.persistence.summary()}\n```")
+
+@bot.command(name="PP저장소비교")
+async def cmd_compare_storage(ctx):
+    if not is_admin(ctx.author):
+        return await ctx.reply("관리자만 가능해요.")
+    part = await partition_or_reply(ctx)
+    if part is None:
+        return
+    if part.storage is part.json_storage:
+        return await ctx.reply("현재 JSON 백엔드만 사용 중이에요. (`STORAGE_BACKEND=sqlite`)")
+    today = datetime.datetime.now(KST).date()
+    diffs = await compare_storages(part.json_storage, part.storage, today)
+    if not diffs:
+        return await ctx.reply("✅ JSON / SQLite 주간·월간 집계 일치")
+    body = "\n".join(diffs[:30])
+    await ctx.reply(f"⚠️ 불일치 {len(diffs)}건\n```\n{body}\n```")
+
+@bot.command(name="PPDM상태")
+async def cmd_dm_stats(ctx):
+    if not is_admin(ctx.author):
+        return await ctx.reply("관리자만 가능해요.")
+    await ctx.reply(f"📨 DM 발송 상태\n```\n{outbox.summary()}\n```")
+
+@bot.command(name="PP설정")
+async def cmd_guild_config(ctx):
+    if not is_admin(ctx.author):
+        return await ctx.reply("관리자만 가능해요.")
+    part = await partition_or_reply(ctx)
+    if part is None:
+        return
+    cfg = part.config
+    lines = [f"{conf['name']:<12} | {conf['points']}점 / 하루 최대 {conf['daily_max']}점"
+             for conf in cfg.channel_points.values()]
+    await ctx.reply(
+        f"⚙️ 길드 설정 ({cfg.guild_id})\n```\n"
+        f"하루 목표 : {cfg.daily_goal}점 / 주간 목표 : {cfg.week_goal}점\n"
+        f"출근 채널 : {cfg.checkin_channel_id or '-'} / 백업 : {cfg.backup_hour:02d}:00 → {cfg.backup_channel_id or '-'}\n"
+        + "\n".join(lines) + "\n```"
+    )
+
+# ========= CSV 내보내기(스트리밍/압축/분할) =========
+EXPORT_CHUNK = 500                     # 닉네임 조회/쓰기 단위
+DEFAULT_UPLOAD_LIMIT = 25 * 1024 * 1024
+UPLOAD_SAFETY = 0.95                   # gzip 버퍼 등 여유분
+
+def parse_year_month(args, today: datetime.date) -> Tuple[int, int] | None:
+    """'10월' / '2024년 12월' / '2024-12' → (연, 월). 연도가 없고 이번 달보다
+    뒤의 달이면 작년으로 봄(1월에 '12월' 조회)"""
+    text = "".join(args).replace(" ", "")
+    try:
+        if "-" in text:
+            y, m = text.split("-", 1)
+            year, month = int(y), int(m)
+        elif "년" in text:
+            y, m = text.split("년", 1)
+            year, month = int(y), int(m.replace("월", ""))
+        else:
+            month = int(text.replace("월", ""))
+            year = today.year if month <= today.month else today.year - 1
+    except ValueError:
+        return None
+    if not 1 <= month <= 12:
+        return None
+    return year, month
+
+def parse_export_range(args, today: datetime.date) -> Tuple[str, str] | None:
+    """'2025-01-01..2025-01-31' 또는 연-월 인자 → (시작, 끝) 논리적 날짜 문자열"""
+    text = "".join(args).replace(" ", "")
+    if ".." in text:
+        a, b = text.split("..", 1)
+        try:
+            start, end = datetime.date.fromisoformat(a), datetime.date.fromisoformat(b)
+        except ValueError:
+            return None
+        if start > end:
+            return None
+        return start.isoformat(), end.isoformat()
+    ym = parse_year_month(args, today)
+    if ym is None:
+        return None
+    start, end = month_range(*ym)
+    return start.isoformat(), end.isoformat()
+
+def export_header(channel_points: Dict[int, dict] = CHANNEL_POINTS) -> List[str]:
+    return ["닉네임", "ID", "합계"] + [conf["name"] for conf in channel_points.values()] + ["출석일수"]
+
+def export_rows(data: dict, uids: List[str], start_ds: str, end_ds: str,
+                channel_points: Dict[int, dict] = CHANNEL_POINTS) -> Iterator[Tuple[str, list]]:
+    """uid별 (uid, [합계, 채널별..., 출석일수]) 생성(기간은 양끝 포함)"""
+    users = data.get("users", {})
+    lo, hi = day_index(start_ds), day_index(end_ds)
+    for uid in uids:
+        u = peek_user(users, uid)
+        if u is None:
+            continue
+        yield uid, ([u.range_total(lo, hi)] + [u.range_total(lo, hi, cid) for cid in channel_points]
+                    + [len(u.attendance_days(lo, hi))])
+
+# 파트 크기는 PART_CHECK_ROWS행마다만 확인. 압축기/텍스트 버퍼를 비우지 않고(gzip에서 행마다 flush하면
+# 매번 sync flush가 들어가 압축률이 크게 떨어짐) 파일에 나간 바이트로 보고, 아직 버퍼에 남은 분량은 여유분으로 둠
+PART_CHECK_ROWS = 256
+PART_SLACK_BYTES = 512 * 1024
+
+class PartWriter:
+    """CSV를 파일로 흘려 쓰다가 업로드 한도를 넘기 전에 다음 파트로 넘김"""
+
+    def __init__(self, folder: str, base_name: str, header: List[str], limit: int, compress: bool):
+        self.folder = folder
+        self.base_name = base_name
+        self.header = header
+        self.limit = int(limit * UPLOAD_SAFETY)
+        self.compress = compress
+        self.paths: List[str] = []
+        self._raw = None
+        self._out = None
+        self._writer = None
+        self._rows = 0
+
+    def _open(self):
+        ext = ".csv.gz" if self.compress else ".csv"
+        path = os.path.join(self.folder, f"{self.base_name}_part{len(self.paths) + 1}{ext}")
+        self.paths.append(path)
+        self._raw = open(path, "wb")
+        binary = gzip.GzipFile(fileobj=self._raw, mode="wb") if self.compress else self._raw
+        # utf-8-sig: 엑셀에서 한글 깨짐 방지
+        self._out = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._out)
+        self._writer.writerow(self.header)
+        self._rows = 0
+
+    def _full(self) -> bool:
+        # BufferedWriter.tell()은 flush 없이 (디스크 + 자기 버퍼) 위치를 돌려줌
+        return self._raw.tell() >= self.limit - min(PART_SLACK_BYTES, self.limit // 4)
+
+    def write(self, row: list):
+        if self._writer is None:
+            self._open()
+        elif self._rows % PART_CHECK_ROWS == 0 and self._rows and self._full():
+            self.close()
+            self._open()
+        self._writer.writerow(row)
+        self._rows += 1
+
+    def close(self):
+        if self._out is not None:
+            self._out.close()     # TextIOWrapper → GzipFile(또는 raw)까지 닫힘
+            self._raw.close()     # GzipFile(fileobj=...)는 넘겨받은 파일을 닫지 않음
+            self._out = self._writer = self._raw = None
+
+async def write_export(guild: discord.Guild, part: GuildPartition, start_ds: str, end_ds: str,
+                       folder: str, base_name: str, compress: bool, limit: int) -> Tuple[List[str], int]:
+    """전체 인원 CSV를 EXPORT_CHUNK 단위로 이름 조회 → 쓰기. (파일 목록, 행 수) 반환.
+    행 값은 묶음마다 액터 읽기로 계산 → 이름 조회로 await하는 동안 바뀌는 data를 직접 읽지 않음"""
+    channel_points = part.config.channel_points
+    writer = PartWriter(folder, base_name, export_header(channel_points), limit, compress)
+    uids = await part.actor.read(lambda p: list(p.data.get("users", {})))
+    n = 0
+    try:
+        for i in range(0, len(uids), EXPORT_CHUNK):
+            chunk = uids[i:i + EXPORT_CHUNK]
+            names = await member_names.resolve_many(guild, chunk)
+            rows = await part.actor.read(
+                lambda p: list(export_rows(p.data, chunk, start_ds, end_ds, channel_points)))
+            for uid, values in rows:
+                writer.write([names.get(uid, uid), uid] + values)
+                n += 1
+            await asyncio.sleep(0)   # 큰 길드에서도 루프 양보
+        if not writer.paths:
+            writer._open()
+    finally:
+        writer.close()
+    return writer.paths, n
+
+@bot.command(name="PP내보내기")
+@metrics.timed("cmd_export")
+async def cmd_export(ctx, *args):
+    if not is_admin(ctx.author):
+        return await ctx.reply("관리자만 가능해요.")
+    part = await partition_or_reply(ctx)
+    if part is None:
+        return
+    compress = any(a.lower() in ("gz", "압축") for a in args)
+    args = [a for a in args if a.lower() not in ("gz", "압축")]
+    today = datetime.datetime.now(KST).date()
+    rng = parse_export_range(args, today) if args else None
+    if rng is None:
+        return await ctx.reply(
+            "사용법: `!PP내보내기 2025-01-01..2025-01-31 [압축]` 또는 `!PP내보내기 2024년 12월 [압축]`"
+        )
+    start_ds, end_ds = rng
+    limit = getattr(ctx.guild, "filesize_limit", None) or DEFAULT_UPLOAD_LIMIT
+    folder = tempfile.mkdtemp(prefix="dulgi-export-")
+    try:
+        paths, n = await write_export(ctx.guild, part, start_ds, end_ds, folder,
+                                      f"activity_{start_ds}_{end_ds}", compress, limit)
+        await ctx.reply(f"📤 {start_ds} ~ {end_ds} 활동 내보내기 ({n}명, 파일 {len(paths)}개)")
+        # 메시지당 첨부 10개 제한
+        for i in range(0, len(paths), 10):
+            await ctx.send(files=[discord.File(p) for p in paths[i:i + 10]])
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+# ========= 오프라인 재계산(백필) =========
+# 메시지 로그(JSONL, 한 줄에 메시지 1건. .gz 가능)로 점수를 다시 계산
+#   {"author": 123, "channel": 456, "ts": 1735700000.0 또는 "2025-01-01T12:00:00+09:00",
+#    "has_link": false, "has_attachment": true, "has_image": true, "checkin": false}
+# 온라인과 같은 인정 규칙(is_countable)과 채널 일일 상한을 (사용자, 논리 날짜, 채널) 묶음으로 적용.
+# 한 채널의 메시지당 점수는 같으므로 인정 개수 = min(메시지 수, daily_max // points)
+# NumPy가 있으면 벡터 연산으로 묶고(pip install numpy), 없으면 같은 결과를 순수 파이썬으로 계산.
+# 로그는 다시 계산할 날짜의 메시지를 빠짐없이 담아야 함(그 날짜들의 기존 점수를 통째로 교체)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import orjson   # 있으면 로그 파싱에 사용(pip install orjson). 없으면 표준 json
+except ImportError:
+    orjson = None
+
+LOGICAL_DAY_SHIFT_SEC = 3 * 3600        # KST(+9h) − 06:00 경계 → UTC 기준 +3h
+UNIX_EPOCH_DAY = datetime.date(1970, 1, 1)
+LOG_LINK, LOG_ATTACH, LOG_IMAGE, LOG_CHECKIN = 1, 2, 4, 8
+LOG_CHUNK_LINES = 65536                 # 로그를 이만큼씩 묶어 한 번에 파싱
+
+def parse_log_ts(ts) -> float:
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    dt = datetime.datetime.fromisoformat(ts)
+    if dt.tzinfo is None:
+        dt = KST.localize(dt)
+    return dt.timestamp()
+
+def logical_day_of_ts(ts: float) -> int:
+    """Unix 타임스탬프 → 논리 날짜(1970-01-01 기준 일수)"""
+    return int((ts + LOGICAL_DAY_SHIFT_SEC) // 86400)
+
+def unix_day_str(day: int) -> str:
+    return (UNIX_EPOCH_DAY + datetime.timedelta(days=day)).isoformat()
+
+def unix_day_of(date_str: str) -> int:
+    return (datetime.date.fromisoformat(date_str) - UNIX_EPOCH_DAY).days
+
+class MessageLog:
+    """메시지 로그 열(column) 저장. array 기반이라 NumPy에는 복사 없이 넘어감"""
+
+    def __init__(self):
+        self.author = array("q")
+        self.channel = array("q")
+        self.day = array("q")
+        self.ts = array("d")
+        self.flags = array("B")
+
+    def __len__(self):
+        return len(self.author)
+
+    def append(self, author: int, channel: int, ts: float, flags: int):
+        self.author.append(author)
+        self.channel.append(channel)
+        self.ts.append(ts)
+        self.day.append(logical_day_of_ts(ts))
+        self.flags.append(flags)
+
+    def append_record(self, rec: dict):
+        flags = ((LOG_LINK if rec.get("has_link") else 0) | (LOG_ATTACH if rec.get("has_attachment") else 0)
+                 | (LOG_IMAGE if rec.get("has_image") else 0) | (LOG_CHECKIN if rec.get("checkin") else 0))
+        self.append(int(rec["author"]), int(rec["channel"]), parse_log_ts(rec["ts"]), flags)
+
+    def extend_records(self, recs: list):
+        """레코드 묶음을 열 단위로 추가. 모든 열을 다 만든 뒤에 붙이므로 실패하면 아무것도 안 바뀜"""
+        author = array("q", [int(r["author"]) for r in recs])
+        channel = array("q", [int(r["channel"]) for r in recs])
+        ts = array("d", [parse_log_ts(r["ts"]) for r in recs])
+        day = array("q", [int((t + LOGICAL_DAY_SHIFT_SEC) // 86400) for t in ts])
+        flags = array("B", [(LOG_LINK if r.get("has_link") else 0) | (LOG_ATTACH if r.get("has_attachment") else 0)
+                            | (LOG_IMAGE if r.get("has_image") else 0) | (LOG_CHECKIN if r.get("checkin") else 0)
+                            for r in recs])
+        self.author.extend(author)
+        self.channel.extend(channel)
+        self.ts.extend(ts)
+        self.day.extend(day)
+        self.flags.extend(flags)
+
+def _parse_log_lines(lines: List[str]) -> list:
+    """JSONL 줄 묶음 → 레코드 목록. 한 줄씩 loads하는 대신 배열 하나로 파싱"""
+    text = "[" + ",".join(lines) + "]"
+    recs = orjson.loads(text) if orjson is not None else json.loads(text)
+    if len(recs) != len(lines):
+        raise ValueError("한 줄에 레코드 하나가 아님")
+    return recs
+
+def read_message_log(path: str) -> MessageLog:
+    """JSONL(.gz) → MessageLog. LOG_CHUNK_LINES줄씩 묶어 파싱하고 열 단위로 추가.
+    묶음이 실패하면 그 묶음만 한 줄씩 다시 읽어 틀린 줄을 줄 번호와 함께 ValueError"""
+    log = MessageLog()
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        first = 1
+        while True:
+            chunk = list(itertools.islice(f, LOG_CHUNK_LINES))
+            if not chunk:
+                break
+            try:
+                log.extend_records(_parse_log_lines([line for line in chunk if line.strip()]))
+            except (ValueError, KeyError, TypeError):
+                for lineno, line in enumerate(chunk, start=first):
+                    if not line.strip():
+                        continue
+                    try:
+                        log.append_record(json.loads(line))
+                    except (ValueError, KeyError, TypeError) as e:
+                        raise ValueError(f"{path}:{lineno}: 잘못된 메시지 레코드 ({e})") from e
+            first += len(chunk)
+    return log
+
+def message_log_record(message: discord.Message) -> dict:
+    """discord 메시지 → 백필용 로그 레코드"""
+    has_link, has_attach, has_image = message_flags(message)
+    return {
+        "author": message.author.id,
+        "channel": message.channel.id,
+        "ts": message.created_at.timestamp(),
+        "has_link": has_link,
+        "has_attachment": has_attach,
+        "has_image": has_image,
+        "checkin": message.content.split(maxsplit=1)[:1] == ["!출근"],
+    }
+
+def _channel_table(channel_points: Dict[int, dict]):
+    cids = sorted(channel_points)
+    return cids, {cid: i for i, cid in enumerate(cids)}
+
+def group_messages_py(log: MessageLog, channel_points: Dict[int, dict], checkin_cid: int | None,
+                      extra_checkins: set) -> Tuple[Dict[Tuple[int, int, int], int], set]:
+    """(작성자, 논리 날짜, 채널) → 인정 대상 메시지 수, 출석 (작성자, 날짜) 집합"""
+    counts: Dict[Tuple[int, int, int], int] = collections.Counter()
+    rules = {cid: conf for cid, conf in channel_points.items()}
+    checkins = set(extra_checkins)
+    for author, channel, day, flags in zip(log.author, log.channel, log.day, log.flags):
+        conf = rules.get(channel)
+        if conf is not None and is_countable(conf, bool(flags & LOG_LINK), bool(flags & LOG_ATTACH),
+                                             bool(flags & LOG_IMAGE)):
+            counts[(author, day, channel)] += 1
+        if flags & LOG_CHECKIN and checkin_cid is not None:
+            checkins.add((author, day))
+    if checkin_cid in rules:
+        for author, day in checkins:
+            counts[(author, day, checkin_cid)] += 1
+    return counts, checkins
+
+def group_messages_np(log: MessageLog, channel_points: Dict[int, dict], checkin_cid: int | None,
+                      extra_checkins: set) -> Tuple[Dict[Tuple[int, int, int], int], set]:
+    """group_messages_py와 같은 결과를 NumPy 정렬/unique로 계산"""
+    cids, index = _channel_table(channel_points)
+    author = np.frombuffer(log.author, dtype=np.int64)
+    channel = np.frombuffer(log.channel, dtype=np.int64)
+    day = np.frombuffer(log.day, dtype=np.int64)
+    flags = np.frombuffer(log.flags, dtype=np.uint8)
+
+    table = np.array(cids, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(table, channel), len(cids) - 1)
+    known = table[pos] == channel
+    allow_link = np.array([bool(channel_points[c].get("allow_link")) for c in cids])[pos]
+    image_only = np.array([bool(channel_points[c].get("image_only")) for c in cids])[pos]
+    link_or_attach = (flags & (LOG_LINK | LOG_ATTACH)) != 0
+    image = (flags & LOG_IMAGE) != 0
+    ok = known & np.where(allow_link, link_or_attach, np.where(image_only, image, True))
+
+    authors, days, chans = [author[ok]], [day[ok]], [pos[ok]]
+    checkins = set(extra_checkins)
+    if checkin_cid is not None:
+        ck = (flags & LOG_CHECKIN) != 0
+        if ck.any():
+            pairs = np.unique(np.stack([author[ck], day[ck]], axis=1), axis=0)
+            checkins.update(zip(pairs[:, 0].tolist(), pairs[:, 1].tolist()))
+        if checkins and checkin_cid in index:
+            ck_pairs = np.array(sorted(checkins), dtype=np.int64)
+            authors.append(ck_pairs[:, 0])
+            days.append(ck_pairs[:, 1])
+            chans.append(np.full(len(ck_pairs), index[checkin_cid], dtype=np.int64))
+    a, d, c = np.concatenate(authors), np.concatenate(days), np.concatenate(chans)
+    if not len(a):
+        return {}, checkins
+
+    # (작성자, 날짜, 채널) → 정수 키 하나로 합쳐 unique/count
+    a_codes, a_inv = np.unique(a, return_inverse=True)
+    d0 = d.min()
+    n_days, n_ch = int(d.max() - d0) + 1, len(cids)
+    key = (a_inv.astype(np.int64) * n_days + (d - d0)) * n_ch + c
+    ukey, cnt = np.unique(key, return_counts=True)
+    g_ch = ukey % n_ch
+    g_day = (ukey // n_ch) % n_days + d0
+    g_author = a_codes[ukey // (n_ch * n_days)]
+    cid_arr = table[g_ch]
+    counts = dict(zip(zip(g_author.tolist(), g_day.tolist(), cid_arr.tolist()), cnt.tolist()))
+    return counts, checkins
+
+def accepted_points(conf: dict, n: int) -> int | None:
+    """메시지 n개 중 상한 안에서 인정되는 점수. 하나도 인정 안 되면 None(채널 기록 없음)"""
+    points, cap = conf["points"], conf["daily_max"]
+    if points <= 0:
+        return points * n if points <= cap else None
+    k = min(n, cap // points)
+    return k * points if k > 0 else None
+
+def backfill_store(current: dict, log: MessageLog, config: "GuildConfig",
+                   day_range: Tuple[int, int] | None = None, use_numpy: bool | None = None) -> dict:
+    """current를 바탕으로 day_range(논리 날짜, 양끝 포함, 기본: 로그 범위)의
+    activity/attendance만 로그로 다시 계산한 새 store. current는 건드리지 않음"""
+    channel_points, checkin_cid = config.channel_points, config.checkin_channel_id
+    if day_range is None:
+        if not len(log):
+            return json.loads(serialize_data(current))
+        day_range = (min(log.day), max(log.day))
+    lo_ds, hi_ds = unix_day_str(day_range[0]), unix_day_str(day_range[1])
+    in_range = lambda ds: lo_ds <= ds <= hi_ds
+
+    new = json.loads(serialize_data(current))
+    new.setdefault("users", {})
+    # 이미 기록된 출석은 유지(로그에 !출근이 없어도 출근 점수 재계산)
+    extra = set()
+    for uid, u in new["users"].items():
+        kept_att = []
+        for ds in u.get("attendance", []):
+            if in_range(ds):
+                extra.add((int(uid), unix_day_of(ds)))
+            else:
+                kept_att.append(ds)
+        u["attendance"] = kept_att
+        u["activity"] = {ds: rec for ds, rec in u.get("activity", {}).items() if not in_range(ds)}
+    if checkin_cid is None:
+        extra = set()
+
+    lo, hi = day_range
+    in_window = array("B", (lo <= d <= hi for d in log.day))
+    if not all(in_window):
+        sub = MessageLog()
+        for i, keep in enumerate(in_window):
+            if keep:
+                sub.append(log.author[i], log.channel[i], log.ts[i], log.flags[i])
+        log = sub
+    if use_numpy is None:
+        use_numpy = np is not None
+    group = group_messages_np if use_numpy and len(log) and channel_points else group_messages_py
+    counts, checkins = group(log, channel_points, checkin_cid, extra)
+
+    # 조립: 날짜 문자열/사용자 레코드는 묶음마다가 아니라 한 번씩만 만듦
+    day_str = {d: unix_day_str(d) for d in range(lo, hi + 1)}
+    user_of: Dict[int, dict] = {}
+    def user_rec(author: int) -> dict:
+        u = user_of.get(author)
+        if u is None:
+            u = user_of[author] = new["users"].setdefault(str(author), CompactUser().to_json())
+        return u
+    cid_key = {cid: str(cid) for cid in channel_points}
+    for (author, day, cid), n in sorted(counts.items()):
+        rec = user_rec(author)["activity"].setdefault(day_str[day], {"total": 0, "by_channel": {}})
+        pts = accepted_points(channel_points[cid], n)
+        if pts is not None:
+            rec["by_channel"][cid_key[cid]] = pts
+            rec["total"] += pts
+    for author, day in checkins:
+        user_rec(author)["attendance"].append(day_str[day])
+    for u in new["users"].values():
+        u["attendance"].sort()
+        # 인정된 점수가 없는 날은 남기지 않음(메모리 모델도 빈 날은 기록이 없음)
+        u["activity"] = {ds: rec for ds, rec in sorted(u["activity"].items())
+                         if rec["total"] or any(rec["by_channel"].values())}
+    return new
+
+def diff_stores(old: dict, new: dict) -> dict:
+    """사용자/날짜별 점수 변화. {"users": {uid: {날짜: {"old", "new", "by_channel": {채널: [old, new]}}}}}"""
+    out: Dict[str, dict] = {}
+    delta = 0
+    old_users, new_users = old.get("users", {}), new.get("users", {})
+    for uid in sorted(set(old_users) | set(new_users)):
+        oa = old_users.get(uid, {}).get("activity", {})
+        na = new_users.get(uid, {}).get("activity", {})
+        for ds in sorted(set(oa) | set(na)):
+            o, n = oa.get(ds, {}), na.get(ds, {})
+            if o.get("by_channel", {}) == n.get("by_channel", {}) and o.get("total", 0) == n.get("total", 0):
+                continue
+            ob, nb = o.get("by_channel", {}), n.get("by_channel", {})
+            out.setdefault(uid, {})[ds] = {
+                "old": o.get("total", 0),
+                "new": n.get("total", 0),
+                "by_channel": {ck: [ob.get(ck, 0), nb.get(ck, 0)]
+                               for ck in sorted(set(ob) | set(nb)) if ob.get(ck, 0) != nb.get(ck, 0)},
+            }
+            delta += n.get("total", 0) - o.get("total", 0)
+    return {"users": out, "summary": {"users": len(out), "days": sum(len(v) for v in out.values()),
+                                      "points_delta": delta}}
+
+def replay_online(log: MessageLog, config: "GuildConfig") -> dict:
+    """온라인 경로(on_message → check_in) 그대로 메시지를 시간순으로 한 건씩 반영(결과는 data.json 스키마)"""
+    channel_points, checkin_cid = config.channel_points, config.checkin_channel_id
+    data: dict = {"users": {}}
+    for i in sorted(range(len(log)), key=log.ts.__getitem__):
+        uid, ds, cid, flags = str(log.author[i]), unix_day_str(log.day[i]), log.channel[i], log.flags[i]
+        conf = channel_points.get(cid)
+        if conf is not None and is_countable(conf, bool(flags & LOG_LINK), bool(flags & LOG_ATTACH),
+                                             bool(flags & LOG_IMAGE)):
+            add_activity_logic(data, uid, ds, cid, channel_points)
+        if flags & LOG_CHECKIN and checkin_cid is not None:
+            if ensure_user(data, uid).set_attended(day_index(ds)):
+                add_activity_logic(data, uid, ds, checkin_cid, channel_points)
+    return json.loads(serialize_data(data))
+
+def validate_backfill(log: MessageLog, config: "GuildConfig", use_numpy: bool | None = None) -> List[str]:
+    """빈 상태에서 백필 결과와 온라인 경로 재생 결과를 비교. 불일치 목록 반환"""
+    online = replay_online(log, config)
+    offline = backfill_store({"users": {}}, log, config, use_numpy=use_numpy)
+    diffs = []
+    for uid in sorted(set(online["users"]) | set(offline["users"])):
+        a = online["users"].get(uid, {})
+        b = offline["users"].get(uid, {})
+        if a.get("activity", {}) != b.get("activity", {}):
+            for ds in sorted(set(a.get("activity", {})) | set(b.get("activity", {}))):
+                ra, rb = a.get("activity", {}).get(ds), b.get("activity", {}).get(ds)
+                if ra != rb:
+                    diffs.append(f"{uid} {ds}: 온라인 {ra} / 백필 {rb}")
+        if sorted(a.get("attendance", [])) != sorted(b.get("attendance", [])):
+            diffs.append(f"{uid} 출석: 온라인 {sorted(a.get('attendance', []))} / 백필 {b.get('attendance', [])}")
+    return diffs
+
+def run_backfill_cli(argv: List[str]):
+    """python bot_v5_final.py backfill messages.jsonl[.gz] [--guild ID] [--from D --to D]
+    [--out 파일(.snap이면 바이너리)] [--diff 파일] [--validate] [--no-numpy]"""
+    import argparse
+    ap = argparse.ArgumentParser(prog="backfill")
+    ap.add_argument("log")
+    ap.add_argument("--guild", type=int, default=HOME_GUILD_ID)
+    ap.add_argument("--from", dest="start", help="논리 날짜 YYYY-MM-DD(기본: 로그 첫날)")
+    ap.add_argument("--to", dest="end", help="논리 날짜 YYYY-MM-DD(기본: 로그 마지막 날)")
+    ap.add_argument("--out", help="재계산한 store 경로(기본: <data.json>.backfilled, .snap이면 바이너리)")
+    ap.add_argument("--diff", help="현재 store 대비 변화(JSON) 경로")
+    ap.add_argument("--validate", action="store_true", help="온라인 경로 재생 결과와 일치하는지 검사")
+    ap.add_argument("--no-numpy", action="store_true")
+    args = ap.parse_args(argv)
+
+    configs = load_guild_configs()
+    if args.guild not in configs:
+        raise SystemExit(f"❌ guilds.json에 길드 {args.guild} 설정이 없어요")
+    config = configs[args.guild]
+    use_numpy = None if not args.no_numpy else False
+    if use_numpy is None and np is None:
+        print("ℹ️ NumPy 없음 → 순수 파이썬으로 계산 (pip install numpy)")
+
+    t0 = time.perf_counter()
+    log = read_message_log(args.log)
+    t_read = time.perf_counter() - t0
+    print(f"📥 메시지 {len(log)}건 읽음 ({t_read:.2f}s)")
+
+    if args.validate:
+        diffs = validate_backfill(log, config, use_numpy)
+        for line in diffs[:30]:
+            print("⚠️", line)
+        print("✅ 온라인 경로와 일치" if not diffs else f"❌ 불일치 {len(diffs)}건")
+        if diffs:
+            sys.exit(1)
+
+    base = partition_dir(args.guild)
+    data_file = os.path.join(base, "data.json")
+    current, _ = load_startup_state(data_file, os.path.join(base, "journal.jsonl"),
+                                    os.path.join(base, "data.snap"), config.daily_goal)
+    current = json.loads(serialize_data(current))
+    day_range = None
+    if args.start or args.end:
+        if not len(log) and not (args.start and args.end):
+            raise SystemExit("❌ 빈 로그에는 --from/--to를 모두 지정해 주세요")
+        day_range = (unix_day_of(args.start) if args.start else min(log.day),
+                     unix_day_of(args.end) if args.end else max(log.day))
+    t0 = time.perf_counter()
+    new = backfill_store(current, log, config, day_range, use_numpy)
+    print(f"🧮 재계산 완료 ({time.perf_counter() - t0:.2f}s, {'NumPy' if (use_numpy is None and np) else '파이썬'})")
+
+    if args.diff:
+        diff = diff_stores(current, new)
+        write_atomic(json.dumps(diff, ensure_ascii=False, indent=2).encode("utf-8"), args.diff)
+        s = diff["summary"]
+        print(f"📝 변화: {s['users']}명 / {s['days']}일 / 점수 {s['points_delta']:+d} → {args.diff}")
+    out = args.out or (None if args.diff else data_file + ".backfilled")
+    if out:
+        new_generation(new)   # 이 파일로 바꿔 끼우면 다음 시작에서 SQLite도 다시 가져옴
+        if out.endswith(".snap"):
+            state_from_json(new)
+            totals = ActivityTotals(config.daily_goal)
+            totals.rebuild(new)
+            write_atomic(encode_snapshot(new, totals), out)
+        else:
+            save_data(new, out)
+        print(f"✅ 재계산한 store → {out} (봇을 멈춘 뒤 data.json/data.snap 자리에 두면 적용)")
+
+@bot.command(name="PP메시지로그")
+@metrics.timed("cmd_message_log")
+async def cmd_message_log(ctx, *args):
+    """점수 채널 기록을 백필용 JSONL(.gz)로 내려받기"""
+    if not is_admin(ctx.author):
+        return await ctx.reply("관리자만 가능해요.")
+    part = await partition_or_reply(ctx)
+    if part is None:
+        return
+    today = datetime.datetime.now(KST).date()
+    rng = parse_export_range(args, today) if args else None
+    if rng is None:
+        return await ctx.reply("사용법: `!PP메시지로그 2025-01-01..2025-01-31` 또는 `!PP메시지로그 2024년 12월`")
+    start_ds, end_ds = rng
+    # 논리 날짜 경계(06:00 KST) 기준 시각 범위
+    after = KST.localize(datetime.datetime.fromisoformat(start_ds) + datetime.timedelta(hours=6))
+    before = KST.localize(datetime.datetime.fromisoformat(end_ds) + datetime.timedelta(days=1, hours=6))
+    folder = os.path.join(partition_dir(part.guild_id), "logs")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"messages_{start_ds}_{end_ds}.jsonl.gz")
+    n = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for cid in part.config.channel_points:
+            ch = bot.get_channel(cid)
+            if ch is None:
+                continue
+            async for message in ch.history(limit=None, after=after, before=before, oldest_first=True):
+                if message.author.bot:
+                    continue
+                f.write(json.dumps(message_log_record(message), separators=(",", ":")) + "\n")
+                n += 1
+    limit = getattr(ctx.guild, "filesize_limit", None) or DEFAULT_UPLOAD_LIMIT
+    msg = f"📜 {start_ds} ~ {end_ds} 메시지 {n}건 → `{path}`"
+    if os.path.getsize(path) <= limit:
+        await ctx.reply(msg, file=discord.File(path))
+    else:
+        await ctx.reply(msg + " (업로드 한도 초과 → 서버 디스크에만 저장)")
+
+# ========= 관리자 보고서 =========
+@bot.command(name="PP보고서")
+@metrics.timed("cmd_pp_report")
+async def cmd_pp_report(ctx, 기간: str = None, *args):
+    if not is_admin(ctx.author):
+        return await ctx.reply("관리자만 가능해요.")
+    if 기간 not in ("주간", "월간"):
+        return await ctx.reply("사용법: `!PP보고서 주간` 또는 `!PP보고서 월간 N월`")
+    part = await partition_or_reply(ctx)
+    if part is None:
+        return
+    storage, totals = part.storage, part.totals
+
+    today = datetime.datetime.now(KST).date()
+
+    # --- 주간 보고서 ---
+    if 기간 == "주간":
+        pairs = await storage.week_leaderboard(today)
+        names = await member_names.resolve_many(ctx.guild, [uid for uid, _ in pairs])
+        csv_buf = io.StringIO()
+        w = csv.writer(csv_buf)
+        w.writerow(["닉네임", "ID", "주간점수"])
+        text_lines = ["📊 **이번 주 상위 20명**", "```"]
+
+        for i, (uid, sc) in enumerate(pairs, start=1):
+            name = names[uid]
+            w.writerow([name, uid, sc])
+            if i <= 20:
+                text_lines.append(f"{i:>2}. {name:<20} | {sc:>4}점")
+
+        text_lines.append("```")
+
+        csv_bytes = io.BytesIO(csv_buf.getvalue().encode("utf-8"))
+        start, end = get_week_range(today)
+        header = f"📊 이번주 활동 순위 ({start.month}월 {start.day}일 ~ {end.month}월 {end.day}일)"
+        await ctx.reply(
+            header,
+            file=discord.File(csv_bytes, f"weekly_report_{today.year}-W{today.isocalendar()[1]:02d}.csv"),
+        )
+        await ctx.send("\n".join(text_lines))
+        return
+
+    # --- 월간 보고서 ---
+    if 기간 == "월간":
+        target_year, target_month = today.year, today.month
+        if args and len(args) >= 1:
+            ym = parse_year_month(args, today)
+            if ym is None:
+                return await ctx.reply("사용법: `!PP보고서 월간 10월` / `!PP보고서 월간 2024년 12월` 처럼 입력해줘!")
+            target_year, target_month = ym
+        summary = totals.closed.months.get(f"{target_year:04d}-{target_month:02d}")
+        if summary is not None:
+            # 마감된 달 → 확정된 순위만 읽음
+            pairs = summary.ranking.top()
+        else:
+            pairs = await storage.month_leaderboard(target_year, target_month)
+        names = await member_names.resolve_many(ctx.guild, [uid for uid, _ in pairs])
+
+        csv_buf = io.StringIO()
+        w = csv.writer(csv_buf)
+        w.writerow(["닉네임", "ID", "월간점수"])
+        text_lines = [f"📅 **{target_month}월 상위 20명**", "```"]
+
+        for i, (uid, sc) in enumerate(pairs, start=1):
+            name = names[uid]
+            w.writerow([name, uid, sc])
+            if i <= 20:
+                text_lines.append(f"{i:>2}. {name:<20} | {sc:>4}점")
+
+        text_lines.append("```")
+
+        csv_bytes = io.BytesIO(csv_buf.getvalue().encode("utf-8"))
+        header = f"📅 {target_year}년 {target_month}월 활동 순위"
+        if summary is not None:
+            header += f"\n참여 {summary.users}명 · 합계 {summary.total}점 · 목표 달성 {summary.goal_days}일"
+        await ctx.reply(header, file=discord.File(csv_bytes, f"monthly_report_{target_year}-{target_month:02d}.csv"))
+        await ctx.send("\n".join(text_lines))
+        return
+
+# ========= 웹 서버(헬스체크/지표/조회 API) =========
+# 봇과 같은 이벤트 루프에서 돌기 때문에 길드 data를 잠금 없이 안전하게 읽음
+
+def _json(payload: dict, status: int = 200) -> web.Response:
+    return web.json_response(payload, status=status, dumps=lambda o: json.dumps(o, ensure_ascii=False))
+
+async def http_alive(request: web.Request) -> web.Response:
+    return web.Response(text="Bot is alive!")
+
+async def http_ready(request: web.Request) -> web.Response:
+    connected = bot.is_ready() and not bot.is_closed()
+    latency = bot.latency
+    parts = list(partitions)
+    flushes = [p.persistence.stats["last_flush_at"] for p in parts if p.persistence.stats["last_flush_at"]]
+    backups = [p.last_backup_at for p in parts if p.last_backup_at]
+    return _json({
+        "ready": connected,
+        "gateway_latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+        "guilds": [p.guild_id for p in parts],
+        "pending_writes": sum(p.persistence.pending for p in parts),
+        "last_flush_at": max(flushes, default=None),
+        "dm_queue_depth": outbox.depth(),
+        "state_queue_depth": sum(p.actor.depth() for p in parts),
+        "last_backup_at": max(backups, default=None),
+    }, status=200 if connected else 503)
+
+async def http_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Prometheus-Format": "0.0.4"})
+
+def _ref_date(request: web.Request) -> datetime.date:
+    ds = request.query.get("date")
+    return datetime.date.fromisoformat(ds) if ds else datetime.datetime.now(KST).date()
+
+def _partition(request: web.Request) -> GuildPartition | None:
+    """?guild=<ID>, 없으면 홈(또는 유일한) 길드"""
+    gid = request.query.get("guild")
+    if not gid:
+        return partitions.default()
+    return partitions.get(int(gid)) if gid.isdigit() else None
+
+async def http_user_week(request: web.Request) -> web.Response:
+    uid = request.match_info["uid"]
+    part = _partition(request)
+    if part is None:
+        return _json({"error": "이 프로세스가 맡지 않은 길드"}, status=404)
+    totals = part.totals
+    try:
+        ref = _ref_date(request)
+    except ValueError:
+        return _json({"error": "date는 YYYY-MM-DD 형식"}, status=400)
+    start, end = get_week_range(ref)
+    wk = week_key(ref)
+    payload = {
+        "uid": uid,
+        "week": wk,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "total": totals.week_total(uid, ref),
+        "closed": wk in totals.closed.weeks,
+    }
+    if payload["closed"]:
+        payload["goal_days"] = totals.closed.goal_days(uid, start, end)
+    return _json(payload)
+
+async def http_user_month(request: web.Request) -> web.Response:
+    uid = request.match_info["uid"]
+    part = _partition(request)
+    if part is None:
+        return _json({"error": "이 프로세스가 맡지 않은 길드"}, status=404)
+    totals = part.totals
+    try:
+        ref = _ref_date(request)
+        year = int(request.query.get("year", ref.year))
+        month = int(request.query.get("month", ref.month))
+        datetime.date(year, month, 1)
+    except ValueError:
+        return _json({"error": "year/month 또는 date 형식 오류"}, status=400)
+    mk = f"{year:04d}-{month:02d}"
+    payload = {
+        "uid": uid,
+        "month": mk,
+        "total": totals.month_total(uid, year, month),
+        "closed": mk in totals.closed.months,
+    }
+    if payload["closed"]:
+        payload["goal_days"] = totals.closed.goal_days(uid, *month_range(year, month))
+    return _json(payload)
+
+def make_web_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/", http_alive)
+    app.router.add_get("/healthz", http_alive)
+    app.router.add_get("/readyz", http_ready)
+    app.router.add_get("/metrics", http_metrics)
+    app.router.add_get("/api/users/{uid}/week", http_user_week)
+    app.router.add_get("/api/users/{uid}/month", http_user_month)
+    return app
+
+async def start_web_server() -> web.AppRunner:
+    runner = web.AppRunner(make_web_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", int(os.environ.get("PORT", "8080"))).start()
+    return runner
+
+# ========= 시작 =========
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate-sqlite":
+        # python bot_v5_final.py migrate-sqlite [data.json] [data.sqlite3]
+        src = sys.argv[2] if len(sys.argv) > 2 else DATA_FILE
+        dst = sys.argv[3] if len(sys.argv) > 3 else SQLITE_FILE
+        n = migrate_json_to_sqlite(src, dst)
+        print(f"✅ {n}명 마이그레이션 완료 → {dst}")
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "to-binary":
+        # python bot_v5_final.py to-binary [data.json] [data.snap]
+        src = sys.argv[2] if len(sys.argv) > 2 else DATA_FILE
+        dst = sys.argv[3] if len(sys.argv) > 3 else SNAPSHOT_FILE
+        write_atomic(encode_snapshot(state_from_json(load_data(src))), dst)
+        print(f"✅ {src} → {dst} ({os.path.getsize(dst) // 1024}KB)")
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "to-json":
+        # python bot_v5_final.py to-json [data.snap] [data.json]
+        src = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_FILE
+        dst = sys.argv[3] if len(sys.argv) > 3 else DATA_FILE
+        save_data(open_snapshot(src), dst)
+        print(f"✅ {src} → {dst} ({os.path.getsize(dst) // 1024}KB)")
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "restore-backups":
+        # python bot_v5_final.py restore-backups [backups 폴더] [출력 json]
+        src = sys.argv[2] if len(sys.argv) > 2 else BACKUP_DIR
+        dst = sys.argv[3] if len(sys.argv) > 3 else DATA_FILE + ".restored"
+        restored = restore_from_backup_dir(src)
+        new_generation(restored)
+        save_data(restored, dst)
+        print(f"✅ {len(restored.get('users', {}))}명 복원 → {dst}")
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        run_backfill_cli(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "workers":
+        # python bot_v5_final.py workers N → 샤드를 N개 프로세스로 나눠 실행
+        sys.exit(run_workers(int(sys.argv[2]) if len(sys.argv) > 2 else 2))
+    TOKEN = os.environ.get("DISCORD_BOT_TOKEN")
+    if TOKEN:
+        bot.run(TOKEN)
+        for part in partitions:
+            part.persistence.flush_sync()
+    else:
+        print("❌ DISCORD_BOT_TOKEN 환경변수가 설정되지 않았습니다.")
+
+
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# 테스트 공용: 봇 모듈은 import 시 DATA_DIR에 폴더를 만들고 상태를 읽으므로 임시 폴더로 돌림
+#   python -m unittest discover -s tests
+
+import os
+import sys
+import shutil
+import tempfile
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="dulgi-test-"))
+os.environ.setdefault("SNAPSHOT_FORMAT", "binary")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot_v5_final as bot  # noqa: E402
+
+_next_gid = iter(range(900000000000000001, 900000000000999999))
+
+def new_partition() -> "bot.GuildPartition":
+    """빈 폴더를 쓰는 홈 설정과 같은 규칙의 새 길드 파티션"""
+    gid = next(_next_gid)
+    shutil.rmtree(os.path.join(bot.BASE_PATH, "guilds", str(gid)), ignore_errors=True)
+    home = bot.GuildConfig.home()
+    cfg = bot.GuildConfig(gid, "test", home.channel_points, home.checkin_channel_id,
+                          home.daily_goal, home.week_goal)
+    return bot.GuildPartition(cfg)
+
+def reopen(part: "bot.GuildPartition") -> "bot.GuildPartition":
+    """같은 폴더로 파티션을 다시 읽음(재시작 흉내)"""
+    return bot.GuildPartition(part.config)
+
+def sample_users(n: int, days: int = 30) -> dict:
+    """n명 × days일, 채널 상한 안의 점수와 출석"""
+    channels = list(bot.CHANNEL_POINTS.items())
+    users = {}
+    for i in range(n):
+        activity, attendance = {}, []
+        for d in range(days):
+            if (i + d) % 3:
+                continue
+            ds = f"2025-01-{d % 28 + 1:02d}" if d < 28 else f"2025-02-{d - 27:02d}"
+            cid, conf = channels[(i + d) % len(channels)]
+            activity[ds] = {"total": conf["daily_max"], "by_channel": {str(cid): conf["daily_max"]}}
+            attendance.append(ds)
+        users[str(100000000000000000 + i)] = {
+            "attendance": attendance, "activity": activity, "notified": {},
+            "level": 1, "exp": 0, "rank_title": None, "badges": [],
+        }
+    return {"users": users}
+
+def compact_users(n: int, days: int = 30) -> dict:
+    """sample_users와 같은 내용을 메모리 모델(CompactUser)로"""
+    return bot.state_from_json(sample_users(n, days))
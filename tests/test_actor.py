@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# 점수 반영: 상한 캐시(ChannelCapCache)와 상태 액터의 Award/CheckIn 결과
+
+import asyncio
+import datetime
+import unittest
+
+from support import bot, new_partition
+
+DRAWING = next(cid for cid, c in bot.CHANNEL_POINTS.items() if c["points"] == 6)   # 6점, 하루 6점
+DONE = next(cid for cid, c in bot.CHANNEL_POINTS.items() if c["points"] == 5)      # 5점, 하루 5점
+UID = "100000000000000001"
+
+class ChannelCapCacheTest(unittest.TestCase):
+
+    def test_marks_reset_when_the_day_changes(self):
+        cache = bot.ChannelCapCache()
+        cache.mark(UID, DRAWING, "2025-03-03")
+        self.assertTrue(cache.is_capped(UID, DRAWING, "2025-03-03"))
+        self.assertFalse(cache.is_capped(UID, DONE, "2025-03-03"))
+        self.assertFalse(cache.is_capped("2", DRAWING, "2025-03-03"))
+        self.assertFalse(cache.is_capped(UID, DRAWING, "2025-03-04"))     # 날짜가 바뀌면 통째로 비움
+        self.assertFalse(cache.is_capped(UID, DRAWING, "2025-03-03"))
+        cache.mark(UID, DRAWING, "2025-03-04")
+        cache.clear()
+        self.assertFalse(cache.is_capped(UID, DRAWING, "2025-03-04"))
+
+    def test_award_marks_the_cap(self):
+        part = new_partition()
+        ds = "2025-03-03"
+        self.assertTrue(bot.award_activity(part, UID, ds, DRAWING))
+        self.assertTrue(part.cap_cache.is_capped(UID, DRAWING, ds))
+        self.assertFalse(bot.award_activity(part, UID, ds, DRAWING))
+        self.assertEqual(part.data["users"][UID].day_total(bot.day_index(ds)), 6)
+
+class StateActorResultTest(unittest.TestCase):
+
+    def test_award_and_check_in_results(self):
+        part = new_partition()
+        today = datetime.datetime.now(bot.KST).date()
+        ds = today.isoformat()
+        goal = part.config.daily_goal
+        self.assertLess(6, goal)
+        self.assertGreaterEqual(6 + 5, goal)
+        checkin_points = part.config.channel_points[part.config.checkin_channel_id]["points"]
+
+        async def scenario():
+            results = [
+                await part.actor.call(bot.Award(UID, ds, DRAWING)),
+                await part.actor.call(bot.Award(UID, ds, DRAWING)),   # 상한 → 미반영
+                await part.actor.call(bot.Award(UID, ds, DONE)),      # 하루 목표 달성
+                await part.actor.call(bot.CheckIn(UID, ds)),
+                await part.actor.call(bot.CheckIn(UID, ds)),          # 이미 출근
+            ]
+            await part.actor.aclose()
+            return results
+
+        award1, capped, award2, checkin, again = asyncio.run(scenario())
+        self.assertEqual(award1, bot.AwardResult(6, 6, 6, False, False))
+        self.assertEqual(capped, bot.AwardResult(0, 6, 6, False, False))
+        self.assertEqual(award2, bot.AwardResult(5, 11, 11, True, False))
+        self.assertEqual(checkin, bot.CheckInResult(True, checkin_points))
+        self.assertEqual(again, bot.CheckInResult(False, 0))
+        user = part.data["users"][UID]
+        self.assertTrue(user.attended(bot.day_index(ds)))
+        self.assertIn(f"daily_{ds}", user.notified)
+        self.assertEqual(part.persistence.pending, 5)   # 점수 3 + 알림 1 + 출석 1
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# 마감 데이터(ClosedPeriods): 목표 비트 확정, 늦은 점수로 다시 열기, 저장 왕복, EPOCH_DAY 이전 날짜
+
+import datetime
+import unittest
+
+from support import bot
+
+CID = next(iter(bot.CHANNEL_POINTS))
+UID = "100000000000000001"
+
+def data_with(points: dict) -> dict:
+    """{날짜: 점수} 기록을 가진 사용자 1명"""
+    data = {"users": {}}
+    user = bot.ensure_user(data, UID)
+    for ds, p in points.items():
+        user.add_points(bot.day_index(ds), CID, p)
+    return data
+
+class ClosedPeriodsTest(unittest.TestCase):
+
+    def test_late_points_reopen_a_closed_day(self):
+        goal = 5
+        data = data_with({"2025-03-03": goal - 1})
+        closed = bot.ClosedPeriods(goal)
+        closed.touch(UID, "2025-03-03")
+        closed.close_days(data, "2025-03-04")
+        self.assertFalse(closed.goal_met(UID, "2025-03-03"))
+        wk, mk = bot.period_keys("2025-03-03")
+        closed.weeks[wk] = closed.months[mk] = "요약"
+        # 마감된 날에 늦게 들어온 점수 → 그날은 다시 열리고 그 주/월 요약도 버림
+        data["users"][UID].add_points(bot.day_index("2025-03-03"), CID, 1)
+        closed.touch(UID, "2025-03-03")
+        self.assertIsNone(closed.goal_met(UID, "2025-03-03"))
+        self.assertNotIn(wk, closed.weeks)
+        self.assertNotIn(mk, closed.months)
+        self.assertEqual(closed.close_days(data, "2025-03-04"), {UID})
+        self.assertTrue(closed.goal_met(UID, "2025-03-03"))
+        self.assertEqual(closed.through, "2025-03-04")
+        self.assertEqual(closed.goal_days(UID, datetime.date(2025, 3, 3), datetime.date(2025, 3, 9)), 1)
+
+    def test_json_round_trip_and_goal_change(self):
+        closed = bot.ClosedPeriods(5)
+        closed.touch(UID, "2025-03-03")
+        closed.close_days(data_with({"2025-03-03": 5}), "2025-03-03")
+        closed.touch(UID, "2025-03-05")
+        doc = closed.to_json()
+        again = bot.ClosedPeriods.from_json(doc, 5)
+        self.assertEqual(again.to_json(), doc)
+        self.assertTrue(again.goal_met(UID, "2025-03-03"))
+        self.assertEqual(again.open, {"2025-03-05": {UID}})
+        # 목표 점수가 바뀌면 예전 비트는 버림
+        reset = bot.ClosedPeriods.from_json(doc, 6)
+        self.assertEqual((reset.through, reset.goal_bits, reset.open), ("", {}, {}))
+
+    def test_days_before_epoch_are_not_tracked(self):
+        goal = 5
+        data = data_with({"2019-12-31": goal, "2020-01-01": goal})
+        closed = bot.ClosedPeriods(goal)
+        for ds in ("2019-12-31", "2020-01-01"):
+            closed.touch(UID, ds)
+        self.assertEqual(set(closed.open), {"2020-01-01"})
+        # 예전 상태에 남은 이전 날짜도 음수 시프트 없이 버림
+        closed.open["2019-12-30"] = {UID}
+        self.assertEqual(closed.close_days(data, "2020-01-01"), {UID})
+        self.assertEqual(closed.open, {})
+        self.assertEqual(closed.goal_bits[UID], 1)
+        self.assertIsNone(closed.goal_met(UID, "2019-12-31"))
+        self.assertTrue(closed.goal_met(UID, "2020-01-01"))
+        self.assertTrue(bot.goal_reached(data, UID, "2019-12-31", goal, closed))   # 사용자 기록으로 판단
+        self.assertEqual(closed.goal_days(UID, datetime.date(2019, 12, 30), datetime.date(2020, 1, 5)), 1)
+        self.assertEqual(closed.goal_days(UID, datetime.date(2019, 12, 1), datetime.date(2019, 12, 31)), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# 메모리 모델(CompactUser): data.json 스키마와 왕복, 배열 확장, 알림 키 정리, 스냅샷 블록(v1 호환), 지연 로딩 순회
+
+import json
+import unittest
+
+from support import bot, new_partition, reopen, compact_users, sample_users
+
+CID = next(iter(bot.CHANNEL_POINTS))
+
+def idx(ds: str) -> int:
+    return bot.day_index(ds)
+
+class CompactUserTest(unittest.TestCase):
+
+    def test_json_round_trip(self):
+        doc = {
+            "attendance": ["2025-01-01", "2025-01-03"],
+            "activity": {
+                "2025-01-01": {"total": 7, "by_channel": {str(CID): 3, "42": 40000}},
+                "2025-01-05": {"total": 2, "by_channel": {}},   # 채널 구분 없는 구버전 기록
+            },
+            "notified": {"daily_2025-01-01": True},
+            "level": 3, "exp": 10, "rank_title": "새싹", "badges": ["a"],
+            "nickname": "둘기",
+        }
+        cu = bot.CompactUser.from_json(doc)
+        self.assertEqual(cu.channels[42].typecode, "i")   # 16비트를 넘는 채널만 넓힘
+        self.assertEqual(cu.to_json(), doc)
+        self.assertEqual(bot.CompactUser.from_state(cu.state()).to_json(), doc)
+        raw, ndays = bot.encode_user_block(cu)
+        self.assertEqual(ndays, 2)
+        self.assertEqual(bot.decode_user_block(raw).to_json(), doc)
+
+    def test_points_attendance_and_earlier_days(self):
+        cu = bot.CompactUser()
+        self.assertTrue(cu.add_points(idx("2025-03-10"), CID, 2, 4))
+        self.assertTrue(cu.add_points(idx("2025-03-10"), CID, 2, 4))
+        self.assertFalse(cu.add_points(idx("2025-03-10"), CID, 1, 4))
+        self.assertTrue(cu.set_attended(idx("2025-03-10")))
+        self.assertFalse(cu.set_attended(idx("2025-03-10")))
+        # base보다 앞선 날(늦은 재생/복원) → 배열과 출석 비트가 같이 밀림
+        cu.add_points(idx("2025-02-20"), CID, 1)
+        cu.set_attended(idx("2025-02-21"))
+        self.assertEqual(cu.day_total(idx("2025-03-10")), 4)
+        self.assertEqual(cu.channel_points(idx("2025-02-20"), CID), 1)
+        self.assertEqual(cu.attendance_days(), [idx("2025-02-21"), idx("2025-03-10")])
+        self.assertEqual(cu.range_total(idx("2025-02-01"), idx("2025-02-28")), 1)
+        self.assertEqual(cu.day_count(), 2)
+
+    def test_notify_drops_older_keys_of_same_kind(self):
+        cu = bot.CompactUser()
+        self.assertTrue(cu.notify("daily_2025-01-01"))
+        self.assertTrue(cu.notify("weekly_2025-W01"))
+        self.assertTrue(cu.notify("custom"))
+        self.assertTrue(cu.notify("daily_2025-01-02"))
+        self.assertFalse(cu.notify("daily_2025-01-02"))
+        self.assertEqual(set(cu.notified), {"daily_2025-01-02", "weekly_2025-W01", "custom"})
+
+    def test_version1_block_still_reads(self):
+        ci = 0
+        cid = bot.CHANNEL_BY_INDEX[ci]
+        base = idx("2025-01-01")
+        tail = json.dumps({"notified": {}, "level": 1, "exp": 0, "rank_title": None, "badges": [],
+                           "extra": [[base + 1, "42", 5]]}).encode("utf-8")
+        raw = (bot.SNAP_BLOCK_V1.pack(0, base, 1, 1 << ci, 1, len(tail))
+               + bot.array("H", [3]).tobytes() + bytes([3]) + bytes([1]) + tail)
+        cu = bot.decode_user_block(raw, 1)
+        self.assertEqual(cu.to_json()["activity"], {
+            "2025-01-01": {"total": 3, "by_channel": {str(cid): 3}},
+            "2025-01-02": {"total": 0, "by_channel": {"42": 5}},
+        })
+        self.assertEqual(cu.to_json()["attendance"], ["2025-01-01"])
+
+    def test_bulk_scan_does_not_load_users(self):
+        part = new_partition()
+        bot.write_atomic(bot.encode_snapshot(compact_users(20)), part.snapshot_file)
+        part = reopen(part)
+        users = part.data["users"]
+        scanned = {uid: u.to_json() for uid, u in users.items()}
+        self.assertEqual(scanned, sample_users(20)["users"])
+        part.totals.rebuild(part.data)
+        bot.close_through(part.data, part.totals, bot.datetime.date(2025, 3, 1))
+        self.assertFalse(any(users.is_loaded(uid) for uid in users))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# 점수 반영과 동시에 돌아가는 컴팩션 → 재시작 후에도 채널 상한/점수가 그대로인지
+
+import asyncio
+import datetime
+import unittest
+
+from support import bot, new_partition, reopen, compact_users
+
+# 1점 × 하루 4점 상한 채널
+CAPPED = next(cid for cid, c in bot.CHANNEL_POINTS.items() if c["points"] == 1 and c["daily_max"] == 4)
+
+class CompactionRaceTest(unittest.TestCase):
+
+    def run_race(self, n_users: int, rounds: int):
+        part = new_partition()
+        bot.write_atomic(bot.encode_snapshot(compact_users(n_users)), part.snapshot_file)
+        part = reopen(part)
+        uids = list(part.data["users"])
+        first = datetime.date(2025, 3, 1)
+        days = []
+
+        async def scenario():
+            part.persistence.start()
+            part.actor.start()
+            # 모든 사용자를 읽어 둠(인코딩할 블록이 많을수록 executor 구간이 길어짐)
+            await part.actor.read(lambda p: [p.data["users"][u] for u in uids])
+            for _ in range(rounds):
+                compaction = asyncio.ensure_future(part.persistence.compact())
+                # 컴팩션이 executor에서 인코딩하는 동안 새 날짜에 3점씩(상한 4점) 계속 반영
+                while not compaction.done():
+                    ds = (first + datetime.timedelta(days=len(days))).isoformat()
+                    days.append(ds)
+                    futs = [part.actor.submit(bot.Award(u, ds, CAPPED)) for u in uids[:1000] for _ in range(3)]
+                    await asyncio.gather(*futs)
+                    await asyncio.sleep(0)
+                await compaction
+            await part.actor.aclose()
+            await part.persistence.aclose()
+
+        asyncio.run(scenario())
+        self.assertGreater(len(days), 1)
+        def day(users, u, ds):
+            rec = users[u]
+            return rec.day_total(bot.day_index(ds)), rec.channel_points(bot.day_index(ds), CAPPED)
+        live = {u: {ds: day(part.data["users"], u, ds) for ds in days} for u in uids[:1000]}
+        restarted = reopen(part)
+        for u, recs in live.items():
+            for ds, rec in recs.items():
+                got = day(restarted.data["users"], u, ds)
+                self.assertLessEqual(got[1], 4, (u, ds))
+                self.assertEqual(got, rec, (u, ds))
+        self.assertEqual(restarted.totals.verify(restarted.data), [])
+
+    def test_caps_hold_after_restart(self):
+        self.run_race(n_users=3000, rounds=3)
+
+if __name__ == "__main__":
+    unittest.main()
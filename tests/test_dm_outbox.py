@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# DM 발송 큐: DM 차단(Forbidden)은 기록 후 재시도 안 함, 429는 Retry-After만큼 기다렸다 재시도
+
+import asyncio
+import unittest
+from unittest import mock
+
+from support import bot
+
+class FakeResponse:
+    def __init__(self, status: int, headers: dict | None = None):
+        self.status = status
+        self.reason = "test"
+        self.headers = headers or {}
+
+class FakeUser:
+    """send가 errors를 차례로 던진 뒤 성공"""
+
+    def __init__(self, uid: int, errors: list):
+        self.id = uid
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def send(self, content=None, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+def dm_events() -> dict:
+    return {dict(labels)["event"]: n for (name, labels), n in bot.metrics.counters.items()
+            if name == "dulgi_dm_events_total"}
+
+class DMOutboxTest(unittest.TestCase):
+
+    def deliver(self, outbox, user):
+        async def scenario():
+            outbox.start()
+            self.assertTrue(outbox.send(user, "hi"))
+            await outbox.aclose()
+        before = dm_events()
+        asyncio.run(scenario())
+        after = dm_events()
+        return {k: after[k] - before.get(k, 0) for k in after if after[k] != before.get(k, 0)}
+
+    def test_forbidden_closes_dm_without_retry(self):
+        outbox = bot.DMOutbox(workers=1)
+        user = FakeUser(1, [bot.discord.Forbidden(FakeResponse(403), "Cannot send messages to this user")])
+        events = self.deliver(outbox, user)
+        self.assertEqual(user.calls, 1)
+        self.assertTrue(outbox.is_closed(user.id))
+        self.assertEqual(events, {"enqueued": 1, "forbidden": 1})
+        # 차단 기록이 남아 있는 동안은 큐에 넣지도 않음
+        self.assertFalse(outbox.send(user, "again"))
+        self.assertEqual(outbox.stats["dropped"], 1)
+
+    def test_retry_after_is_honoured(self):
+        outbox = bot.DMOutbox(workers=1)
+        limited = bot.discord.HTTPException(FakeResponse(429, {"Retry-After": "2.5"}), "rate limited")
+        user = FakeUser(2, [limited])
+        real_sleep = asyncio.sleep
+        waits = []
+
+        async def fake_sleep(delay, *a, **kw):
+            waits.append(delay)
+            await real_sleep(0)
+
+        with mock.patch.object(bot.asyncio, "sleep", fake_sleep):
+            events = self.deliver(outbox, user)
+        self.assertEqual(user.calls, 2)
+        self.assertEqual(waits, [2.5])
+        self.assertEqual(events, {"enqueued": 1, "retried": 1, "sent": 1})
+
+    def test_retry_after_is_capped(self):
+        exc = bot.discord.HTTPException(FakeResponse(429, {"Retry-After": "3600"}), "rate limited")
+        self.assertEqual(bot.retry_after_of(exc), bot.DM_RETRY_AFTER_MAX_SEC)
+        exc = bot.discord.HTTPException(FakeResponse(429, {"Retry-After": "soon"}), "rate limited")
+        self.assertIsNone(bot.retry_after_of(exc))
+
+if __name__ == "__main__":
+    unittest.main()
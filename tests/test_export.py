@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# CSV 내보내기: 기간 인자 해석과 업로드 한도에 맞춘 파트 분할
+
+import io
+import csv
+import gzip
+import datetime
+import tempfile
+import unittest
+
+from support import bot
+
+class ParseExportRangeTest(unittest.TestCase):
+
+    def test_ranges(self):
+        today = datetime.date(2025, 3, 15)
+        cases = {
+            ("2025-01-01..2025-01-31",): ("2025-01-01", "2025-01-31"),
+            ("2025-01-01", "..", "2025-02-10"): ("2025-01-01", "2025-02-10"),
+            ("2월",): ("2025-02-01", "2025-02-28"),
+            ("12월",): ("2024-12-01", "2024-12-31"),          # 이번 달보다 뒤의 달 → 작년
+            ("2024년", "2월"): ("2024-02-01", "2024-02-29"),
+            ("2024-11",): ("2024-11-01", "2024-11-30"),
+        }
+        for args, want in cases.items():
+            self.assertEqual(bot.parse_export_range(args, today), want, args)
+
+    def test_invalid_ranges(self):
+        today = datetime.date(2025, 3, 15)
+        for args in [("2025-02-01..2025-01-01",), ("2025-01-01..내일",), ("13월",), ("",), ("아무거나",)]:
+            self.assertIsNone(bot.parse_export_range(args, today), args)
+
+class PartWriterTest(unittest.TestCase):
+
+    def read_part(self, path: str, compress: bool) -> list:
+        opener = gzip.open if compress else open
+        with io.TextIOWrapper(opener(path, "rb"), encoding="utf-8-sig", newline="") as f:
+            return list(csv.reader(f))
+
+    def check_split(self, compress: bool, rows: int):
+        folder = tempfile.mkdtemp(prefix="dulgi-export-test-")
+        header = ["닉네임", "ID", "합계"]
+        limit = 200000
+        writer = bot.PartWriter(folder, "export", header, limit, compress)
+        written = [[f"사용자{i}", str(100000000000000000 + i), str(i * 7919 % 100003)] for i in range(rows)]
+        for row in written:
+            writer.write(row)
+        writer.close()
+        self.assertGreater(len(writer.paths), 1)
+        got = []
+        for n, path in enumerate(writer.paths, start=1):
+            self.assertTrue(path.endswith(f"export_part{n}" + (".csv.gz" if compress else ".csv")))
+            self.assertLessEqual(bot.os.path.getsize(path), limit)
+            part = self.read_part(path, compress)
+            self.assertEqual(part[0], header)              # 파트마다 헤더
+            got.extend(part[1:])
+        self.assertEqual(got, written)
+
+    def test_plain_parts_stay_under_limit(self):
+        self.check_split(False, 12000)
+
+    def test_gzip_parts_stay_under_limit(self):
+        self.check_split(True, 80000)
+
+if __name__ == "__main__":
+    unittest.main()
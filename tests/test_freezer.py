@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# StateFreezer: 바뀐 사용자만 다시 고정해도 thaw 결과가 라이브 상태(+누계)와 같은지
+
+import unittest
+
+from support import bot, new_partition, reopen, compact_users
+
+CID = next(iter(bot.CHANNEL_POINTS))
+
+class StateFreezerTest(unittest.TestCase):
+
+    def assert_matches(self, frozen, data, totals):
+        doc, agg = frozen.thaw()
+        users = doc.pop("users")
+        self.assertEqual(doc, {k: v for k, v in data.items() if k != "users"})
+        self.assertEqual(set(users), set(data["users"]))
+        for uid in data["users"]:
+            self.assertEqual(users[uid].to_json(), data["users"][uid].to_json(), uid)
+        self.assertEqual(agg["week"], {u: w for u, w in totals.week.items() if w})
+        self.assertEqual(agg["month"], {u: m for u, m in totals.month.items() if m})
+        self.assertEqual(agg["closed"], totals.closed.to_json())
+
+    def mutate(self, part, uids):
+        for uid in uids:
+            bot.award_activity(part, uid, "2025-03-05", CID)
+        # 저널 없이 바뀐 사용자(일 마감의 알림 키 정리처럼) → mark_dirty로 알림
+        uid = uids[-1]
+        part.data["users"][uid].notified = {"custom": True}
+        part.persistence.mark_dirty(1, [uid])
+        # 기록 없이 새로 생긴 사용자도 빠지지 않아야 함
+        bot.ensure_user(part.data, "199999999999999999")
+
+    def test_dict_state(self):
+        part = new_partition()
+        part.data.update(compact_users(40))
+        part.totals.rebuild(part.data)
+        freezer = part.persistence.freezer
+        self.assert_matches(freezer.freeze(part.data, part.totals), part.data, part.totals)
+        self.mutate(part, list(part.data["users"])[:5])
+        self.assert_matches(freezer.freeze(part.data, part.totals), part.data, part.totals)
+
+    def test_lazy_snapshot_state(self):
+        part = new_partition()
+        bot.write_atomic(bot.encode_snapshot(compact_users(40)), part.snapshot_file)
+        part = reopen(part)
+        users = part.data["users"]
+        self.assertIsInstance(users, bot.LazyUsers)
+        uids = list(users)
+        for uid in uids[:10]:
+            users[uid]     # 읽기만 한 사용자 → 스냅샷 블록 재사용
+        freezer = part.persistence.freezer
+        first = freezer.freeze(part.data, part.totals)
+        self.mutate(part, uids[5:15])
+        second = freezer.freeze(part.data, part.totals)
+        # 바뀐 사용자와 새 사용자만 다시 고정, 나머지는 블록 그대로
+        self.assertEqual(set(second.users) - set(first.users), set(uids[10:15]) | {"199999999999999999"})
+        self.assertEqual(set(second.pending), set(uids) - set(second.users))
+        users.load_all()
+        self.assert_matches(second, part.data, part.totals)
+
+    def test_swapped_state_is_frozen_in_full(self):
+        part = new_partition()
+        part.data.update(compact_users(10))
+        freezer = part.persistence.freezer
+        freezer.freeze(part.data)
+        part.data = {"users": compact_users(3)["users"]}
+        doc, _ = freezer.freeze(part.data).thaw()
+        self.assertEqual({uid: u.to_json() for uid, u in doc["users"].items()},
+                         {uid: u.to_json() for uid, u in part.data["users"].items()})
+
+if __name__ == "__main__":
+    unittest.main()
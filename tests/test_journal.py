@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# 저널 재생: 끊긴 마지막 줄만 잘라 내고, 중간 손상은 시작을 멈춤
+
+import os
+import json
+import tempfile
+import unittest
+
+from support import bot
+
+CID = next(iter(bot.CHANNEL_POINTS))
+UID = "100000000000000001"
+
+def award(seq: int, ds: str = "2025-03-03") -> bytes:
+    ev = {"s": seq, "t": "award", "u": UID, "d": ds, "c": CID, "p": 1}
+    return (json.dumps(ev) + "\n").encode("utf-8")
+
+class ReplayJournalTest(unittest.TestCase):
+
+    def write(self, payload: bytes) -> str:
+        path = os.path.join(tempfile.mkdtemp(prefix="dulgi-journal-test-"), "journal.jsonl")
+        with open(path, "wb") as f:
+            f.write(payload)
+        return path
+
+    def test_torn_last_line_is_truncated(self):
+        good = award(1) + award(2)
+        path = self.write(good + award(3)[:20])
+        data = {}
+        self.assertEqual(bot.replay_journal(data, path), 2)
+        self.assertEqual(data["users"][UID].day_total(bot.day_index("2025-03-03")), 2)
+        # 잘라 낸 뒤 이어 쓴 레코드도 다음 재생에서 그대로 읽힘
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), good)
+        bot.append_journal([award(3).decode("utf-8")], path)
+        self.assertEqual(bot.replay_journal({}, path), 3)
+
+    def test_corruption_before_the_end_raises(self):
+        path = self.write(award(1) + b'{"s": 2, "t": "aw\n' + award(3))
+        with self.assertRaises(bot.SnapshotError):
+            bot.replay_journal({}, path)
+        with open(path, "rb") as f:
+            self.assertIn(award(3), f.read())     # 파일은 건드리지 않음
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# 실시간 순위(PeriodBoard)와 마감 순위(FrozenBoard): 동점 순서와 순위 계산
+
+import unittest
+
+from support import bot
+
+class PeriodBoardTest(unittest.TestCase):
+
+    def board(self) -> "bot.PeriodBoard":
+        board = bot.PeriodBoard()
+        for uid, sc in [("c", 5), ("a", 5), ("e", 3), ("b", 5), ("d", 3), ("f", 1)]:
+            board.add(uid, sc)
+        return board
+
+    def test_ties_come_out_by_uid(self):
+        board = self.board()
+        self.assertEqual(board.top(), [("a", 5), ("b", 5), ("c", 5), ("d", 3), ("e", 3), ("f", 1)])
+        self.assertEqual(board.top(2), [("a", 5), ("b", 5)])
+        self.assertEqual(board.top(4), [("a", 5), ("b", 5), ("c", 5), ("d", 3)])
+        frozen = bot.FrozenBoard(board)
+        for k in (None, 2, 4, 6):
+            self.assertEqual(board.top(k), frozen.top(k), k)
+
+    def test_rank_shares_position_on_ties(self):
+        board = self.board()
+        frozen = bot.FrozenBoard(board)
+        expected = {"a": (1, 5, 6), "b": (1, 5, 6), "c": (1, 5, 6), "d": (4, 3, 6), "e": (4, 3, 6), "f": (6, 1, 6)}
+        for uid, want in expected.items():
+            self.assertEqual(board.rank(uid), want, uid)
+            self.assertEqual(frozen.rank(uid), want, uid)
+        self.assertIsNone(board.rank("zz"))
+        self.assertIsNone(frozen.rank("zz"))
+
+    def test_score_moves_between_buckets(self):
+        board = self.board()
+        board.add("f", 6)                  # 1 → 7: 맨 위로
+        board.add("c", -5)                 # 5 → 0: 순위에서 빠짐
+        self.assertEqual(board.top(3), [("f", 7), ("a", 5), ("b", 5)])
+        self.assertIsNone(board.rank("c"))
+        self.assertNotIn(1, board.buckets)
+        self.assertEqual(board.rank("d"), (4, 3, 5))
+
+    def test_frozen_board_thaws_to_same_ranking(self):
+        frozen = bot.FrozenBoard(self.board())
+        live = frozen.thaw()
+        self.assertEqual(live.top(), frozen.top())
+        live.add("e", 10)
+        self.assertEqual(live.top(1), [("e", 13)])
+        self.assertEqual(frozen.top(1), [("a", 5)])   # 고정 순위는 그대로
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# /metrics 텍스트 포맷: 라벨 값 이스케이프
+
+import unittest
+
+from support import bot
+
+class MetricsFormatTest(unittest.TestCase):
+
+    def test_label_values_are_escaped(self):
+        m = bot.Metrics()
+        m.inc("dulgi_messages_total", channel='공지 "1"\\새\n채널', outcome="capped")
+        line = next(l for l in m.render().splitlines() if l.startswith("dulgi_messages_total{"))
+        self.assertEqual(line, 'dulgi_messages_total{channel="공지 \\"1\\"\\\\새\\n채널",outcome="capped"} 1')
+
+if __name__ == "__main__":
+    unittest.main()
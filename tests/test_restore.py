@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# 백업 파일 복원 경로: 스트리밍 파싱과 검증
+
+import os
+import gzip
+import json
+import tempfile
+import unittest
+
+from support import bot, sample_users
+
+def chunked(text: str, size: int):
+    """text를 size 글자씩 돌려주는 read 함수(값이 청크 경계에 걸리도록)"""
+    chunks = iter([text[i:i + size] for i in range(0, len(text), size)])
+    return lambda: next(chunks, "")
+
+class JsonStreamReaderTest(unittest.TestCase):
+
+    def test_items_across_chunk_boundaries(self):
+        doc = {"meta": {"journal_seq": 12345}, "users": sample_users(5)["users"], "version": 3.5, "tail": [1, "}", None]}
+        text = json.dumps(doc, ensure_ascii=False, indent=1)
+        for size in (1, 7, 64, len(text)):
+            users, keys = {}, {}
+            for kind, key, value in bot.JsonStreamReader(chunked(text, size)).items():
+                (users if kind == "user" else keys)[key] = value
+            self.assertEqual(users, doc["users"], size)
+            self.assertEqual(keys, {k: v for k, v in doc.items() if k != "users"}, size)
+
+    def test_broken_structure_raises(self):
+        for text in ('["users"]', '{"users": {"1": {}', '{"a": 1 "b": 2}'):
+            with self.assertRaises(ValueError, msg=text):
+                list(bot.JsonStreamReader(chunked(text, 4)).items())
+
+class ValidateUserTest(unittest.TestCase):
+
+    def test_sample_users_are_valid(self):
+        for uid, u in sample_users(10)["users"].items():
+            self.assertIsNone(bot.validate_user(uid, u))
+
+    def test_schema_errors(self):
+        good = sample_users(1)["users"]["100000000000000000"]
+        bad = [
+            ("abc", good),
+            ("1", []),
+            ("1", {**good, "attendance": ["2025/01/01"]}),
+            ("1", {**good, "activity": []}),
+            ("1", {**good, "activity": {"2025-01-01": {"total": -1}}}),
+            ("1", {**good, "activity": {"2025-01-01": {"total": 1, "by_channel": {"x": 1}}}}),
+            ("1", {**good, "activity": {"2025-01-01": {"total": 1, "by_channel": {"1": "1"}}}}),
+            ("1", {**good, "notified": []}),
+            ("1", {**good, "level": "1"}),
+            ("1", {**good, "badges": {}}),
+        ]
+        for uid, u in bad:
+            err = bot.validate_user(uid, u)
+            self.assertIsInstance(err, str, (uid, u))
+            bot.CompactUser.from_json(good)      # 통과한 레코드는 변환 가능
+
+class ParseBackupFileTest(unittest.TestCase):
+
+    def write(self, payload: bytes, name: str) -> str:
+        path = os.path.join(tempfile.mkdtemp(prefix="dulgi-restore-test-"), name)
+        with open(path, "wb") as f:
+            f.write(payload)
+        return path
+
+    def test_gzip_is_limited_by_decompressed_size(self):
+        doc = sample_users(200)
+        doc["pad"] = " " * (1 << 20)      # 압축하면 작지만 풀면 1MB 넘음
+        raw = json.dumps(doc).encode("utf-8")
+        path = self.write(gzip.compress(raw), "full.json.gz")
+        self.assertLess(os.path.getsize(path), 1 << 20)
+        with self.assertRaises(ValueError):
+            bot.parse_backup_file(path, max_bytes=1 << 20)
+        parsed, summary = bot.parse_backup_file(path, max_bytes=len(raw))
+        self.assertEqual(summary["users"], 200)
+        self.assertEqual(parsed["users"], doc["users"])
+
+if __name__ == "__main__":
+    unittest.main()
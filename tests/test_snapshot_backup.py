@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# 바이너리 스냅샷(LazyUsers)에서 읽은 상태의 백업/복원
+
+import os
+import json
+import asyncio
+import unittest
+
+from support import bot, new_partition, reopen, sample_users, compact_users
+
+class SnapshotBackupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.part = new_partition()
+        self.data = sample_users(50)
+        bot.write_atomic(bot.encode_snapshot(compact_users(50)), self.part.snapshot_file)
+        self.part = reopen(self.part)
+        self.assertIsInstance(self.part.data["users"], bot.LazyUsers)
+
+    def test_serialize_includes_unloaded_users(self):
+        users = self.part.data["users"]
+        self.assertFalse(any(users.is_loaded(uid) for uid in self.data["users"]))
+        doc = json.loads(bot.serialize_data(self.part.data))
+        self.assertEqual(doc["users"], self.data["users"])
+
+    def test_backup_and_restore_from_binary_snapshot(self):
+        async def backup_twice():
+            full = await bot.run_backup(self.part, force_full=True)
+            # 한 명만 바꾼 뒤 변경분 백업: 안 읽은 사용자가 삭제로 잡히면 안 됨
+            uid = next(iter(self.data["users"]))
+            await self.part.actor.call(bot.MarkNotified(uid, "daily_2025-01-01"))
+            delta = await bot.run_backup(self.part)
+            await self.part.actor.aclose()
+            return full, delta
+
+        full, delta = asyncio.run(backup_twice())
+        self.assertEqual(full["users"], 50)
+        self.assertEqual(delta["type"], "delta")
+        self.assertEqual(delta["removed"], 0)
+        self.assertEqual(delta["changed"], 1)
+
+        restored = bot.restore_from_backup_dir(self.part.backup_dir)
+        self.assertEqual(set(restored["users"]), set(self.data["users"]))
+        for uid, u in self.data["users"].items():
+            self.assertEqual(restored["users"][uid]["activity"], u["activity"])
+            self.assertEqual(restored["users"][uid]["attendance"], u["attendance"])
+        self.assertTrue(os.path.exists(os.path.join(self.part.backup_dir, "manifest.json")))
+
+if __name__ == "__main__":
+    unittest.main()
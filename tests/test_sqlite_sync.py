@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# 시작 시 SQLite 사본이 메모리 상태와 어긋났을 때(비정상 종료/오프라인 재작성) 다시 가져오는지
+
+import os
+import asyncio
+import tempfile
+import unittest
+
+from support import bot, compact_users
+
+class SqliteReconcileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(prefix="dulgi-sqlite-"), "data.sqlite3")
+        self.data = compact_users(20)
+        self.data["meta"] = {"journal_seq": 7}
+
+    def run_storage(self, fn):
+        async def go():
+            st = bot.SqliteStorage(self.path)
+            try:
+                return await fn(st)
+            finally:
+                await st.close()
+        return asyncio.run(go())
+
+    def start(self, data: dict) -> bool:
+        return self.run_storage(lambda st: st.reconcile(data, bot.journal_seq_of(data)))
+
+    def shutdown_cleanly(self, data: dict):
+        self.run_storage(lambda st: st.mark_synced(bot.journal_seq_of(data), bot.generation_of(data)))
+
+    def month_board(self, ref: str = "2025-01-01") -> dict:
+        y, m = int(ref[:4]), int(ref[5:7])
+        return dict(self.run_storage(lambda st: st.month_leaderboard(y, m)))
+
+    def test_new_db_is_filled(self):
+        self.assertTrue(self.start(self.data))
+        self.assertEqual(len(self.month_board()), 20)
+
+    def test_clean_shutdown_skips_import(self):
+        self.start(self.data)
+        self.shutdown_cleanly(self.data)
+        self.assertFalse(self.start(self.data))
+
+    def test_crash_reimports(self):
+        self.start(self.data)
+        # 정상 종료 표식 없이 다시 시작 → shadow 쓰기가 어디까지 들어갔는지 모르므로 다시 가져옴
+        self.assertTrue(self.start(self.data))
+
+    def test_offline_rewrite_reimports(self):
+        self.start(self.data)
+        self.shutdown_cleanly(self.data)
+        # 봇이 꺼진 동안 백필/백업 복원으로 같은 seq의 다른 파일로 바뀜
+        uid = next(iter(self.data["users"]))
+        self.data["users"][uid] = bot.CompactUser()
+        bot.new_generation(self.data)
+        self.assertTrue(self.start(self.data))
+        self.assertNotIn(uid, self.month_board())
+
+    def test_failed_shadow_write_blocks_marker(self):
+        self.start(self.data)
+        uid = next(iter(self.data["users"]))
+
+        async def write_then_close(st):
+            # 바인딩할 수 없는 값 → sqlite 스레드에서 실패. 종료 표식은 그 쓰기가 끝난 뒤에 판단해야 함
+            st.shadow_award(uid, "2025-01-01", object(), 1, 4)
+            await st.mark_synced(bot.journal_seq_of(self.data), bot.generation_of(self.data))
+        self.run_storage(write_then_close)
+        self.assertTrue(self.start(self.data))
+
+    def test_reconcile_imports_a_frozen_copy(self):
+        imported = []
+
+        async def reconcile(st):
+            real = st._import
+            st._import = lambda data: (imported.append(data), real(data))
+            return await st.reconcile(self.data, bot.journal_seq_of(self.data))
+        self.assertTrue(self.run_storage(reconcile))
+        # sqlite 스레드는 라이브 사용자 객체가 아니라 루프 위에서 고정한 사본을 훑음
+        users = imported[0]["users"]
+        self.assertEqual(set(users), set(self.data["users"]))
+        self.assertFalse(any(users[uid] is u for uid, u in self.data["users"].items()))
+        self.assertEqual(len(self.month_board()), 20)
+
+    def test_migrate_cli_marks_synced(self):
+        src = os.path.join(os.path.dirname(self.path), "data.json")
+        bot.save_data(self.data, src)
+        bot.migrate_json_to_sqlite(src, self.path)
+        self.assertFalse(self.start(bot.state_from_json(bot.load_data(src))))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# 백그라운드 컴팩션 도중 종료/취소돼도 버퍼에 있던 변경이 사라지지 않는지
+
+import time
+import asyncio
+import threading
+import unittest
+
+from support import bot, new_partition, reopen
+
+CAPPED = next(cid for cid, c in bot.CHANNEL_POINTS.items() if c["points"] == 1 and c["daily_max"] == 4)
+UID = "100000000000000001"
+DAY = "2025-03-03"
+
+class SlowSerializer:
+    """executor에서 인코딩이 오래 걸리는 상황 흉내(시작 시점을 알려 줌)"""
+
+    def __init__(self, inner, delay: float = 0.3):
+        self.inner = inner
+        self.delay = delay
+        self.started = threading.Event()
+
+    def __call__(self, frozen):
+        self.started.set()
+        time.sleep(self.delay)
+        return self.inner(frozen)
+
+async def wait_started(slow: SlowSerializer):
+    while not slow.started.is_set():
+        await asyncio.sleep(0.005)
+
+class WriteBehindShutdownTest(unittest.TestCase):
+
+    def setUp(self):
+        self.part = new_partition()
+        self.slow = SlowSerializer(self.part.persistence.serializer)
+        self.part.persistence.serializer = self.slow
+        self.part.persistence.interval = 0.01
+
+    def points_after_restart(self) -> int:
+        user = reopen(self.part).data.get("users", {}).get(UID)
+        return user.day_total(bot.day_index(DAY)) if user else 0
+
+    def test_aclose_during_background_compaction(self):
+        part = self.part
+
+        async def scenario():
+            part.persistence.start()
+            part.actor.start()
+            for _ in range(4):
+                await part.actor.call(bot.Award(UID, DAY, CAPPED))
+            # 일 마감처럼 저널로 못 쓰는 변경 → 다음 주기에 백그라운드 컴팩션
+            await part.actor.call(bot.Mutate(lambda p: p.persistence.mark_dirty()))
+            await wait_started(self.slow)
+            await part.actor.aclose()
+            await part.persistence.aclose()
+
+        asyncio.run(scenario())
+        self.assertEqual(self.points_after_restart(), 4)
+
+    def test_cancelled_compaction_restores_buffer(self):
+        part = self.part
+
+        async def scenario():
+            part.persistence.start()
+            part.actor.start()
+            for _ in range(3):
+                await part.actor.call(bot.Award(UID, DAY, CAPPED))
+            compaction = asyncio.ensure_future(part.persistence.compact())
+            await wait_started(self.slow)
+            compaction.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await compaction
+            self.assertEqual(part.persistence.pending, 3)
+            await part.actor.aclose()
+            await part.persistence.aclose()
+
+        asyncio.run(scenario())
+        self.assertEqual(self.points_after_restart(), 3)
+
+if __name__ == "__main__":
+    unittest.main()